@@ -1,6 +1,22 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 import json
 import asyncio
+from data.climate_grid import get_climate_grid
+from data.gazetteer import Place, resolve_location
+from services.climate_tiles import get_climate_tiles
+from services.weather_stream import get_weather_store
+
+# Risk -> (climate grid indicator, value scored 0.2, value scored 1.0); scores are linear in between
+SEVERITY_INDICATORS = {
+    "drought": ("deficient_year_frequency", 0.0, 0.4),
+    "irregular_rainfall": ("rainfall_cv", 0.1, 0.4),
+    "flooding": ("excess_year_frequency", 0.0, 0.4),
+    "excessive_rainfall": ("excess_year_frequency", 0.0, 0.4),
+    "heat_waves": ("hot_month_frequency", 0.0, 0.25),
+    "temperature_fluctuations": ("tmax_interannual_sd_c", 0.2, 1.0),
+    "temperature_variations": ("tmax_interannual_sd_c", 0.2, 1.0),
+    "water_scarcity": ("mean_annual_rainfall_mm", 1500.0, 400.0)
+}
 
 class ClimateAnalyzer:
     """AI agent for analyzing climate risks and adaptation needs"""
@@ -14,18 +30,26 @@ class ClimateAnalyzer:
         # Simulate AI analysis (in production, integrate with Claude/GPT)
         await asyncio.sleep(0.1)  # Simulate processing time
         
-        location_lower = location.lower()
+        place = resolve_location(location)
+        state = place.state if place else None
+        # The district's precomputed tile; failing that, indicators from the gridded history at the place
+        tiles = get_climate_tiles() if place else None
+        tile = tiles.lookup(place) if tiles else None
+        climate = None
+        if tile is None and place:
+            grid = get_climate_grid()
+            climate = grid.profile(place.latitude, place.longitude) if grid else None
         
         # Risk assessment based on location and concerns
         risks = []
         severity_scores = {}
         
         # Common climate risks by region (simplified for prototype)
-        if any(region in location_lower for region in ['maharashtra', 'karnataka', 'telangana']):
+        if state in ('Maharashtra', 'Karnataka', 'Telangana'):
             risks.extend(['drought', 'irregular_rainfall', 'heat_waves'])
-        elif any(region in location_lower for region in ['kerala', 'west bengal', 'assam']):
+        elif state in ('Kerala', 'West Bengal', 'Assam'):
             risks.extend(['flooding', 'excessive_rainfall', 'cyclones'])
-        elif any(region in location_lower for region in ['punjab', 'haryana', 'uttar pradesh']):
+        elif state in ('Punjab', 'Haryana', 'Uttar Pradesh'):
             risks.extend(['water_scarcity', 'soil_degradation', 'temperature_fluctuations'])
         else:
             risks.extend(['irregular_rainfall', 'temperature_variations'])
@@ -37,7 +61,10 @@ class ClimateAnalyzer:
         
         # Calculate severity scores
         for risk in risks:
-            severity_scores[risk] = self._calculate_risk_severity(risk, location)
+            if tile and risk in tile[0]:
+                severity_scores[risk] = tile[0][risk]
+            else:
+                severity_scores[risk] = self._calculate_risk_severity(risk, climate)
         
         # Generate adaptation strategies
         adaptation_strategies = self._generate_adaptation_strategies(risks)
@@ -47,10 +74,18 @@ class ClimateAnalyzer:
             "risks": risks,
             "severity_scores": severity_scores,
             "adaptation_strategies": adaptation_strategies,
-            "climate_trends": self._get_climate_trends(location),
+            "climate_trends": self._get_climate_trends(climate, place, tile[1] if tile else None),
             "urgency_level": self._calculate_urgency(severity_scores)
         }
     
+    def grid_assessment(self, climate: Dict) -> Tuple[Dict[str, float], Dict]:
+        """Severity of every risk the grid profile has an indicator for, and its historical trends"""
+        severities = {
+            risk: self._calculate_risk_severity(risk, climate)
+            for risk, (indicator, _, _) in SEVERITY_INDICATORS.items() if indicator in climate
+        }
+        return severities, self._historical_trends(climate)
+    
     def _load_climate_knowledge(self) -> Dict:
         """Load climate knowledge base"""
         return {
@@ -73,8 +108,15 @@ class ClimateAnalyzer:
             }
         }
     
-    def _calculate_risk_severity(self, risk: str, location: str) -> float:
+    def _calculate_risk_severity(self, risk: str, climate: Optional[Dict]) -> float:
         """Calculate severity score for a risk (0-1 scale)"""
+        indicator = SEVERITY_INDICATORS.get(risk)
+        if climate and indicator and indicator[0] in climate:
+            name, low, high = indicator
+            position = min(max((climate[name] - low) / (high - low), 0.0), 1.0)
+            return round(0.2 + 0.8 * position, 2)
+
+        # Regional defaults for risks the grid says nothing about
         base_scores = {
             "drought": 0.7,
             "flooding": 0.6,
@@ -131,14 +173,54 @@ class ClimateAnalyzer:
         
         return strategies
     
-    def _get_climate_trends(self, location: str) -> Dict:
+    def _get_climate_trends(self, climate: Optional[Dict], place: Optional[Place] = None,
+                            precomputed: Optional[Dict] = None) -> Dict:
         """Get climate trends for the location"""
-        return {
+        trends = dict(precomputed) if precomputed else self._historical_trends(climate)
+        observed = get_weather_store().district(place) if place else None
+        if observed:
+            # Running statistics of the station observations streamed in for the district
+            if "tmax_anomaly_c" in observed:
+                trends["observed_temperature_anomaly"] = f"{observed['tmax_anomaly_c']:+.1f}°C vs station normal (last ~30 days)"
+            if "rainfall_anomaly_pct" in observed:
+                trends["observed_rainfall_anomaly"] = f"{round(observed['rainfall_anomaly_pct']):+d}% vs station normal (last ~30 days)"
+            trends["observed_extreme_events"] = (
+                f"{observed['heat_wave_days']} heat-wave days, {observed['heavy_rain_days']} heavy-rain days in {observed['year']}"
+            )
+            trends["observed_through"] = observed["observed_through"]
+        return trends
+
+    def _historical_trends(self, climate: Optional[Dict]) -> Dict:
+        trends = {
             "temperature_trend": "+1.2°C over last decade",
             "rainfall_trend": "-15% compared to historical average",
             "extreme_events": "Increasing frequency of droughts and heat waves",
             "seasonal_shifts": "Delayed monsoon onset, extended summer"
         }
+        if not climate:
+            return trends
+
+        if "warming_c" in climate:
+            trends["temperature_trend"] = f"{climate['warming_c']:+.1f}°C over last decade"
+        if "rainfall_trend_pct" in climate:
+            trends["rainfall_trend"] = f"{round(climate['rainfall_trend_pct']):+d}% compared to historical average"
+            events = [
+                f"deficient rainfall in {climate['deficient_year_frequency']:.0%} of years",
+                f"excess rainfall in {climate['excess_year_frequency']:.0%}"
+            ]
+            if "hot_month_frequency" in climate:
+                events.append(f"{climate['hot_month_frequency']:.0%} of months averaging 38°C or more")
+            events[0] = events[0].capitalize()
+            trends["extreme_events"] = ", ".join(events)
+            shift = climate["june_share_change"]
+            if shift < -0.03:
+                trends["seasonal_shifts"] = "Delayed monsoon onset (less of the monsoon rain falls in June)"
+            elif shift > 0.03:
+                trends["seasonal_shifts"] = "Earlier monsoon onset (more of the monsoon rain falls in June)"
+            else:
+                trends["seasonal_shifts"] = "No clear shift in monsoon onset"
+        trends["data_period"] = climate["period"]
+        return trends
     
     def _calculate_urgency(self, severity_scores: Dict) -> str:
         """Calculate overall urgency level"""
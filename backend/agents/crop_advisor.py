@@ -1,13 +1,21 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 import asyncio
-from data.knowledge_base import get_crops_data
+import numpy as np
+from data.catalog import KnowledgeBase, bit_positions, get_knowledge_base
+from data.crop_table import CropTable, TOLERANCE_LEVELS
+from data.records import CropRecord, RiskLevel, ScoredCrop, Season
+from services.recommendation_table import get_recommendation_table
+
+# Score bonus per tolerance level code; only "high" and "medium" earn a bonus
+RISK_BONUS = np.array([{"high": 15, "medium": 5}.get(level, 0) for level in TOLERANCE_LEVELS], dtype=np.int64)
+
+# Per-crop signals behind the recommendation reasons, packed as bit flags
+SIGNALS = ("high_value", "quick_harvest", "budget_friendly")
+SIGNAL_HIGH_VALUE, SIGNAL_QUICK_HARVEST, SIGNAL_BUDGET_FRIENDLY = (1 << bit for bit in range(len(SIGNALS)))
 
 class CropAdvisor:
     """AI agent for crop recommendations based on climate and farm conditions"""
     
-    def __init__(self):
-        self.crops_database = get_crops_data()
-    
     async def recommend_crops(self, farm_details: Dict, climate_risks: List[str]) -> Dict:
         """Recommend suitable crops based on farm conditions and climate risks"""
         
@@ -17,168 +25,221 @@ class CropAdvisor:
         location = farm_details.get("location", "").lower()
         soil_type = farm_details.get("soil_type", "").lower()
         water_source = farm_details.get("water_source", "").lower()
-        farm_size = farm_details.get("farm_size", 0)
-        budget = farm_details.get("budget", 0)
         
-        # Filter crops based on conditions
-        suitable_crops = self._filter_crops_by_conditions(
-            location, soil_type, water_source, climate_risks
-        )
+        # One knowledge-base version for the whole recommendation
+        kb = get_knowledge_base()
         
-        # Rank crops by suitability
-        ranked_crops = self._rank_crops(suitable_crops, farm_details, climate_risks)
+        # Precomputed ranking for this farm profile, if the materialized table covers it
+        ranking = self._lookup_ranking(kb, location, soil_type, water_source, farm_details, climate_risks)
+        if ranking is None:
+            # Filter crops based on conditions
+            suitable_ids = self._filter_crops_by_conditions(
+                kb, location, soil_type, water_source, climate_risks
+            )
+            ranking = self._rank_candidates(kb, suitable_ids, farm_details, climate_risks)
         
-        # Generate crop rotation plan
-        rotation_plan = self._generate_rotation_plan(ranked_crops[:5])
+        return self._finish_recommendations(kb, ranking, farm_details, climate_risks)
+    
+    async def recommend_crops_batch(self, farms: List[Dict], climate_risks: List[List[str]]) -> List[Dict]:
+        """Recommend crops for many farms, filtering once per distinct farm profile"""
         
-        # Calculate expected yields
-        yield_estimates = self._calculate_yield_estimates(ranked_crops[:5], farm_size)
+        # Simulate AI processing
+        await asyncio.sleep(0.1)
         
-        return {
-            "recommended_crops": [crop["name"] for crop in ranked_crops[:5]],
-            "detailed_recommendations": ranked_crops[:5],
-            "crop_rotation_plan": rotation_plan,
-            "yield_estimates": yield_estimates,
-            "diversification_strategy": self._generate_diversification_strategy(ranked_crops),
-            "seasonal_calendar": self._generate_seasonal_calendar(ranked_crops[:5])
-        }
-    
-    def _filter_crops_by_conditions(self, location: str, soil_type: str, 
-                                   water_source: str, climate_risks: List[str]) -> List[Dict]:
-        """Filter crops based on farm conditions"""
-        suitable_crops = []
+        kb = get_knowledge_base()
+        candidates_by_profile = {}
+        recommendations = []
         
-        for crop in self.crops_database:
-            # Check climate suitability
-            if self._is_climate_suitable(crop, location, climate_risks):
-                # Check soil compatibility
-                if self._is_soil_suitable(crop, soil_type):
-                    # Check water requirements
-                    if self._is_water_suitable(crop, water_source):
-                        suitable_crops.append(crop)
+        for farm_details, risks in zip(farms, climate_risks):
+            location = farm_details.get("location", "").lower()
+            soil_type = farm_details.get("soil_type", "").lower()
+            water_source = farm_details.get("water_source", "").lower()
+            
+            ranking = self._lookup_ranking(kb, location, soil_type, water_source, farm_details, risks)
+            if ranking is None:
+                profile = (location, soil_type, water_source, tuple(risks))
+                if profile not in candidates_by_profile:
+                    candidates_by_profile[profile] = self._filter_crops_by_conditions(
+                        kb, location, soil_type, water_source, risks
+                    )
+                ranking = self._rank_candidates(kb, candidates_by_profile[profile], farm_details, risks)
+            
+            recommendations.append(self._finish_recommendations(kb, ranking, farm_details, risks))
         
-        return suitable_crops
+        return recommendations
+    
+    def _lookup_ranking(self, kb: KnowledgeBase, location: str, soil_type: str, water_source: str,
+                        farm_details: Dict, climate_risks: List[str]) -> Optional[Dict]:
+        """Ranking from the materialized recommendation table, or None to compute it live"""
+        table = get_recommendation_table()
+        if table is None:
+            return None
+        return table.lookup(
+            kb, location, soil_type, self._supported_water_requirements(water_source),
+            climate_risks, self._budget_per_acre(farm_details)
+        )
     
-    def _is_climate_suitable(self, crop: Dict, location: str, climate_risks: List[str]) -> bool:
-        """Check if crop is suitable for the climate"""
-        crop_climate = crop.get("climate_zones", [])
+    def _rank_candidates(self, kb: KnowledgeBase, suitable_ids: np.ndarray, farm_details: Dict,
+                         climate_risks: List[str]) -> Dict:
+        """Rank filtered crops into the farm-size independent part of the recommendation"""
+        table = kb.crop_table
+        ids = np.asarray(suitable_ids, dtype=np.intp)
         
-        # Regional suitability
-        if any(zone in location for zone in crop_climate):
-            return True
+        # Score every candidate crop at once
+        scores, signals = self._score_crops(table, ids, farm_details, climate_risks)
+        
+        # Rank crops by suitability
+        top = self._top_k(scores, 5)
+        top_crops = [kb.crops[ids[position]] for position in top]
         
-        # Risk tolerance
-        crop_tolerance = crop.get("risk_tolerance", {})
-        for risk in climate_risks:
-            if risk in crop_tolerance and crop_tolerance[risk] == "high":
-                return True
+        # Best-ranked cash and food security crops
+        cash_crops = self._top_k(scores, 2, mask=table.market_price[ids] > 50)
+        food_crops = self._top_k(scores, 2, mask=table.category[ids] == table.category_code("food_grain"))
         
-        return len(crop_climate) == 0  # Default crops
+        return {
+            # [catalog position, score, signal flags] per recommended crop
+            "ranked": [
+                [int(ids[position]), int(scores[position]),
+                 sum(1 << bit for bit, signal in enumerate(SIGNALS) if signals[signal][position])]
+                for position in top
+            ],
+            # Generate crop rotation plan
+            "crop_rotation_plan": self._generate_rotation_plan(top_crops),
+            "diversification_strategy": self._generate_diversification_strategy(
+                top_crops,
+                [kb.crops[ids[position]].name for position in cash_crops],
+                [kb.crops[ids[position]].name for position in food_crops]
+            ),
+            "seasonal_calendar": self._generate_seasonal_calendar(top_crops)
+        }
     
-    def _is_soil_suitable(self, crop: Dict, soil_type: str) -> bool:
-        """Check soil compatibility"""
-        suitable_soils = crop.get("soil_types", [])
-        return not suitable_soils or any(soil in soil_type for soil in suitable_soils)
+    def _finish_recommendations(self, kb: KnowledgeBase, ranking: Dict, farm_details: Dict,
+                                climate_risks: List[str]) -> Dict:
+        """Add the farm-specific parts (reasons, yields) to a ranking"""
+        ranked_crops = [
+            self._ranked_crop(kb, crop_id, score, flags, climate_risks)
+            for crop_id, score, flags in ranking["ranked"]
+        ]
+        
+        # Calculate expected yields
+        yield_estimates = self._calculate_yield_estimates(ranked_crops, farm_details.get("farm_size", 0))
+        
+        return {
+            "recommended_crops": [crop.name for crop in ranked_crops],
+            "detailed_recommendations": ranked_crops,
+            "crop_rotation_plan": ranking["crop_rotation_plan"],
+            "yield_estimates": yield_estimates,
+            "diversification_strategy": ranking["diversification_strategy"],
+            "seasonal_calendar": ranking["seasonal_calendar"]
+        }
     
-    def _is_water_suitable(self, crop: Dict, water_source: str) -> bool:
-        """Check water requirement compatibility"""
-        water_req = crop.get("water_requirement", "medium")
+    def _filter_crops_by_conditions(self, kb: KnowledgeBase, location: str, soil_type: str, 
+                                   water_source: str, climate_risks: List[str]) -> np.ndarray:
+        """Filter crops based on farm conditions; returns catalog positions"""
+        suitable = (
+            # Check climate suitability (regional zone or high tolerance to a risk)
+            kb.crop_bits_for_climate(location, tolerant_to=climate_risks)
+            # Check soil compatibility
+            & kb.crop_bits_for_soil(soil_type)
+            # Check water requirements
+            & kb.crop_bits_for_water_requirements(self._supported_water_requirements(water_source))
+        )
         
+        return bit_positions(suitable)
+    
+    def _supported_water_requirements(self, water_source: str) -> List[str]:
+        """Crop water requirement levels a water source can meet"""
         if "bore" in water_source or "well" in water_source:
-            return water_req in ["low", "medium"]
+            return ["low", "medium"]
         elif "river" in water_source or "canal" in water_source:
-            return True  # All water requirements can be met
+            return ["low", "medium", "high"]  # All water requirements can be met
         else:
-            return water_req == "low"  # Rain-fed farming
+            return ["low"]  # Rain-fed farming
     
-    def _rank_crops(self, crops: List[Dict], farm_details: Dict, climate_risks: List[str]) -> List[Dict]:
-        """Rank crops by suitability score"""
-        scored_crops = []
+    def _score_crops(self, table: CropTable, ids: np.ndarray, farm_details: Dict,
+                     climate_risks: List[str]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Calculate suitability scores (0-100) for the given crop rows"""
+        market_price = table.market_price[ids]
+        growth_days = table.growth_days[ids]
+        input_cost = table.input_cost[ids]
         
-        for crop in crops:
-            score = self._calculate_suitability_score(crop, farm_details, climate_risks)
-            crop_with_score = crop.copy()
-            crop_with_score["suitability_score"] = score
-            crop_with_score["recommendation_reason"] = self._generate_recommendation_reason(
-                crop, farm_details, climate_risks
-            )
-            scored_crops.append(crop_with_score)
+        score = np.full(len(ids), 50, dtype=np.int64)  # Base score
         
-        return sorted(scored_crops, key=lambda x: x["suitability_score"], reverse=True)
-    
-    def _calculate_suitability_score(self, crop: Dict, farm_details: Dict, climate_risks: List[str]) -> float:
-        """Calculate suitability score (0-100)"""
-        score = 50  # Base score
-        
-        # Climate resilience bonus
-        crop_tolerance = crop.get("risk_tolerance", {})
-        for risk in climate_risks:
-            if risk in crop_tolerance:
-                if crop_tolerance[risk] == "high":
-                    score += 15
-                elif crop_tolerance[risk] == "medium":
-                    score += 5
+        # Climate resilience bonus (each listed risk counts, repeats included)
+        tolerance = table.tolerance[np.ix_(ids, table.risk_columns(climate_risks))]
+        score += RISK_BONUS[tolerance].sum(axis=1, dtype=np.int64)
         
         # Market value bonus
-        market_price = crop.get("market_price_per_kg", 0)
-        if market_price > 50:
-            score += 10
-        elif market_price > 20:
-            score += 5
+        high_value = market_price > 50
+        score += np.where(high_value, 10, np.where(market_price > 20, 5, 0))
         
         # Growth duration consideration
-        growth_days = crop.get("growth_duration_days", 120)
-        if growth_days < 90:
-            score += 10  # Quick returns
-        elif growth_days > 180:
-            score -= 5   # Long commitment
+        quick_harvest = growth_days < 90
+        score += np.where(quick_harvest, 10, np.where(growth_days > 180, -5, 0))
         
         # Budget compatibility
-        input_cost = crop.get("input_cost_per_acre", 0)
-        budget_per_acre = farm_details.get("budget", 0) / max(farm_details.get("farm_size", 1), 1)
-        if input_cost <= budget_per_acre * 0.7:
-            score += 15
-        elif input_cost <= budget_per_acre:
-            score += 5
-        else:
-            score -= 10
+        budget_per_acre = self._budget_per_acre(farm_details)
+        budget_friendly = input_cost <= budget_per_acre * 0.7
+        score += np.where(budget_friendly, 15, np.where(input_cost <= budget_per_acre, 5, -10))
         
-        return min(100, max(0, score))
+        signals = {"high_value": high_value, "quick_harvest": quick_harvest, "budget_friendly": budget_friendly}
+        return np.clip(score, 0, 100), signals
+    
+    def _budget_per_acre(self, farm_details: Dict) -> float:
+        return farm_details.get("budget", 0) / max(farm_details.get("farm_size", 1), 1)
+    
+    def _top_k(self, scores: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Positions of the k best scores, best first; ties keep catalog order"""
+        candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(scores))
+        if len(candidates) > k:
+            # Everything scoring at least the k-th best, then a stable ordering of that short list
+            kth_best = scores[candidates[np.argpartition(-scores[candidates], k - 1)[k - 1]]]
+            candidates = candidates[scores[candidates] >= kth_best]
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order][:k]
+    
+    def _ranked_crop(self, kb: KnowledgeBase, crop_id: int, score: int, flags: int,
+                     climate_risks: List[str]) -> ScoredCrop:
+        # A view over the shared catalog record rather than a copy of it
+        return ScoredCrop(
+            kb.crops[crop_id],
+            suitability_score=score,
+            recommendation_reason=self._generate_recommendation_reason(kb.crop_table, crop_id, flags, climate_risks)
+        )
     
-    def _generate_recommendation_reason(self, crop: Dict, farm_details: Dict, climate_risks: List[str]) -> str:
+    def _generate_recommendation_reason(self, table: CropTable, crop_id: int, flags: int,
+                                        climate_risks: List[str]) -> str:
         """Generate explanation for crop recommendation"""
         reasons = []
         
         # Climate resilience
-        crop_tolerance = crop.get("risk_tolerance", {})
-        resilient_to = [risk for risk in climate_risks if crop_tolerance.get(risk) == "high"]
+        resilient_to = [
+            risk for risk in climate_risks
+            if risk in table.risk_index and table.tolerance[crop_id, table.risk_index[risk]] == RiskLevel.HIGH
+        ]
         if resilient_to:
             reasons.append(f"Highly resilient to {', '.join(resilient_to)}")
         
         # Market potential
-        market_price = crop.get("market_price_per_kg", 0)
-        if market_price > 50:
+        if flags & SIGNAL_HIGH_VALUE:
             reasons.append("High market value")
         
         # Quick returns
-        growth_days = crop.get("growth_duration_days", 120)
-        if growth_days < 90:
+        if flags & SIGNAL_QUICK_HARVEST:
             reasons.append("Quick harvest cycle")
         
         # Budget friendly
-        input_cost = crop.get("input_cost_per_acre", 0)
-        budget_per_acre = farm_details.get("budget", 0) / max(farm_details.get("farm_size", 1), 1)
-        if input_cost <= budget_per_acre * 0.7:
+        if flags & SIGNAL_BUDGET_FRIENDLY:
             reasons.append("Budget-friendly")
         
         return "; ".join(reasons) if reasons else "Suitable for your farm conditions"
     
-    def _generate_rotation_plan(self, crops: List[Dict]) -> Dict:
+    def _generate_rotation_plan(self, crops: List[CropRecord]) -> Dict:
         """Generate crop rotation plan"""
         return {
-            "kharif_season": [crop["name"] for crop in crops if crop.get("season") in ["kharif", "both"]][:2],
-            "rabi_season": [crop["name"] for crop in crops if crop.get("season") in ["rabi", "both"]][:2],
-            "summer_season": [crop["name"] for crop in crops if crop.get("season") in ["summer", "both"]][:1],
+            "kharif_season": [crop.name for crop in crops if crop.season in (Season.KHARIF, Season.BOTH)][:2],
+            "rabi_season": [crop.name for crop in crops if crop.season in (Season.RABI, Season.BOTH)][:2],
+            "summer_season": [crop.name for crop in crops if crop.season in (Season.SUMMER, Season.BOTH)][:1],
             "rotation_benefits": [
                 "Improved soil health",
                 "Reduced pest and disease pressure",
@@ -187,7 +248,7 @@ class CropAdvisor:
             ]
         }
     
-    def _calculate_yield_estimates(self, crops: List[Dict], farm_size: float) -> Dict:
+    def _calculate_yield_estimates(self, crops: List[ScoredCrop], farm_size: float) -> Dict:
         """Calculate expected yields and income"""
         estimates = {}
         
@@ -201,7 +262,7 @@ class CropAdvisor:
             total_input_cost = input_cost_per_acre * farm_size
             net_income = gross_income - total_input_cost
             
-            estimates[crop["name"]] = {
+            estimates[crop.name] = {
                 "yield_kg": total_yield,
                 "gross_income": gross_income,
                 "input_cost": total_input_cost,
@@ -211,13 +272,14 @@ class CropAdvisor:
         
         return estimates
     
-    def _generate_diversification_strategy(self, crops: List[Dict]) -> Dict:
+    def _generate_diversification_strategy(self, crops: List[CropRecord], cash_crops: List[str],
+                                           food_security_crops: List[str]) -> Dict:
         """Generate crop diversification strategy"""
         return {
-            "primary_crops": [crop["name"] for crop in crops[:2]],
-            "secondary_crops": [crop["name"] for crop in crops[2:4]],
-            "cash_crops": [crop["name"] for crop in crops if crop.get("market_price_per_kg", 0) > 50][:2],
-            "food_security_crops": [crop["name"] for crop in crops if crop.get("category") == "food_grain"][:2],
+            "primary_crops": [crop.name for crop in crops[:2]],
+            "secondary_crops": [crop.name for crop in crops[2:4]],
+            "cash_crops": cash_crops,
+            "food_security_crops": food_security_crops,
             "diversification_benefits": [
                 "Reduced market risk",
                 "Stable income throughout year",
@@ -226,7 +288,7 @@ class CropAdvisor:
             ]
         }
     
-    def _generate_seasonal_calendar(self, crops: List[Dict]) -> Dict:
+    def _generate_seasonal_calendar(self, crops: List[CropRecord]) -> Dict:
         """Generate seasonal planting calendar"""
         calendar = {
             "january": [], "february": [], "march": [], "april": [],
@@ -239,7 +301,7 @@ class CropAdvisor:
             for month in planting_months:
                 if month.lower() in calendar:
                     calendar[month.lower()].append({
-                        "crop": crop["name"],
+                        "crop": crop.name,
                         "activity": "Planting",
                         "duration": f"{crop.get('growth_duration_days', 120)} days"
                     })
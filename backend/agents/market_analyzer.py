@@ -1,12 +1,110 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 import asyncio
-from data.knowledge_base import get_market_data
+from data.catalog import get_knowledge_base
+from data.gazetteer import resolve_location
+from data.mandi_prices import get_mandi_store
+from data.mandi_registry import get_mandi_registry
+from data.records import freeze
+from services.market_analytics import get_market_analytics
+
+# Mandis (trading the crop) looked up for accessibility: the nearest sets the score, those within
+# reach add capacity and cold storage
+NEAREST_MARKETS = 3
+MARKET_REACH_KM = 50
+
+# Catalog figures per crop; prices, trend, volatility and seasonality are replaced by the mandi
+# price series where the store has them
+DEFAULT_MARKET_DATA = freeze({
+    "current_price": 25,
+    "price_trend": "stable",
+    "demand_level": "medium",
+    "volatility": "medium",
+    "seasonal_patterns": {"peak_months": ["march", "april"], "low_months": ["july", "august"]},
+    "export_potential": "medium",
+    "local_demand": "high"
+})
+
+CROP_MARKET_DATA = freeze({
+    "rice": {
+        "current_price": 22,
+        "price_trend": "increasing",
+        "demand_level": "high",
+        "volatility": "low",
+        "seasonal_patterns": {"peak_months": ["october", "november"], "low_months": ["june", "july"]},
+        "export_potential": "high",
+        "local_demand": "very_high"
+    },
+    "wheat": {
+        "current_price": 20,
+        "price_trend": "stable",
+        "demand_level": "high",
+        "volatility": "low",
+        "seasonal_patterns": {"peak_months": ["april", "may"], "low_months": ["december", "january"]},
+        "export_potential": "medium",
+        "local_demand": "very_high"
+    },
+    "cotton": {
+        "current_price": 55,
+        "price_trend": "increasing",
+        "demand_level": "high",
+        "volatility": "high",
+        "seasonal_patterns": {"peak_months": ["december", "january"], "low_months": ["june", "july"]},
+        "export_potential": "very_high",
+        "local_demand": "medium"
+    },
+    "sugarcane": {
+        "current_price": 3,
+        "price_trend": "stable",
+        "demand_level": "high",
+        "volatility": "low",
+        "seasonal_patterns": {"peak_months": ["february", "march"], "low_months": ["august", "september"]},
+        "export_potential": "low",
+        "local_demand": "very_high"
+    },
+    "soybean": {
+        "current_price": 45,
+        "price_trend": "increasing",
+        "demand_level": "high",
+        "volatility": "medium",
+        "seasonal_patterns": {"peak_months": ["november", "december"], "low_months": ["july", "august"]},
+        "export_potential": "high",
+        "local_demand": "high"
+    },
+    "maize": {
+        "current_price": 18,
+        "price_trend": "stable",
+        "demand_level": "medium",
+        "volatility": "medium",
+        "seasonal_patterns": {"peak_months": ["january", "february"], "low_months": ["september", "october"]},
+        "export_potential": "medium",
+        "local_demand": "high"
+    },
+    "tomato": {
+        "current_price": 35,
+        "price_trend": "volatile",
+        "demand_level": "high",
+        "volatility": "very_high",
+        "seasonal_patterns": {"peak_months": ["december", "january"], "low_months": ["june", "july"]},
+        "export_potential": "low",
+        "local_demand": "very_high"
+    },
+    "onion": {
+        "current_price": 28,
+        "price_trend": "increasing",
+        "demand_level": "high",
+        "volatility": "high",
+        "seasonal_patterns": {"peak_months": ["may", "june"], "low_months": ["november", "december"]},
+        "export_potential": "medium",
+        "local_demand": "very_high"
+    }
+})
 
 class MarketAnalyzer:
     """AI agent for market analysis and price predictions"""
     
-    def __init__(self):
-        self.market_data = get_market_data()
+    @property
+    def market_data(self) -> Dict:
+        return get_knowledge_base().market_data
     
     async def analyze_market_potential(self, crops: List[str], location: str) -> Dict:
         """Analyze market potential for recommended crops"""
@@ -15,6 +113,8 @@ class MarketAnalyzer:
         await asyncio.sleep(0.1)
         
         market_analysis = {}
+        analytics = get_market_analytics()
+        place = resolve_location(location) if analytics else None
         
         for crop in crops:
             crop_market_data = self._get_crop_market_data(crop, location)
@@ -28,6 +128,14 @@ class MarketAnalyzer:
                 "export_potential": crop_market_data["export_potential"],
                 "local_demand": crop_market_data["local_demand"]
             }
+            if "price_data" in crop_market_data:
+                market_analysis[crop]["price_data"] = crop_market_data["price_data"]
+            # Daily snapshot figures: its volatility label is over a rolling window of every mandi in the region
+            price_analytics = analytics.lookup(crop, place) if analytics else None
+            if price_analytics:
+                market_analysis[crop]["price_analytics"] = price_analytics
+                if price_analytics["volatility"]:
+                    market_analysis[crop]["price_volatility"] = price_analytics["volatility"]
         
         # Overall market insights
         overall_insights = self._generate_market_insights(market_analysis, location)
@@ -42,105 +150,22 @@ class MarketAnalyzer:
     
     def _get_crop_market_data(self, crop: str, location: str) -> Dict:
         """Get market data for a specific crop"""
-        
-        # Default market data structure
-        default_data = {
-            "current_price": 25,
-            "price_trend": "stable",
-            "demand_level": "medium",
-            "volatility": "medium",
-            "seasonal_patterns": {"peak_months": ["march", "april"], "low_months": ["july", "august"]},
-            "export_potential": "medium",
-            "local_demand": "high"
-        }
-        
-        # Crop-specific market data
-        crop_market_data = {
-            "rice": {
-                "current_price": 22,
-                "price_trend": "increasing",
-                "demand_level": "high",
-                "volatility": "low",
-                "seasonal_patterns": {"peak_months": ["october", "november"], "low_months": ["june", "july"]},
-                "export_potential": "high",
-                "local_demand": "very_high"
-            },
-            "wheat": {
-                "current_price": 20,
-                "price_trend": "stable",
-                "demand_level": "high",
-                "volatility": "low",
-                "seasonal_patterns": {"peak_months": ["april", "may"], "low_months": ["december", "january"]},
-                "export_potential": "medium",
-                "local_demand": "very_high"
-            },
-            "cotton": {
-                "current_price": 55,
-                "price_trend": "increasing",
-                "demand_level": "high",
-                "volatility": "high",
-                "seasonal_patterns": {"peak_months": ["december", "january"], "low_months": ["june", "july"]},
-                "export_potential": "very_high",
-                "local_demand": "medium"
-            },
-            "sugarcane": {
-                "current_price": 3,
-                "price_trend": "stable",
-                "demand_level": "high",
-                "volatility": "low",
-                "seasonal_patterns": {"peak_months": ["february", "march"], "low_months": ["august", "september"]},
-                "export_potential": "low",
-                "local_demand": "very_high"
-            },
-            "soybean": {
-                "current_price": 45,
-                "price_trend": "increasing",
-                "demand_level": "high",
-                "volatility": "medium",
-                "seasonal_patterns": {"peak_months": ["november", "december"], "low_months": ["july", "august"]},
-                "export_potential": "high",
-                "local_demand": "high"
-            },
-            "maize": {
-                "current_price": 18,
-                "price_trend": "stable",
-                "demand_level": "medium",
-                "volatility": "medium",
-                "seasonal_patterns": {"peak_months": ["january", "february"], "low_months": ["september", "october"]},
-                "export_potential": "medium",
-                "local_demand": "high"
-            },
-            "tomato": {
-                "current_price": 35,
-                "price_trend": "volatile",
-                "demand_level": "high",
-                "volatility": "very_high",
-                "seasonal_patterns": {"peak_months": ["december", "january"], "low_months": ["june", "july"]},
-                "export_potential": "low",
-                "local_demand": "very_high"
-            },
-            "onion": {
-                "current_price": 28,
-                "price_trend": "increasing",
-                "demand_level": "high",
-                "volatility": "high",
-                "seasonal_patterns": {"peak_months": ["may", "june"], "low_months": ["november", "december"]},
-                "export_potential": "medium",
-                "local_demand": "very_high"
-            }
-        }
-        
-        return crop_market_data.get(crop.lower(), default_data)
+        data = CROP_MARKET_DATA.get(crop.lower(), DEFAULT_MARKET_DATA)
+        store = get_mandi_store()
+        prices = store.analytics(crop, resolve_location(location)) if store else None
+        return {**data, **prices} if prices else data
     
     def _assess_market_accessibility(self, crop: str, location: str) -> Dict:
         """Assess market accessibility for the crop"""
         
-        # Simulate market accessibility analysis
-        location_lower = location.lower()
+        place = resolve_location(location)
+        registry = get_mandi_registry()
+        markets = registry.nearest(crop, place.latitude, place.longitude, NEAREST_MARKETS) if registry and place else []
+        if markets:
+            return self._accessibility_from_markets(markets)
         
-        # Urban areas have better market access
-        urban_indicators = ["mumbai", "delhi", "bangalore", "chennai", "kolkata", "hyderabad", "pune"]
-        is_urban = any(city in location_lower for city in urban_indicators)
+        # No registry (or no mandi trading the crop): urban areas have better market access
+        is_urban = place is not None and place.urban
         
         accessibility_score = 7 if is_urban else 5
         
@@ -152,6 +177,26 @@ class MarketAnalyzer:
             "cold_storage_availability": "high" if is_urban else "medium"
         }
     
+    def _accessibility_from_markets(self, markets: List[Dict]) -> Dict:
+        """Accessibility from the nearest mandis trading the crop"""
+        nearest_km = markets[0]["distance_km"]
+        # 10 next to a market, halving about every 40 km to the nearest one; farther mandis only
+        # add capacity and cold storage, so finding more of them can never lower the score
+        accessibility_score = max(1, min(10, round(10 * 0.5 ** (nearest_km / 40))))
+        
+        within_reach = [market for market in markets if market["distance_km"] <= MARKET_REACH_KM] or markets[:1]
+        capacity = max(market["capacity_tonnes_per_day"] for market in within_reach)
+        cold_stores = sum(market["cold_storage"] for market in within_reach)
+        
+        return {
+            "accessibility_score": accessibility_score,
+            "nearest_market_km": nearest_km,
+            "transportation_cost": "low" if nearest_km <= 15 else "medium" if nearest_km <= 40 else "high",
+            "market_infrastructure": "good" if capacity >= 200 else "fair" if capacity >= 50 else "basic",
+            "cold_storage_availability": "high" if cold_stores >= 2 else "medium" if cold_stores else "low",
+            "nearest_markets": markets
+        }
+    
     def _generate_market_insights(self, market_analysis: Dict, location: str) -> List[str]:
         """Generate overall market insights"""
         insights = []
@@ -180,6 +225,21 @@ class MarketAnalyzer:
         if volatile_crops:
             insights.append(f"Monitor price volatility for: {', '.join(volatile_crops)}")
         
+        # Where prices sit in their three-year range (daily snapshot)
+        for crop, data in market_analysis.items():
+            figures = data.get("price_analytics")
+            if not figures:
+                continue
+            if figures["price_percentile"] >= 80:
+                insights.append(f"{crop.capitalize()} prices are in the top {100 - figures['price_percentile']}% of the last three years "
+                                f"in {figures['region']}: a good time to sell")
+            elif figures["price_percentile"] <= 20:
+                insights.append(f"{crop.capitalize()} prices are near a three-year low in {figures['region']}: consider storage "
+                                f"if available")
+            if figures.get("seasonal_amplitude_pct", 0) >= 20:
+                insights.append(f"{crop.capitalize()} prices usually peak in {figures['peak_month'].title()} and bottom out in "
+                                f"{figures['low_month'].title()} ({figures['seasonal_amplitude_pct']:.0f}% seasonal swing)")
+        
         return insights
     
     def _generate_pricing_strategy(self, market_analysis: Dict) -> Dict:
@@ -263,9 +323,34 @@ class MarketAnalyzer:
         risks.append("Seasonal demand fluctuations may affect prices")
         mitigation_strategies.append("Plan harvest timing to avoid market gluts")
         
+        risk_score = self._price_risk_score(market_analysis)
+        if risk_score is None:
+            risk_level, risk_score = "Medium", 6.5  # Out of 10
+        else:
+            risk_level = "High" if risk_score >= 7 else "Medium" if risk_score >= 4 else "Low"
+        
         return {
             "identified_risks": risks,
             "mitigation_strategies": mitigation_strategies,
-            "overall_risk_level": "Medium",
-            "risk_score": 6.5  # Out of 10
-        }
\ No newline at end of file
+            "overall_risk_level": risk_level,
+            "risk_score": risk_score
+        }
+    
+    def _price_risk_score(self, market_analysis: Dict) -> Optional[float]:
+        """Risk out of 10 from the snapshot's volatility and falling trends, or None without the snapshot"""
+        scores = []
+        for data in market_analysis.values():
+            figures = data.get("price_analytics")
+            if not figures or figures["monthly_volatility_pct"] is None:
+                continue
+            # 20% monthly volatility alone scores 8; a falling trend adds up to 2
+            score = min(figures["monthly_volatility_pct"] / 2.5, 8)
+            trend = figures["trend_per_month_pct"]
+            if trend is not None and trend < 0:
+                score += min(-trend / 5, 2)
+            scores.append(score)
+        if not scores:
+            return None
+        # Concentrated portfolios carry more of each crop's risk
+        diversification = 1.0 if len(market_analysis) >= 3 else 1.15
+        return round(min(10.0, max(1.0, sum(scores) / len(scores) * diversification)), 1)
\ No newline at end of file
@@ -1,13 +1,12 @@
 from typing import Dict, List
 import asyncio
-from data.knowledge_base import get_schemes_data
+from data.catalog import get_knowledge_base
+from data.gazetteer import resolve_location
+from data.records import ScoredScheme
 
 class SchemeFinder:
     """AI agent for finding relevant government schemes and subsidies"""
     
-    def __init__(self):
-        self.schemes_database = get_schemes_data()
-    
     async def find_relevant_schemes(self, farm_details: Dict, adaptation_goals: List[str]) -> Dict:
         """Find government schemes relevant to the farmer's needs"""
         
@@ -31,78 +30,31 @@ class SchemeFinder:
             "scheme_categories": self._categorize_schemes(prioritized_schemes)
         }
     
-    def _filter_eligible_schemes(self, farm_details: Dict) -> List[Dict]:
-        """Filter schemes based on farmer eligibility"""
-        eligible_schemes = []
+    def _filter_eligible_schemes(self, farm_details: Dict) -> int:
+        """Filter schemes based on farmer eligibility (bitset over the catalog's schemes)"""
+        kb = get_knowledge_base()
         
         farm_size = farm_details.get("farm_size", 0)
-        location = farm_details.get("location", "").lower()
+        location = farm_details.get("location", "")
+        place = resolve_location(location)
         
-        for scheme in self.schemes_database:
+        return (
             # Check farm size eligibility
-            if self._check_farm_size_eligibility(scheme, farm_size):
-                # Check location eligibility
-                if self._check_location_eligibility(scheme, location):
-                    eligible_schemes.append(scheme)
-        
-        return eligible_schemes
-    
-    def _check_farm_size_eligibility(self, scheme: Dict, farm_size: float) -> bool:
-        """Check if farm size meets scheme criteria"""
-        size_criteria = scheme.get("eligibility", {}).get("farm_size", {})
-        
-        min_size = size_criteria.get("min", 0)
-        max_size = size_criteria.get("max", float('inf'))
-        
-        return min_size <= farm_size <= max_size
+            kb.scheme_bits_for_farm_size(farm_size)
+            # Check location eligibility (by resolved state; free-text scan if the place is unknown)
+            & (kb.scheme_bits_for_state(place.state) if place else kb.scheme_bits_for_location(location))
+        )
     
-    def _check_location_eligibility(self, scheme: Dict, location: str) -> bool:
-        """Check if location is eligible for the scheme"""
-        location_criteria = scheme.get("eligibility", {}).get("states", [])
-        
-        if not location_criteria:  # National scheme
-            return True
-        
-        # Check if any state matches
-        return any(state.lower() in location for state in location_criteria)
-    
-    def _match_schemes_to_goals(self, schemes: List[Dict], adaptation_goals: List[str]) -> List[Dict]:
+    def _match_schemes_to_goals(self, eligible: int, adaptation_goals: List[str]) -> List[ScoredScheme]:
         """Match schemes to farmer's adaptation goals"""
-        matched_schemes = []
-        
-        for scheme in schemes:
-            scheme_objectives = scheme.get("objectives", [])
-            scheme_categories = scheme.get("categories", [])
-            
-            # Calculate relevance score
-            relevance_score = 0
-            matching_goals = []
-            
-            for goal in adaptation_goals:
-                goal_lower = goal.lower()
-                
-                # Check objectives match
-                for objective in scheme_objectives:
-                    if any(keyword in objective.lower() for keyword in goal_lower.split()):
-                        relevance_score += 2
-                        matching_goals.append(goal)
-                
-                # Check categories match
-                for category in scheme_categories:
-                    if any(keyword in category.lower() for keyword in goal_lower.split()):
-                        relevance_score += 1
-                        if goal not in matching_goals:
-                            matching_goals.append(goal)
-            
-            if relevance_score > 0:
-                scheme_copy = scheme.copy()
-                scheme_copy["relevance_score"] = relevance_score
-                scheme_copy["matching_goals"] = matching_goals
-                matched_schemes.append(scheme_copy)
-        
-        return matched_schemes
+        # BM25 relevance over objectives (weighted 2) and categories (weighted 1), from the inverted index
+        return [
+            ScoredScheme(scheme, relevance_score=relevance_score, matching_goals=matching_goals)
+            for scheme, relevance_score, matching_goals in
+            get_knowledge_base().match_schemes_to_goals(eligible, adaptation_goals)
+        ]
     
-    def _prioritize_schemes(self, schemes: List[Dict], farm_details: Dict) -> List[Dict]:
+    def _prioritize_schemes(self, schemes: List[ScoredScheme], farm_details: Dict) -> List[ScoredScheme]:
         """Prioritize schemes by potential benefit"""
         
         for scheme in schemes:
@@ -124,7 +76,8 @@ class SchemeFinder:
             elif application_complexity == "medium":
                 priority_score += 1
             
-            scheme["priority_score"] = priority_score
+            # relevance_score is a float BM25 score, rounded the same way
+            scheme.priority_score = round(priority_score, 2)
         
         return sorted(schemes, key=lambda x: x.get("priority_score", 0), reverse=True)
     
@@ -0,0 +1,238 @@
+"""
+Process-wide, read-only view of the knowledge base
+Built from knowledge_base.py with lookup indexes so agents query instead of scanning lists;
+rebuilt off the request path and swapped in atomically on reload
+"""
+
+import bisect
+import functools
+import hashlib
+import importlib
+import json
+import threading
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from data import knowledge_base
+from data.crop_table import CropTable
+from data.records import CropRecord, FrozenDict, SchemeRecord, freeze, json_default
+from data.scheme_index import SchemeTextIndex
+
+# Candidate sets are bitsets: bit i of a Python int is set when record i matches,
+# so combining filters is a handful of & / | on ints however large the catalog grows
+
+def _index(records: Tuple[Dict, ...], keys_of) -> Dict[str, int]:
+    """Map each key to the bitset of records carrying it"""
+    positions: Dict[str, List[int]] = {}
+    for position, record in enumerate(records):
+        for key in keys_of(record):
+            positions.setdefault(key, []).append(position)
+    return FrozenDict((key, _to_bits(found, len(records))) for key, found in positions.items())
+
+def _bitset(records: Tuple[Dict, ...], predicate) -> int:
+    return _to_bits([position for position, record in enumerate(records) if predicate(record)], len(records))
+
+def _to_bits(positions: List[int], size: int) -> int:
+    # Packed in one go; OR-ing bit by bit would copy the growing int per record
+    flags = np.zeros(size, dtype=bool)
+    flags[positions] = True
+    return int.from_bytes(np.packbits(flags, bitorder="little").tobytes(), "little")
+
+def bit_positions(bits: int) -> np.ndarray:
+    """Positions of the set bits, ascending (i.e. in catalog order)"""
+    if bits <= 0:
+        return np.empty(0, dtype=np.intp)
+    raw = np.frombuffer(bits.to_bytes((bits.bit_length() + 7) // 8, "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder="little"))
+
+class KnowledgeBase:
+    """Immutable crops, schemes and market data with precomputed indexes"""
+
+    def __init__(self, crops: Iterable[Dict], schemes: Iterable[Dict], market: Dict):
+        self.crops: Tuple[CropRecord, ...] = tuple(CropRecord(crop) for crop in crops)
+        self.schemes: Tuple[SchemeRecord, ...] = tuple(SchemeRecord(scheme) for scheme in schemes)
+        self.market_data: Dict = freeze(market)
+
+        canonical = json.dumps(
+            {"crops": self.crops, "schemes": self.schemes, "market": self.market_data},
+            sort_keys=True, separators=(",", ":"), default=json_default
+        )
+        # Content hash; changes whenever the underlying data does
+        self.fingerprint = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+        # Process-local swap counter, assigned when this instance goes live
+        self.version = 0
+        self.loaded_at: Optional[datetime] = None
+
+        # Crop indexes (values are bitsets over self.crops)
+        self.crops_by_soil = _index(self.crops, lambda crop: crop.get("soil_types", ()))
+        self.crops_by_season = _index(self.crops, lambda crop: (crop.get("season"),))
+        self.crops_by_water_requirement = _index(
+            self.crops, lambda crop: (crop.get("water_requirement", "medium"),)
+        )
+        self.crops_by_climate_zone = _index(self.crops, lambda crop: crop.get("climate_zones", ()))
+        # "risk:level", e.g. "drought:high"
+        self.crops_by_risk_tolerance = _index(
+            self.crops, lambda crop: (f"{risk}:{level}" for risk, level in crop.get("risk_tolerance", {}).items())
+        )
+        self.crops_without_soil_types = _bitset(self.crops, lambda crop: not crop.get("soil_types"))
+        self.crops_without_climate_zones = _bitset(self.crops, lambda crop: not crop.get("climate_zones"))
+        self.crops_by_name = FrozenDict((crop["name"].lower(), crop) for crop in self.crops)
+        # Numeric columns for vectorized scoring, aligned with self.crops
+        self.crop_table = CropTable(self.crops)
+
+        # Scheme indexes (values are bitsets over self.schemes)
+        self.schemes_by_state = _index(
+            self.schemes, lambda scheme: (state.lower() for state in scheme.get("eligibility", {}).get("states", ()))
+        )
+        self.national_schemes = _bitset(self.schemes, lambda scheme: not scheme.get("eligibility", {}).get("states"))
+        self.schemes_by_category = _index(self.schemes, lambda scheme: scheme.get("categories", ()))
+        # Objectives and categories tokenized once, with BM25 weights, for goal matching
+        self.scheme_text = SchemeTextIndex(self.schemes)
+        self._build_farm_size_bands()
+
+    # Crop queries
+
+    def crop_bits_for_soil(self, soil_type: str) -> int:
+        """Crops whose soil list matches the (free-text) soil type, plus soil-agnostic crops"""
+        soil_type = soil_type.lower()
+        bits = self.crops_without_soil_types
+        for soil, crops in self.crops_by_soil.items():
+            if soil in soil_type:
+                bits |= crops
+        return bits
+
+    def crop_bits_for_water_requirements(self, requirements: Iterable[str]) -> int:
+        bits = 0
+        for level in requirements:
+            bits |= self.crops_by_water_requirement.get(level, 0)
+        return bits
+
+    def crop_bits_for_climate(self, location: str, tolerant_to: Iterable[str] = (), level: str = "high") -> int:
+        """Crops whose climate zone appears in the location or that tolerate any of the given risks"""
+        location = location.lower()
+        bits = self.crops_without_climate_zones
+        for zone, crops in self.crops_by_climate_zone.items():
+            if zone in location:
+                bits |= crops
+        for risk in tolerant_to:
+            bits |= self.crops_by_risk_tolerance.get(f"{risk}:{level}", 0)
+        return bits
+
+    def crops_at(self, bits: int) -> List[Dict]:
+        return [self.crops[i] for i in bit_positions(bits)]
+
+    def get_crop(self, name: str) -> Optional[Dict]:
+        return self.crops_by_name.get(name.lower())
+
+    # Scheme queries
+
+    def scheme_bits_for_farm_size(self, farm_size: float) -> int:
+        """Schemes whose min <= farm_size <= max (inclusive, None = no upper limit)"""
+        position = bisect.bisect_left(self._size_bounds, farm_size)
+        if position < len(self._size_bounds) and self._size_bounds[position] == farm_size:
+            return self._size_bands[2 * position + 1]
+        return self._size_bands[2 * position]
+
+    def scheme_bits_for_state(self, state: str) -> int:
+        """National schemes plus those of the given state"""
+        return self.national_schemes | self.schemes_by_state.get(state.lower(), 0)
+
+    def scheme_bits_for_location(self, location: str) -> int:
+        """National schemes plus state schemes whose state is named in the location"""
+        location = location.lower()
+        bits = self.national_schemes
+        for state, schemes in self.schemes_by_state.items():
+            if state in location:
+                bits |= schemes
+        return bits
+
+    def schemes_at(self, bits: int) -> List[Dict]:
+        return [self.schemes[i] for i in bit_positions(bits)]
+
+    def match_schemes_to_goals(self, bits: int, goals: Iterable[str]) -> List[Tuple[Dict, float, List[str]]]:
+        """(scheme, relevance, matching goals) for schemes in bits matching any goal, in catalog order"""
+        return [(self.schemes[position], relevance, matching)
+                for position, relevance, matching in self.scheme_text.match(goals, bit_positions(bits))]
+
+    def _build_farm_size_bands(self):
+        """Precompute eligible schemes for every band between distinct size limits"""
+        limits = []
+        for scheme in self.schemes:
+            size = scheme.get("eligibility", {}).get("farm_size", {})
+            limits.append((size.get("min", 0), size.get("max")))
+
+        bounds = sorted({bound for limit in limits for bound in limit if bound is not None})
+
+        def eligible_at(size: float) -> int:
+            bits = 0
+            for position, (low, high) in enumerate(limits):
+                if low <= size and (high is None or size <= high):
+                    bits |= 1 << position
+            return bits
+
+        # Even slots are the open intervals around the bounds, odd slots the bounds themselves
+        bands = []
+        for position, bound in enumerate(bounds):
+            below = bounds[position - 1] if position else bound - 1
+            bands.append(eligible_at((below + bound) / 2))
+            bands.append(eligible_at(bound))
+        bands.append(eligible_at(bounds[-1] + 1 if bounds else 0))
+
+        self._size_bounds = tuple(bounds)
+        self._size_bands = tuple(bands)
+
+_knowledge_base: Optional[KnowledgeBase] = None
+_version = 0
+_lock = threading.Lock()
+# Set while a plan is being built so every agent sees the same version
+_pinned: ContextVar[Optional[KnowledgeBase]] = ContextVar("pinned_knowledge_base", default=None)
+
+def get_knowledge_base() -> KnowledgeBase:
+    """The KnowledgeBase pinned for the current plan, else the process-wide one (built on first use)"""
+    pinned = _pinned.get()
+    if pinned is not None:
+        return pinned
+    if _knowledge_base is None:
+        with _lock:
+            if _knowledge_base is None:
+                _swap(_build())
+    return _knowledge_base
+
+def reload_knowledge_base() -> Tuple[KnowledgeBase, bool]:
+    """Re-import knowledge_base.py and swap in a rebuilt KnowledgeBase if its data changed
+
+    Blocking; run it off the event loop. Readers never wait: they keep the instance they
+    already hold until the single reference assignment in _swap. Returns (current, swapped).
+    """
+    with _lock:
+        importlib.reload(knowledge_base)
+        rebuilt = _build()
+        if _knowledge_base is not None and rebuilt.fingerprint == _knowledge_base.fingerprint:
+            return _knowledge_base, False
+        _swap(rebuilt)
+        return rebuilt, True
+
+def pin_knowledge_base(func):
+    """Decorator: run an async function against one KnowledgeBase version throughout"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = _pinned.set(get_knowledge_base())
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _pinned.reset(token)
+    return wrapper
+
+def _build() -> KnowledgeBase:
+    return KnowledgeBase(knowledge_base.get_crops_data(), knowledge_base.get_schemes_data(),
+                         knowledge_base.get_market_data())
+
+def _swap(rebuilt: KnowledgeBase):
+    global _knowledge_base, _version
+    _version += 1
+    rebuilt.version = _version
+    rebuilt.loaded_at = datetime.utcnow()
+    _knowledge_base = rebuilt
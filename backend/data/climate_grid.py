@@ -0,0 +1,274 @@
+"""
+Gridded climate history
+Monthly rainfall and maximum-temperature grids, ingested from IMD daily gridded binaries and stored
+cell-major as memory-mapped .npy arrays so one location's series is a single contiguous read;
+risk indicators per grid cell are computed with NumPy and cached
+
+Build with:
+    python -m data.climate_grid --rainfall DIR --tmax DIR [--out DIR]
+(DIR holds one IMD .grd file per year, with the year in the file name); a running server picks up
+a rebuilt grid on its next reference-data reload
+"""
+
+import calendar
+import json
+import os
+import re
+import sys
+import threading
+from datetime import datetime
+from functools import lru_cache
+from glob import glob
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from data.publish import current_directory, publish_directory, staging_directory
+
+# Bump when the on-disk layout changes
+FORMAT_VERSION = 1
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CLIMATE_DIR = os.getenv("CLIMATE_DATA_DIR", os.path.join(DATA_DIR, "climate"))
+CLIMATE_CACHE_SIZE = int(os.getenv("CLIMATE_CACHE_SIZE", "4096"))
+
+# IMD gridded products: south-west cell centre, spacing (degrees), shape, missing-value marker,
+# and how days are folded into months
+IMD_GRIDS = {
+    "rainfall": {"lat0": 6.5, "lon0": 66.5, "step": 0.25, "nlat": 129, "nlon": 135,
+                 "missing": -999.0, "aggregate": "sum"},
+    "tmax": {"lat0": 7.5, "lon0": 67.5, "step": 1.0, "nlat": 31, "nlon": 31,
+             "missing": 99.9, "aggregate": "mean"},
+}
+
+# Years at the end of the record compared against the rest for trends
+RECENT_YEARS = 10
+# How far (in cells) to look for data when a location falls in an ocean or missing cell
+MAX_CELL_SEARCH = 3
+
+class ClimateGrid:
+    """Read-only, memory-mapped monthly climate series on regular lat/lon grids"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.start_year = self.manifest["start_year"]
+        self.years = self.manifest["years"]
+        self.grids: Dict[str, Dict] = self.manifest["grids"]
+        # (cells, months) per variable; pages are only read for the cells that are asked for
+        self.series = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in self.grids}
+        self.valid = {name: np.load(os.path.join(path, f"{name}_valid.npy")) for name in self.grids}
+        self._profile_cached = lru_cache(maxsize=CLIMATE_CACHE_SIZE)(self._compute_profile)
+
+    def cell(self, variable: str, latitude: float, longitude: float) -> Optional[int]:
+        """Index of the grid cell holding the point, or the nearest cell with data"""
+        grid = self.grids[variable]
+        row = int(round((latitude - grid["lat0"]) / grid["step"]))
+        col = int(round((longitude - grid["lon0"]) / grid["step"]))
+        valid = self.valid[variable]
+        # Rings of growing radius around the cell
+        for radius in range(MAX_CELL_SEARCH + 1):
+            best = None
+            for r in range(row - radius, row + radius + 1):
+                for c in range(col - radius, col + radius + 1):
+                    if max(abs(r - row), abs(c - col)) != radius:
+                        continue
+                    if 0 <= r < grid["nlat"] and 0 <= c < grid["nlon"] and valid[r, c]:
+                        distance = (r - row) ** 2 + (c - col) ** 2
+                        if best is None or distance < best[0]:
+                            best = (distance, r * grid["nlon"] + c)
+            if best is not None:
+                return best[1]
+        return None
+
+    def profile(self, latitude: float, longitude: float) -> Optional[Dict]:
+        """Risk indicators for the location's cells, or None outside the grids"""
+        cells = tuple(self.cell(variable, latitude, longitude) for variable in ("rainfall", "tmax"))
+        if cells[0] is None and cells[1] is None:
+            return None
+        return self._profile_cached(cells)
+
+    def _compute_profile(self, cells: Tuple[Optional[int], Optional[int]]) -> Dict:
+        rainfall_cell, tmax_cell = cells
+        profile = {"period": f"{self.start_year}-{self.start_year + self.years - 1}"}
+        if rainfall_cell is not None:
+            profile.update(_rainfall_indicators(self._by_year("rainfall", rainfall_cell)))
+        if tmax_cell is not None:
+            profile.update(_temperature_indicators(self._by_year("tmax", tmax_cell)))
+        return profile
+
+    def _by_year(self, variable: str, cell: int) -> np.ndarray:
+        # (years, 12), dropping years with missing months
+        monthly = np.asarray(self.series[variable][cell], dtype=np.float64).reshape(self.years, 12)
+        return monthly[~np.isnan(monthly).any(axis=1)]
+
+    def stats(self) -> Dict:
+        info = self._profile_cached.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "period": f"{self.start_year}-{self.start_year + self.years - 1}",
+            "variables": list(self.grids),
+            "cached_profiles": info.currsize,
+            "hits": info.hits,
+            "misses": info.misses,
+            "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0
+        }
+
+def _rainfall_indicators(monthly: np.ndarray) -> Dict:
+    if len(monthly) < 2:
+        return {}
+    annual = monthly.sum(axis=1)
+    mean = annual.mean()
+    if mean <= 0:
+        return {}
+    recent, baseline = _split(annual)
+    monsoon = monthly[:, 5:9]  # June-September
+    june_share = monthly[:, 5] / np.maximum(monsoon.sum(axis=1), 1e-9)
+    recent_june, baseline_june = _split(june_share)
+    return {
+        "mean_annual_rainfall_mm": float(mean),
+        "rainfall_cv": float(annual.std() / mean),
+        # IMD categories: deficient below -20%, excess above +20% of normal
+        "deficient_year_frequency": float(np.mean(annual < 0.8 * mean)),
+        "excess_year_frequency": float(np.mean(annual > 1.2 * mean)),
+        "rainfall_trend_pct": float((recent.mean() / baseline.mean() - 1) * 100) if baseline.mean() > 0 else 0.0,
+        "june_share_change": float(recent_june.mean() - baseline_june.mean())
+    }
+
+def _temperature_indicators(monthly: np.ndarray) -> Dict:
+    if len(monthly) < 2:
+        return {}
+    annual = monthly.mean(axis=1)
+    recent, baseline = _split(annual)
+    return {
+        "mean_tmax_c": float(annual.mean()),
+        "tmax_interannual_sd_c": float(annual.std()),
+        # Months averaging 38 °C or more in daily maximum
+        "hot_month_frequency": float(np.mean(monthly >= 38.0)),
+        "warming_c": float(recent.mean() - baseline.mean())
+    }
+
+def _split(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(last RECENT_YEARS, everything before); halves for short records"""
+    recent_years = min(RECENT_YEARS, len(values) // 2)
+    return values[-recent_years:], values[:-recent_years]
+
+def build_climate_grid(sources: Dict[str, str], out_dir: str = DEFAULT_CLIMATE_DIR) -> str:
+    """Fold IMD daily grids (variable -> directory of yearly .grd files) into monthly cell-major arrays"""
+    yearly: Dict[str, Dict[int, np.ndarray]] = {}
+    for variable, directory in sources.items():
+        grid = IMD_GRIDS[variable]
+        yearly[variable] = {}
+        for path in sorted(glob(os.path.join(directory, "*"))):
+            match = re.search(r"(19|20)\d{2}", os.path.basename(path))
+            if match and os.path.isfile(path):
+                yearly[variable][int(match.group(0))] = _monthly_from_daily(path, int(match.group(0)), grid)
+        if not yearly[variable]:
+            raise ValueError(f"No yearly {variable} files found in {directory}")
+
+    # One shared calendar: from the earliest to the latest year any variable covers
+    start_year = min(min(years) for years in yearly.values())
+    end_year = max(max(years) for years in yearly.values())
+    years = end_year - start_year + 1
+
+    staging = staging_directory(out_dir)
+    grids = {}
+    for variable, by_year in yearly.items():
+        grid = IMD_GRIDS[variable]
+        cells = grid["nlat"] * grid["nlon"]
+        series = np.full((years * 12, cells), np.nan, dtype=np.float32)
+        for year, monthly in by_year.items():
+            offset = (year - start_year) * 12
+            series[offset:offset + 12] = monthly.reshape(12, cells)
+        # Cell-major: a cell's whole history is contiguous on disk
+        np.save(os.path.join(staging, f"{variable}.npy"), np.ascontiguousarray(series.T))
+        np.save(os.path.join(staging, f"{variable}_valid.npy"),
+                (~np.isnan(series).all(axis=0)).reshape(grid["nlat"], grid["nlon"]))
+        grids[variable] = {key: grid[key] for key in ("lat0", "lon0", "step", "nlat", "nlon")}
+        grids[variable]["years_with_data"] = sorted(by_year)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "created_at": datetime.utcnow().isoformat(),
+        "start_year": start_year,
+        "years": years,
+        "grids": grids
+    }
+    with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return publish_directory(staging, out_dir)
+
+def _monthly_from_daily(path: str, year: int, grid: Dict) -> np.ndarray:
+    """(12, nlat, nlon) monthly totals or means from one year of daily float32 grids"""
+    days = 366 if calendar.isleap(year) else 365
+    daily = np.fromfile(path, dtype="<f4")
+    if daily.size != days * grid["nlat"] * grid["nlon"]:
+        raise ValueError(f"{path}: expected {days} daily {grid['nlat']}x{grid['nlon']} grids")
+    daily = daily.reshape(days, grid["nlat"], grid["nlon"])
+    daily = np.where(np.isclose(daily, grid["missing"]), np.nan, daily)
+
+    month_ends = np.cumsum([calendar.monthrange(year, month)[1] for month in range(1, 13)])
+    monthly = np.empty((12, grid["nlat"], grid["nlon"]), dtype=np.float32)
+    with np.errstate(invalid="ignore"):
+        for month, (start, end) in enumerate(zip(np.concatenate(([0], month_ends[:-1])), month_ends)):
+            days_of_month = daily[start:end]
+            complete = ~np.isnan(days_of_month).any(axis=0)
+            folded = days_of_month.sum(axis=0) if grid["aggregate"] == "sum" else days_of_month.mean(axis=0)
+            monthly[month] = np.where(complete, folded, np.nan)
+    return monthly
+
+def load_climate_grid(climate_dir: str = DEFAULT_CLIMATE_DIR) -> Optional[ClimateGrid]:
+    """Open the climate store, or None if it has not been built"""
+    path = current_directory(climate_dir)
+    if path is None:
+        return None
+    grid = ClimateGrid(path)
+    if grid.manifest.get("format_version") != FORMAT_VERSION:
+        print("⚠️ Climate grid was built by an older version; rebuild it with python -m data.climate_grid")
+        return None
+    return grid
+
+_climate_grid: Optional[ClimateGrid] = None
+_loaded = False
+_lock = threading.Lock()
+
+def get_climate_grid() -> Optional[ClimateGrid]:
+    """The climate store from CLIMATE_DATA_DIR, or None (agents then fall back to regional defaults)"""
+    global _climate_grid, _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                _climate_grid = _open_grid()
+                _loaded = True
+    return _climate_grid
+
+def reload_climate_grid() -> Tuple[Optional[ClimateGrid], bool]:
+    """Reopen the store if a new grid was published; returns (current, swapped)"""
+    global _climate_grid, _loaded
+    with _lock:
+        if _climate_grid is not None and _climate_grid.path == current_directory(DEFAULT_CLIMATE_DIR):
+            _loaded = True
+            return _climate_grid, False
+        grid = _open_grid()
+        swapped = grid is not _climate_grid
+        _climate_grid, _loaded = grid, True
+        return _climate_grid, swapped
+
+def _open_grid() -> Optional[ClimateGrid]:
+    grid = load_climate_grid(DEFAULT_CLIMATE_DIR)
+    if grid is not None:
+        print(f"🌦️ Loaded climate grid ({grid.years} years from {grid.start_year})")
+    return grid
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {flag: args[args.index(flag) + 1] for flag in ("--rainfall", "--tmax", "--out") if flag in args}
+    sources = {variable: options[f"--{variable}"] for variable in IMD_GRIDS if f"--{variable}" in options}
+    if not sources:
+        print("Usage: python -m data.climate_grid --rainfall DIR --tmax DIR [--out DIR]")
+        sys.exit(1)
+    path = build_climate_grid(sources, options.get("--out", DEFAULT_CLIMATE_DIR))
+    grid = ClimateGrid(path)
+    print(f"✅ Climate grid {grid.start_year}-{grid.start_year + grid.years - 1}: "
+          f"{', '.join(grid.grids)} -> {path}")
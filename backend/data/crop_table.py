@@ -0,0 +1,46 @@
+"""
+Columnar view of the crop catalog
+Numeric crop attributes as NumPy columns so agents can score every crop in a few array operations
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+from data.records import CropRecord, RiskLevel
+
+# Risk tolerance levels as stored in the tolerance matrix (RiskLevel codes, 0 = not listed)
+TOLERANCE_LEVELS = tuple(level.label for level in RiskLevel)
+TOLERANCE_CODES = {level.label: int(level) for level in RiskLevel}
+
+class CropTable:
+    """Crop attributes as aligned NumPy columns; row i is crop i of the catalog"""
+
+    def __init__(self, crops: Sequence[CropRecord]):
+        self.size = len(crops)
+        self.market_price = np.array([crop.get("market_price_per_kg", 0) for crop in crops], dtype=np.float64)
+        self.growth_days = np.array([crop.get("growth_duration_days", 120) for crop in crops], dtype=np.float64)
+        self.input_cost = np.array([crop.get("input_cost_per_acre", 0) for crop in crops], dtype=np.float64)
+
+        self.categories = tuple(sorted({crop.get("category", "") for crop in crops}))
+        category_codes = {category: code for code, category in enumerate(self.categories)}
+        self.category = np.array([category_codes[crop.get("category", "")] for crop in crops], dtype=np.int32)
+
+        # crops x risks matrix of tolerance level codes
+        self.risks = tuple(sorted({risk for crop in crops for risk, _ in crop.risk_tolerance or ()}))
+        self.risk_index = {risk: column for column, risk in enumerate(self.risks)}
+        self.tolerance = np.zeros((self.size, len(self.risks)), dtype=np.int8)
+        for row, crop in enumerate(crops):
+            for risk, level in crop.risk_tolerance or ():
+                self.tolerance[row, self.risk_index[risk]] = level
+
+        for column in (self.market_price, self.growth_days, self.input_cost, self.category, self.tolerance):
+            column.setflags(write=False)
+
+    def risk_columns(self, risks: Sequence[str]):
+        """Matrix columns for the given risks, skipping unknown ones (duplicates kept)"""
+        return [self.risk_index[risk] for risk in risks if risk in self.risk_index]
+
+    def category_code(self, category: str) -> int:
+        """Code of a category, or -1 when no crop has it"""
+        return self.categories.index(category) if category in self.categories else -1
@@ -0,0 +1,230 @@
+"""
+Location resolver
+Free-text farm locations resolved to a structured place (state, district, lat/lon) against the
+district/state gazetteer in gazetteer.csv: one Aho-Corasick pass finds every known name, with a
+fuzzy fallback for misspellings; resolutions are cached so every agent in a request shares them
+"""
+
+import csv
+import difflib
+import math
+import os
+import re
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_GAZETTEER_CSV = os.path.join(DATA_DIR, "gazetteer.csv")
+LOCATION_CACHE_SIZE = int(os.getenv("LOCATION_CACHE_SIZE", "4096"))
+
+# How close (difflib ratio) a misspelt name must be to a gazetteer name
+FUZZY_CUTOFF = 0.8
+# Shorter names are too easily confused to match fuzzily
+FUZZY_MIN_LENGTH = 5
+
+EARTH_RADIUS_KM = 6371.0
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+def normalize(text: str) -> str:
+    """Lowercase words separated by single spaces and padded, so names only match whole words"""
+    return f" {' '.join(_NON_WORD.sub(' ', text.lower()).split())} "
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+class Place:
+    """A resolved location; coordinates are the district headquarters, or the state centre"""
+
+    __slots__ = ("state", "district", "latitude", "longitude", "urban")
+
+    def __init__(self, state: str, district: Optional[str], latitude: float, longitude: float, urban: bool = False):
+        for name, value in (("state", state), ("district", district), ("latitude", latitude),
+                            ("longitude", longitude), ("urban", urban)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise TypeError("Place is read-only; resolved places are shared between requests")
+
+    @property
+    def key(self) -> str:
+        """Stable id: "state/district", or just the state for a state centre"""
+        return f"{self.state}/{self.district}" if self.district else self.state
+
+    def distance_km(self, latitude: float, longitude: float) -> float:
+        return haversine_km(self.latitude, self.longitude, latitude, longitude)
+
+    def to_dict(self) -> Dict:
+        return {
+            "state": self.state,
+            "district": self.district,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "urban": self.urban
+        }
+
+    def __repr__(self) -> str:
+        return f"Place({self.district or '-'}, {self.state})"
+
+class NameMatcher:
+    """Aho-Corasick automaton: every occurrence of every pattern in one pass over the text"""
+
+    def __init__(self, patterns: Dict[str, List[int]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (pattern length, payload) for every pattern ending at the node
+        self._out: List[List[Tuple[int, int]]] = [[]]
+
+        for pattern, payloads in patterns.items():
+            node = 0
+            for char in pattern:
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][char] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = child
+            self._out[node].extend((len(pattern), payload) for payload in payloads)
+
+        # Failure links, breadth first; a node also reports what its failure node reports
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """(start, end, payload) for every match, in order of where the match ends"""
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for length, payload in self._out[node]:
+                yield position - length + 1, position + 1, payload
+
+class Gazetteer:
+    """States and districts with their names and aliases, indexed for matching"""
+
+    def __init__(self, path: str = DEFAULT_GAZETTEER_CSV):
+        self.path = path
+        stat = os.stat(path)
+        self.source_stat = (stat.st_size, stat.st_mtime_ns)
+        self.places: List[Place] = []
+        # Normalized name -> places carrying it (several districts share names)
+        self._names: Dict[str, List[int]] = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                district = row["district"].strip() or None
+                place = Place(
+                    row["state"].strip(), district, float(row["latitude"]), float(row["longitude"]),
+                    row["urban"].strip() == "1"
+                )
+                labels = [district or place.state] + [alias for alias in row["aliases"].split("|") if alias.strip()]
+                for label in labels:
+                    self._names.setdefault(normalize(label), []).append(len(self.places))
+                self.places.append(place)
+        self._matcher = NameMatcher(self._names)
+        self._fuzzy_names = [name.strip() for name in self._names if len(name.strip()) >= FUZZY_MIN_LENGTH]
+
+    def resolve(self, location: str) -> Optional[Place]:
+        """Most specific place named in the text, or None"""
+        normalized = normalize(location)
+        matches = sorted(self._matcher.find(normalized))
+        # A name inside a longer one ("jammu" in "jammu and kashmir") is part of it, not a place of its own
+        found = [
+            place_id for start, end, place_id in matches
+            if not any(other_start <= start and end <= other_end and other_end - other_start > end - start
+                       for other_start, other_end, _ in matches)
+        ]
+        if not any(self.places[place_id].district for place_id in found):
+            # No district named exactly: look for a misspelt one (or a misspelt state if nothing matched)
+            states = {self.places[place_id].state for place_id in found}
+            found += [
+                place_id for place_id in self._fuzzy(normalized)
+                if not states or self.places[place_id].state in states
+            ]
+        return self._most_specific([self.places[place_id] for place_id in found])
+
+    def nearest_district(self, latitude: float, longitude: float) -> Optional[Place]:
+        """District whose headquarters is closest to the point"""
+        districts = [place for place in self.places if place.district]
+        return min(districts, key=lambda place: place.distance_km(latitude, longitude), default=None)
+
+    def _fuzzy(self, normalized: str) -> List[int]:
+        words = normalized.split()
+        found = []
+        # Up to three-word names ("east khasi hills"), longest first
+        for size in (3, 2, 1):
+            for start in range(len(words) - size + 1):
+                candidate = " ".join(words[start:start + size])
+                # Exact names were already weighed by the automaton
+                if len(candidate) < FUZZY_MIN_LENGTH or f" {candidate} " in self._names:
+                    continue
+                for name in difflib.get_close_matches(candidate, self._fuzzy_names, n=1, cutoff=FUZZY_CUTOFF):
+                    found.extend(self._names[f" {name} "])
+        return found
+
+    def _most_specific(self, places: List[Place]) -> Optional[Place]:
+        # A district whose state is also named beats any other district, which beats a state
+        states = {place.state for place in places if place.district is None}
+        districts = [place for place in places if place.district is not None]
+        for place in districts:
+            if place.state in states:
+                return place
+        if districts:
+            return districts[0]
+        return places[0] if places else None
+
+_gazetteer: Optional[Gazetteer] = None
+_lock = threading.Lock()
+
+def get_gazetteer() -> Gazetteer:
+    global _gazetteer
+    if _gazetteer is None:
+        with _lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer()
+    return _gazetteer
+
+def resolve_location(location: str) -> Optional[Place]:
+    """Structured place for a free-text location, or None if it names no known state or district"""
+    return _resolve_normalized(normalize(location or ""))
+
+@lru_cache(maxsize=LOCATION_CACHE_SIZE)
+def _resolve_normalized(normalized: str) -> Optional[Place]:
+    return get_gazetteer().resolve(normalized)
+
+def location_cache_stats() -> Dict:
+    info = _resolve_normalized.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "entries": info.currsize,
+        "max_entries": info.maxsize,
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0
+    }
+
+def reload_gazetteer() -> Tuple[Gazetteer, bool]:
+    """Re-read gazetteer.csv if it changed and swap it in; returns (current, swapped)"""
+    global _gazetteer
+    with _lock:
+        stat = os.stat(DEFAULT_GAZETTEER_CSV)
+        if _gazetteer is not None and _gazetteer.source_stat == (stat.st_size, stat.st_mtime_ns):
+            return _gazetteer, False
+        _gazetteer = Gazetteer()
+        # Cached places came from the old file
+        _resolve_normalized.cache_clear()
+        return _gazetteer, True
@@ -263,7 +263,7 @@ def get_schemes_data():
                 "max_limit": 25000
             },
             "eligibility": {
-                "farm_size": {"min": 0, "max": float('inf')},
+                "farm_size": {"min": 0, "max": None},  # No upper limit
                 "states": []
             },
             "application": {
@@ -322,7 +322,7 @@ def get_schemes_data():
                 "max_limit": 50000
             },
             "eligibility": {
-                "farm_size": {"min": 0, "max": float('inf')},
+                "farm_size": {"min": 0, "max": None},  # No upper limit
                 "states": []
             },
             "application": {
@@ -352,7 +352,7 @@ def get_schemes_data():
                 "tenure_years": 5
             },
             "eligibility": {
-                "farm_size": {"min": 0, "max": float('inf')},
+                "farm_size": {"min": 0, "max": None},  # No upper limit
                 "states": []
             },
             "application": {
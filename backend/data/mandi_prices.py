@@ -0,0 +1,415 @@
+"""
+Mandi price store
+Daily wholesale (mandi) prices per crop and market, loaded from local Agmarknet CSV dumps into an
+append-only columnar store: every load writes a new segment of .npy columns sorted by (crop, day),
+so reading a crop over a date range is a binary search plus a contiguous, memory-mapped slice.
+The live segment set is listed in SEGMENTS, replaced atomically, so appends and compactions
+become visible to readers in one step.
+Current price, trend and volatility are computed from the series and cached per (crop, region, day)
+
+Append dumps with:
+    python -m data.mandi_prices FILE.csv [FILE.csv ...] [--out DIR]
+and merge segments (keeping the latest price per crop, market and day) with:
+    python -m data.mandi_prices --compact [--out DIR]
+"""
+
+import csv
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+from datetime import date, datetime
+from functools import lru_cache
+from glob import glob
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from data.gazetteer import Place
+from data.records import freeze
+
+# Bump when the segment layout changes
+FORMAT_VERSION = 1
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MANDI_DIR = os.getenv("MANDI_DATA_DIR", os.path.join(DATA_DIR, "mandi"))
+MANDI_CACHE_SIZE = int(os.getenv("MANDI_CACHE_SIZE", "4096"))
+
+COLUMNS = ("key", "market", "min_price", "max_price", "modal_price")
+# JSON list of the live segments; segment directories not listed there are never read
+SEGMENT_LIST = "SEGMENTS"
+
+# Agmarknet commodity names -> catalog crop names (others are lowercased as they are)
+COMMODITY_ALIASES = {
+    "paddy(dhan)(common)": "rice",
+    "paddy(dhan)(basmati)": "rice",
+    "rice": "rice",
+    "soyabean": "soybean",
+    "cotton": "cotton",
+    "kapas": "cotton",
+    "wheat": "wheat",
+    "maize": "maize",
+    "sugarcane": "sugarcane",
+    "tomato": "tomato",
+    "onion": "onion",
+    "bengal gram(gram)(whole)": "chickpea",
+    "arhar (tur/red gram)(whole)": "pigeon pea",
+    "groundnut": "groundnut",
+    "bajra(pearl millet/cumbu)": "pearl millet",
+    "jowar(sorghum)": "sorghum",
+    "ragi (finger millet)": "finger millet",
+    "mustard": "mustard",
+    "potato": "potato"
+}
+
+# Days of history behind each figure
+CURRENT_DAYS = 7
+TREND_DAYS = 90
+VOLATILITY_DAYS = 30
+SEASONAL_MIN_DAYS = 365
+# Trend slope (share of the price per month) beyond which prices are rising or falling
+TREND_THRESHOLD = 0.02
+# Monthly volatility (std of daily log changes * sqrt(30)) upper bounds for each label
+VOLATILITY_LEVELS = ((0.05, "low"), (0.10, "medium"), (0.20, "high"))
+
+MONTHS = ("january", "february", "march", "april", "may", "june", "july", "august",
+          "september", "october", "november", "december")
+
+_HEADER_NOISE = re.compile(r"(_x0020_|[^a-z0-9])+")
+
+def crop_name(commodity: str) -> str:
+    name = " ".join(commodity.lower().split())
+    return COMMODITY_ALIASES.get(name, name)
+
+def _day_number(day: date) -> int:
+    return day.toordinal()
+
+def read_price_dump(path: str) -> Iterator[Tuple[str, str, str, str, int, float, float, float]]:
+    """(crop, state, district, market, day, min, max, modal price per quintal) from an Agmarknet CSV"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = [_HEADER_NOISE.sub("_", name.strip().lower()).strip("_") for name in next(reader)]
+        column = {name: index for index, name in enumerate(header)}
+        for row in reader:
+            if not row:
+                continue
+            try:
+                arrival = row[column["arrival_date"]].strip()
+                day = datetime.strptime(arrival, "%d/%m/%Y" if "/" in arrival else "%Y-%m-%d").date()
+                prices = [float(row[column[name]]) for name in ("min_price", "max_price", "modal_price")]
+            except (ValueError, IndexError):
+                continue  # Unparseable rows are skipped, as the portal exports some
+            if prices[2] <= 0:
+                continue
+            yield (crop_name(row[column["commodity"]]), row[column["state"]].strip(),
+                   row[column["district"]].strip(), row[column["market"]].strip(), _day_number(day), *prices)
+
+class MandiPriceStore:
+    """Read-only view over the store's segments; new segments need a reload to be seen"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "dictionary.json"), encoding="utf-8") as f:
+            dictionary = json.load(f)
+        self.crops: List[str] = dictionary["crops"]
+        self.crop_ids = {crop: index for index, crop in enumerate(self.crops)}
+        self.markets: List[List[str]] = dictionary["markets"]
+        # Lowercased state/district of every market, as codes for vectorized region filters
+        states = sorted({state.lower() for state, _, _ in self.markets})
+        districts = sorted({(state.lower(), district.lower()) for state, district, _ in self.markets})
+        self.state_codes = {state: code for code, state in enumerate(states)}
+        self.district_codes = {district: code for code, district in enumerate(districts)}
+        self.market_state = np.array([self.state_codes[state.lower()] for state, _, _ in self.markets], dtype=np.int32)
+        self.market_district = np.array(
+            [self.district_codes[(state.lower(), district.lower())] for state, district, _ in self.markets],
+            dtype=np.int32
+        )
+        self.segments = [os.path.join(path, name) for name in segment_names(path)]
+        self.columns = [
+            {name: np.load(os.path.join(segment, f"{name}.npy"), mmap_mode="r") for name in COLUMNS}
+            for segment in self.segments
+        ]
+        self.rows = sum(len(columns["key"]) for columns in self.columns)
+        self.version = tuple(os.path.basename(segment) for segment in self.segments)
+        self._analytics_cached = lru_cache(maxsize=MANDI_CACHE_SIZE)(self._compute_analytics)
+
+    def read_range(self, crop: str, start: date, end: date,
+                   state: Optional[str] = None, district: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(day numbers, modal prices per quintal) of a crop between two dates, inclusive, for a region"""
+        crop_id = self.crop_ids.get(crop)
+        if crop_id is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        low = np.int64((crop_id << 32) | _day_number(start))
+        high = np.int64((crop_id << 32) | _day_number(end))
+        days, prices = [], []
+        for columns in self.columns:
+            keys = columns["key"]
+            first, last = np.searchsorted(keys, low), np.searchsorted(keys, high, side="right")
+            if first == last:
+                continue
+            markets = columns["market"][first:last]
+            if district is not None:
+                code = self.district_codes.get((state.lower(), district.lower()))
+                mask = self.market_district[markets] == code
+            elif state is not None:
+                mask = self.market_state[markets] == self.state_codes.get(state.lower())
+            else:
+                mask = slice(None)
+            days.append(keys[first:last][mask] & 0xFFFFFFFF)
+            prices.append(columns["modal_price"][first:last][mask])
+        if not days:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate(days), np.concatenate(prices)
+
+    def analytics(self, crop: str, place: Optional[Place], day: Optional[date] = None) -> Optional[Dict]:
+        """Price figures for the crop near the place (district, else state, else all markets), or None"""
+        regions = []
+        if place is not None:
+            if place.district:
+                regions.append((place.state, place.district))
+            regions.append((place.state, None))
+        regions.append((None, None))
+        day = day or date.today()
+        for state, district in regions:
+            result = self._analytics_cached(crop.lower(), state, district, day)
+            if result is not None:
+                return result
+        return None
+
+    def _compute_analytics(self, crop: str, state: Optional[str], district: Optional[str], day: date) -> Optional[Dict]:
+        history_start = date.fromordinal(_day_number(day) - 3 * SEASONAL_MIN_DAYS)
+        days, prices = self.read_range(crop, history_start, day, state, district)
+        if len(days) < CURRENT_DAYS:
+            return None
+
+        # One price per day: the mean over the region's markets (and any repeated loads)
+        first_day = int(days.min())
+        offsets = (days - first_day).astype(np.int64)
+        counts = np.bincount(offsets)
+        totals = np.bincount(offsets, weights=prices.astype(np.float64))
+        observed = counts > 0
+        daily = np.where(observed, totals / np.maximum(counts, 1), np.nan)
+        # Days without trading carry the last price forward
+        filled_index = np.maximum.accumulate(np.where(observed, np.arange(len(daily)), 0))
+        daily = daily[filled_index] / 100  # ₹ per quintal -> ₹ per kg
+
+        recent = daily[-TREND_DAYS:]
+        current = float(recent[-CURRENT_DAYS:].mean())
+        # Least-squares slope over the trend window, as a share of the price per month
+        x = np.arange(len(recent), dtype=np.float64)
+        slope = float(np.polyfit(x, recent, 1)[0]) * 30 / current if len(recent) > 1 and current > 0 else 0.0
+        if slope > TREND_THRESHOLD:
+            trend = "increasing"
+        elif slope < -TREND_THRESHOLD:
+            trend = "decreasing"
+        else:
+            trend = "stable"
+
+        # Rolling window of daily log changes; the label comes from the latest window
+        changes = np.diff(np.log(daily[-(TREND_DAYS + 1):]))
+        window = min(VOLATILITY_DAYS, len(changes))
+        volatility = 0.0
+        if window > 1:
+            rolling = np.lib.stride_tricks.sliding_window_view(changes, window).std(axis=1)
+            volatility = float(rolling[-1] * np.sqrt(30))
+        label = next((name for bound, name in VOLATILITY_LEVELS if volatility < bound), "very_high")
+
+        result = {
+            "current_price": round(current, 2),
+            "price_trend": trend,
+            "volatility": label,
+            "price_data": {
+                "region": ", ".join(part for part in (district, state) if part) or "All India",
+                "as_of": date.fromordinal(first_day + int(np.flatnonzero(observed)[-1])).isoformat(),
+                "days": int(observed.sum()),
+                "trend_per_month_pct": round(slope * 100, 1),
+                "monthly_volatility_pct": round(volatility * 100, 1)
+            }
+        }
+        if len(daily) >= SEASONAL_MIN_DAYS:
+            # Calendar months by mean price over the history
+            months = np.array([date.fromordinal(first_day + offset).month - 1 for offset in range(len(daily))])
+            means = np.bincount(months, weights=daily, minlength=12) / np.maximum(np.bincount(months, minlength=12), 1)
+            ranked = np.argsort(means)
+            result["seasonal_patterns"] = {
+                "peak_months": [MONTHS[month] for month in ranked[-2:][::-1]],
+                "low_months": [MONTHS[month] for month in ranked[:2]]
+            }
+        # Shared by every request for the crop and region today
+        return freeze(result)
+
+    def last_day(self) -> Optional[date]:
+        """Latest trading day of any crop, or None for an empty store"""
+        # Keys sort by crop before day, so a segment's last key only holds its last crop's latest day
+        days = [int(np.max(np.asarray(columns["key"]) & 0xFFFFFFFF)) for columns in self.columns if len(columns["key"])]
+        return date.fromordinal(max(days)) if days else None
+
+    def stats(self) -> Dict:
+        info = self._analytics_cached.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "segments": len(self.segments),
+            "rows": self.rows,
+            "crops": len(self.crops),
+            "markets": len(self.markets),
+            "cached_analytics": info.currsize,
+            "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0
+        }
+
+def append_price_dumps(paths: Iterable[str], out_dir: str = DEFAULT_MANDI_DIR) -> Optional[str]:
+    """Load CSV dumps into a new segment; returns its path (None if the dumps held no prices)"""
+    dictionary = _read_dictionary(out_dir)
+    crop_ids = {crop: index for index, crop in enumerate(dictionary["crops"])}
+    market_ids = {tuple(market): index for index, market in enumerate(dictionary["markets"])}
+
+    keys, markets, mins, maxes, modals = [], [], [], [], []
+    for path in paths:
+        for crop, state, district, market, day, min_price, max_price, modal_price in read_price_dump(path):
+            crop_id = crop_ids.get(crop)
+            if crop_id is None:
+                crop_id = crop_ids[crop] = len(dictionary["crops"])
+                dictionary["crops"].append(crop)
+            market_id = market_ids.get((state, district, market))
+            if market_id is None:
+                market_id = market_ids[(state, district, market)] = len(dictionary["markets"])
+                dictionary["markets"].append([state, district, market])
+            keys.append((crop_id << 32) | day)
+            markets.append(market_id)
+            mins.append(min_price)
+            maxes.append(max_price)
+            modals.append(modal_price)
+    if not keys:
+        return None
+
+    # The dictionary only grows, so it is safe to write before the segment that needs it
+    _write_dictionary(out_dir, dictionary)
+    columns = {
+        "key": np.asarray(keys, dtype=np.int64),
+        "market": np.asarray(markets, dtype=np.int32),
+        "min_price": np.asarray(mins, dtype=np.float32),
+        "max_price": np.asarray(maxes, dtype=np.float32),
+        "modal_price": np.asarray(modals, dtype=np.float32)
+    }
+    live = segment_names(out_dir)
+    segment = _write_segment(out_dir, columns)
+    _write_segment_list(out_dir, live + [os.path.basename(segment)])
+    return segment
+
+def compact_price_store(out_dir: str = DEFAULT_MANDI_DIR) -> Optional[str]:
+    """Merge every segment into one, keeping the latest price for each crop, market and day"""
+    store = MandiPriceStore(out_dir)
+    if len(store.segments) < 2:
+        return store.segments[0] if store.segments else None
+    columns = {name: np.concatenate([np.asarray(segment[name]) for segment in store.columns]) for name in COLUMNS}
+    # Later segments come later in the concatenation; a stable sort keeps that order among equal rows
+    order = np.lexsort((columns["market"], columns["key"]))
+    columns = {name: values[order] for name, values in columns.items()}
+    is_last = np.ones(len(order), dtype=bool)
+    is_last[:-1] = (columns["key"][1:] != columns["key"][:-1]) | (columns["market"][1:] != columns["market"][:-1])
+    merged = _write_segment(out_dir, {name: values[is_last] for name, values in columns.items()})
+    # One swap from the old set to the merged segment: readers never see both, or neither
+    _write_segment_list(out_dir, [os.path.basename(merged)])
+    for segment in store.segments:
+        shutil.rmtree(segment, ignore_errors=True)
+    return merged
+
+def segment_names(out_dir: str) -> List[str]:
+    """Names of the live segments, oldest first"""
+    try:
+        with open(os.path.join(out_dir, SEGMENT_LIST), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        # Stores written before the list existed: every segment directory is live
+        return sorted(os.path.basename(path) for path in glob(os.path.join(out_dir, "segment-*")))
+
+def _read_dictionary(out_dir: str) -> Dict:
+    path = os.path.join(out_dir, "dictionary.json")
+    if not os.path.exists(path):
+        return {"format_version": FORMAT_VERSION, "crops": [], "markets": []}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_dictionary(out_dir: str, dictionary: Dict):
+    os.makedirs(out_dir, exist_ok=True)
+    fd, staging = tempfile.mkstemp(prefix=".dictionary-", dir=out_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(dictionary, f, ensure_ascii=False)
+    os.replace(staging, os.path.join(out_dir, "dictionary.json"))
+
+def _write_segment_list(out_dir: str, segments: List[str]):
+    fd, staging = tempfile.mkstemp(prefix=f".{SEGMENT_LIST}-", dir=out_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(segments, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(staging, os.path.join(out_dir, SEGMENT_LIST))
+
+def _write_segment(out_dir: str, columns: Dict[str, np.ndarray]) -> str:
+    """Write an unlisted segment; it is read once _write_segment_list names it"""
+    # Sorted by (crop, day) so a crop's date range is contiguous
+    order = np.argsort(columns["key"], kind="stable")
+    staging = tempfile.mkdtemp(prefix=".segment-", dir=out_dir)
+    for name in COLUMNS:
+        np.save(os.path.join(staging, f"{name}.npy"), columns[name][order])
+    # Unlisted directories (a compaction's leftovers, a crashed append) still hold their numbers
+    existing = [int(os.path.basename(path).split("-")[1]) for path in glob(os.path.join(out_dir, "segment-*"))]
+    segment = os.path.join(out_dir, f"segment-{max(existing, default=0) + 1:06d}")
+    os.replace(staging, segment)
+    return segment
+
+_store: Optional[MandiPriceStore] = None
+_loaded = False
+_lock = threading.Lock()
+
+def get_mandi_store() -> Optional[MandiPriceStore]:
+    """The price store in MANDI_DATA_DIR, or None if no dumps were loaded (catalog prices are used)"""
+    global _store, _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                _store = _open_store()
+                _loaded = True
+    return _store
+
+def reload_mandi_store() -> Tuple[Optional[MandiPriceStore], bool]:
+    """Reopen the store if segments were added or merged; returns (current, swapped)"""
+    global _store, _loaded
+    with _lock:
+        segments = tuple(segment_names(DEFAULT_MANDI_DIR))
+        if (_store.version if _store else ()) == segments:
+            _loaded = True
+            return _store, False
+        _store = _open_store()
+        _loaded = True
+        return _store, True
+
+def _open_store() -> Optional[MandiPriceStore]:
+    dictionary = _read_dictionary(DEFAULT_MANDI_DIR)
+    if not segment_names(DEFAULT_MANDI_DIR):
+        return None
+    if dictionary.get("format_version") != FORMAT_VERSION:
+        print("⚠️ Mandi price store was written by an older version; reload the dumps into a new store")
+        return None
+    try:
+        store = MandiPriceStore(DEFAULT_MANDI_DIR)
+    except FileNotFoundError:
+        # A compaction swapped the list and removed the old segments while they were being opened
+        store = MandiPriceStore(DEFAULT_MANDI_DIR)
+    print(f"📈 Loaded mandi prices ({store.rows} rows, {len(store.crops)} crops, {len(store.markets)} markets)")
+    return store
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    out_dir = args[args.index("--out") + 1] if "--out" in args else DEFAULT_MANDI_DIR
+    if "--compact" in args:
+        print(f"✅ Compacted into {compact_price_store(out_dir)}")
+        sys.exit(0)
+    dumps = [arg for index, arg in enumerate(args) if arg != "--out" and (index == 0 or args[index - 1] != "--out")]
+    if not dumps:
+        print("Usage: python -m data.mandi_prices FILE.csv [FILE.csv ...] [--out DIR] | --compact [--out DIR]")
+        sys.exit(1)
+    segment = append_price_dumps(dumps, out_dir)
+    print(f"✅ Appended {segment}" if segment else "No prices found in the dumps")
@@ -0,0 +1,183 @@
+"""
+Mandi registry
+Wholesale markets with their coordinates, the commodities they trade and their capacity, from a
+local CSV (MANDI_REGISTRY_CSV). Each commodity gets its own grid index (equal-degree cells), so
+the k nearest markets trading a crop are found by searching rings of cells outward
+
+CSV columns: market, state, district, latitude, longitude, commodities (| separated; Agmarknet or
+catalog names), capacity_tonnes_per_day, cold_storage (1/0)
+"""
+
+import csv
+import math
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from data.gazetteer import EARTH_RADIUS_KM
+from data.mandi_prices import crop_name
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_REGISTRY_CSV = os.getenv("MANDI_REGISTRY_CSV", os.path.join(DATA_DIR, "mandis.csv"))
+
+# Grid cell size in degrees (~55 km of latitude)
+CELL_DEGREES = 0.5
+# Give up on rings beyond this (the search then covers the whole country)
+MAX_RINGS = 80
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+class GridIndex:
+    """Point indexes bucketed by grid cell, for nearest-neighbour search in growing rings"""
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray, ids: np.ndarray):
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for point in ids.tolist():
+            buckets[self._cell(latitudes[point], longitudes[point])].append(point)
+        self.cells = {cell: np.asarray(points, dtype=np.int32) for cell, points in buckets.items()}
+        self.size = len(ids)
+
+    @staticmethod
+    def _cell(latitude: float, longitude: float) -> Tuple[int, int]:
+        return int(math.floor(latitude / CELL_DEGREES)), int(math.floor(longitude / CELL_DEGREES))
+
+    def nearest(self, latitude: float, longitude: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(point ids, distances in km) of the k nearest points, closest first"""
+        row, col = self._cell(latitude, longitude)
+        found: List[np.ndarray] = []
+        count = 0
+        best_ids, best_km = np.empty(0, dtype=np.int32), np.empty(0)
+        for ring in range(MAX_RINGS + 1):
+            for cell in self._ring(row, col, ring):
+                points = self.cells.get(cell)
+                if points is not None:
+                    found.append(points)
+                    count += len(points)
+            if count >= min(k, self.size) and count:
+                best_ids = np.concatenate(found)
+                best_km = _haversine_km(latitude, longitude, self.latitudes[best_ids], self.longitudes[best_ids])
+                order = np.argsort(best_km)[:k]
+                best_ids, best_km = best_ids[order], best_km[order]
+                # Anything outside the rings searched so far is at least this far away
+                if count == self.size or best_km[-1] <= self._outside_km(latitude, longitude, ring):
+                    break
+        return best_ids, best_km
+
+    @staticmethod
+    def _ring(row: int, col: int, ring: int):
+        if ring == 0:
+            yield row, col
+            return
+        for offset in range(-ring, ring + 1):
+            yield row - ring, col + offset
+            yield row + ring, col + offset
+        for offset in range(-ring + 1, ring):
+            yield row + offset, col - ring
+            yield row + offset, col + ring
+
+    @staticmethod
+    def _outside_km(latitude: float, longitude: float, ring: int) -> float:
+        # Distance from the point to the edge of the searched block, in its narrowest direction
+        row_low = math.floor(latitude / CELL_DEGREES) - ring
+        col_low = math.floor(longitude / CELL_DEGREES) - ring
+        margins = (
+            latitude - row_low * CELL_DEGREES,
+            (row_low + 2 * ring + 1) * CELL_DEGREES - latitude,
+        )
+        lon_margins = (
+            longitude - col_low * CELL_DEGREES,
+            (col_low + 2 * ring + 1) * CELL_DEGREES - longitude,
+        )
+        # Meridians converge: use the widest latitude the block reaches
+        widest = min(abs(latitude) + (ring + 1) * CELL_DEGREES, 89.0)
+        return min(min(margins) * KM_PER_DEGREE, min(lon_margins) * KM_PER_DEGREE * math.cos(math.radians(widest)))
+
+def _haversine_km(latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+class MandiRegistry:
+    """Markets loaded from the registry CSV, with one grid index per commodity"""
+
+    def __init__(self, path: str = DEFAULT_REGISTRY_CSV):
+        self.path = path
+        stat = os.stat(path)
+        self.source_stat = (stat.st_size, stat.st_mtime_ns)
+        names, latitudes, longitudes, capacities, cold_storage = [], [], [], [], []
+        by_crop: Dict[str, List[int]] = defaultdict(list)
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                market_id = len(names)
+                names.append((row["market"].strip(), row["district"].strip(), row["state"].strip()))
+                latitudes.append(float(row["latitude"]))
+                longitudes.append(float(row["longitude"]))
+                capacities.append(float(row.get("capacity_tonnes_per_day") or 0))
+                cold_storage.append((row.get("cold_storage") or "").strip() == "1")
+                for commodity in {crop_name(name) for name in row["commodities"].split("|") if name.strip()}:
+                    by_crop[commodity].append(market_id)
+        self.names = names
+        self.latitudes = np.asarray(latitudes)
+        self.longitudes = np.asarray(longitudes)
+        self.capacities = np.asarray(capacities)
+        self.cold_storage = np.asarray(cold_storage, dtype=bool)
+        self.indexes = {
+            crop: GridIndex(self.latitudes, self.longitudes, np.asarray(ids, dtype=np.int32))
+            for crop, ids in by_crop.items()
+        }
+
+    def nearest(self, crop: str, latitude: float, longitude: float, k: int = 3) -> List[Dict]:
+        """The k nearest markets trading the crop, closest first (empty if none trades it)"""
+        index = self.indexes.get(crop_name(crop))
+        if index is None:
+            return []
+        ids, distances = index.nearest(latitude, longitude, k)
+        return [
+            {
+                "market": self.names[market][0],
+                "district": self.names[market][1],
+                "state": self.names[market][2],
+                "distance_km": round(float(distance), 1),
+                "capacity_tonnes_per_day": float(self.capacities[market]),
+                "cold_storage": bool(self.cold_storage[market])
+            }
+            for market, distance in zip(ids.tolist(), distances.tolist())
+        ]
+
+    def stats(self) -> Dict:
+        return {"markets": len(self.names), "commodities": len(self.indexes)}
+
+_registry: Optional[MandiRegistry] = None
+_loaded = False
+_lock = threading.Lock()
+
+def get_mandi_registry() -> Optional[MandiRegistry]:
+    """The registry from MANDI_REGISTRY_CSV, or None without one (accessibility uses urban/rural defaults)"""
+    global _registry, _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                if os.path.exists(DEFAULT_REGISTRY_CSV):
+                    _registry = MandiRegistry()
+                    print(f"🏪 Loaded mandi registry ({len(_registry.names)} markets)")
+                _loaded = True
+    return _registry
+
+def reload_mandi_registry() -> Tuple[Optional[MandiRegistry], bool]:
+    """Re-read the registry CSV if it changed and swap it in; returns (current, swapped)"""
+    global _registry, _loaded
+    with _lock:
+        if not os.path.exists(DEFAULT_REGISTRY_CSV):
+            swapped = _registry is not None
+            _registry, _loaded = None, True
+            return None, swapped
+        stat = os.stat(DEFAULT_REGISTRY_CSV)
+        if _registry is not None and _registry.source_stat == (stat.st_size, stat.st_mtime_ns):
+            return _registry, False
+        _registry, _loaded = MandiRegistry(), True
+        return _registry, True
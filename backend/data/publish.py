@@ -0,0 +1,69 @@
+"""
+Versioned publishing of batch-built data directories
+A build writes into a staging directory inside out_dir, which is renamed to a new version and made
+current by atomically replacing out_dir/CURRENT. Readers resolve CURRENT, so they always open a
+complete build; the previous version is kept for readers that resolved CURRENT just before a swap
+"""
+
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Optional
+
+POINTER = "CURRENT"
+
+def staging_directory(out_dir: str) -> str:
+    """A fresh directory to build into (same filesystem as out_dir, so the rename is atomic)"""
+    os.makedirs(out_dir, exist_ok=True)
+    return tempfile.mkdtemp(prefix=".staging-", dir=out_dir)
+
+def publish_directory(staging: str, out_dir: str) -> str:
+    """Make a fully written staging directory the current version of out_dir; returns its path"""
+    version = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    target = os.path.join(out_dir, version)
+    previous = current_directory(out_dir)
+    # Flushed before the pointer can reference it, so a crash never leaves CURRENT on a partial build
+    for name in os.listdir(staging):
+        _fsync(os.path.join(staging, name))
+    os.replace(staging, target)
+
+    fd, pointer = tempfile.mkstemp(prefix=f".{POINTER}-", dir=out_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer, os.path.join(out_dir, POINTER))
+    _fsync(out_dir)
+
+    # Keep the new version and the one CURRENT named before the swap; anything older is unreferenced
+    keep = {version, os.path.basename(previous) if previous else None}
+    for entry in os.listdir(out_dir):
+        if entry.startswith(".") or entry == POINTER or entry in keep:
+            continue
+        if os.path.isdir(os.path.join(out_dir, entry)):
+            shutil.rmtree(os.path.join(out_dir, entry), ignore_errors=True)
+    return target
+
+def current_directory(out_dir: str) -> Optional[str]:
+    """Path of the current version of out_dir, or None if nothing was published"""
+    try:
+        with open(os.path.join(out_dir, POINTER), encoding="utf-8") as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    path = os.path.join(out_dir, version)
+    return path if version and os.path.isdir(path) else None
+
+def _fsync(path: str):
+    # Directories cannot be opened on every platform; their entries are then flushed by the OS
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
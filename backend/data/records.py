@@ -0,0 +1,254 @@
+"""
+Compact catalog records
+Crops and schemes as slotted, read-only records with integer-coded enums; they still read like the
+dicts they replace (record["name"], record.get(...)) and export to the same JSON
+"""
+
+import sys
+from collections.abc import Mapping
+from enum import IntEnum
+from typing import Dict, Tuple
+
+class FrozenDict(dict):
+    """A dict that refuses mutation; still a dict for JSON encoding and .copy()"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("KnowledgeBase records are read-only; use .copy() to modify")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+def freeze(value):
+    """Recursively turn dicts into FrozenDicts and lists into tuples"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+class Coded(IntEnum):
+    """Integer-coded vocabulary; the label is the lowercase string used in the data and JSON"""
+
+    @property
+    def label(self) -> str:
+        return self.name.lower()
+
+    @classmethod
+    def parse(cls, label: str) -> "Coded":
+        member = cls.__members__.get(label.upper())
+        if member is None:
+            raise ValueError(f"Unknown {cls.__name__} {label!r}")
+        return member
+
+class RiskLevel(Coded):
+    # Codes double as the crop table's tolerance matrix values (0 = not listed)
+    NONE = 0
+    LOW = 1
+    MEDIUM = 2
+    HIGH = 3
+    VERY_HIGH = 4
+
+class Season(Coded):
+    KHARIF = 0
+    RABI = 1
+    SUMMER = 2
+    BOTH = 3
+
+class SoilType(Coded):
+    CLAY = 0
+    LOAMY = 1
+    SANDY = 2
+    BLACK = 3
+
+class WaterRequirement(Coded):
+    LOW = 0
+    MEDIUM = 1
+    HIGH = 2
+
+EMPTY = FrozenDict()
+
+# Equal field values (zone lists, risk profiles, prices...) repeat across thousands of records,
+# so each distinct (field, raw value) is converted once and the result shared by every record
+_converted: Dict = {}
+
+def _convert_shared(field: str, value, convert):
+    # The type keeps e.g. 1 and 1.0 (equal, same hash) apart
+    raw = tuple(value.items()) if isinstance(value, dict) else tuple(value) if isinstance(value, list) else value
+    key = (field, type(value), raw)
+    try:
+        return _converted[key]
+    except KeyError:
+        converted = _converted[key] = convert(field, value)
+        return converted
+    except TypeError:  # Nested dicts/lists: not hashable, converted per record
+        return convert(field, value)
+
+class Record(Mapping):
+    """Base for slotted catalog records; None in a field means the key is absent"""
+
+    __slots__ = ("extra",)
+    FIELDS: Tuple[str, ...] = ()
+    # String fields holding enum labels rather than free text
+    CODED: frozenset = frozenset()
+
+    def __init__(self, data: Dict):
+        extra = dict(data)
+        for field in self.FIELDS:
+            value = extra.pop(field, None)
+            if value is not None:
+                if isinstance(value, str) and field not in self.CODED:
+                    value = sys.intern(value)
+                else:
+                    value = _convert_shared(field, value, self._import)
+            object.__setattr__(self, field, value)
+        # Keys the record type does not know about, kept as-is
+        object.__setattr__(self, "extra", freeze(extra) if extra else EMPTY)
+
+    def __setattr__(self, name, value):
+        raise TypeError(f"{type(self).__name__} is read-only; use .copy() to modify")
+
+    def _import(self, field: str, value):
+        if isinstance(value, (list, tuple)):
+            return tuple(sys.intern(item) if isinstance(item, str) else freeze(item) for item in value)
+        return freeze(value)
+
+    def _export(self, field: str, value):
+        return value
+
+    def __getitem__(self, key: str):
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return self._export(key, value)
+        return self.extra[key]
+
+    def __iter__(self):
+        for field in self.FIELDS:
+            if getattr(self, field) is not None:
+                yield field
+        yield from self.extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict:
+        return {key: self[key] for key in self}
+
+    def copy(self) -> Dict:
+        """A mutable dict with the same content"""
+        return self.to_dict()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+class CropRecord(Record):
+    """One crop of the catalog; soils, season, water and risk levels are enum-coded"""
+
+    FIELDS = (
+        "name", "category", "climate_zones", "soil_types", "water_requirement", "season",
+        "planting_months", "growth_duration_days", "yield_per_acre_kg", "market_price_per_kg",
+        "input_cost_per_acre", "risk_tolerance"
+    )
+    __slots__ = FIELDS
+    CODED = frozenset({"water_requirement", "season"})
+
+    def _import(self, field: str, value):
+        if field == "soil_types":
+            return tuple(SoilType.parse(soil) for soil in value)
+        if field == "water_requirement":
+            return WaterRequirement.parse(value)
+        if field == "season":
+            return Season.parse(value)
+        if field == "risk_tolerance":
+            # (risk, level) pairs; far smaller than a dict per crop
+            return tuple((sys.intern(risk), RiskLevel.parse(level)) for risk, level in value.items())
+        return super()._import(field, value)
+
+    def _export(self, field: str, value):
+        if field == "soil_types":
+            return tuple(soil.label for soil in value)
+        if field in ("water_requirement", "season"):
+            return value.label
+        if field == "risk_tolerance":
+            return FrozenDict((risk, level.label) for risk, level in value)
+        return value
+
+    def tolerance(self, risk: str) -> RiskLevel:
+        for name, level in self.risk_tolerance or ():
+            if name == risk:
+                return level
+        return RiskLevel.NONE
+
+class SchemeRecord(Record):
+    """One government scheme; nested sections stay frozen dicts"""
+
+    FIELDS = (
+        "name", "description", "categories", "objectives", "subsidy", "loan",
+        "eligibility", "application", "required_documents"
+    )
+    __slots__ = FIELDS
+
+class RecordView(Mapping):
+    """A record plus per-request fields, without copying the record"""
+
+    __slots__ = ("record",)
+    FIELDS: Tuple[str, ...] = ()
+
+    def __init__(self, record: Record, **fields):
+        self.record = record
+        for field in self.FIELDS:
+            setattr(self, field, fields.get(field))
+
+    def __getattr__(self, name: str):
+        # Only reached for names not on the view itself: read through to the record
+        if name == "record":
+            raise AttributeError(name)
+        return getattr(self.record, name)
+
+    def __getitem__(self, key: str):
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return value
+        return self.record[key]
+
+    def __iter__(self):
+        yield from self.record
+        for field in self.FIELDS:
+            if getattr(self, field) is not None:
+                yield field
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict:
+        return {key: self[key] for key in self}
+
+    def copy(self) -> Dict:
+        return self.to_dict()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+class ScoredCrop(RecordView):
+    """A recommended crop: the catalog record with its score and reason for this farm"""
+
+    FIELDS = ("suitability_score", "recommendation_reason")
+    __slots__ = FIELDS
+
+class ScoredScheme(RecordView):
+    """A matched scheme: the catalog record with its relevance and priority for this farmer"""
+
+    FIELDS = ("relevance_score", "matching_goals", "priority_score")
+    __slots__ = FIELDS
+
+def json_default(value):
+    """json.dumps hook: records and views export as plain dicts"""
+    if isinstance(value, (Record, RecordView)):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,101 @@
+"""
+Inverted index over scheme objectives and categories
+Terms are tokenized once per catalog build and carry precomputed BM25 weights, so matching a goal
+is a lookup of its words' posting lists plus a sum, instead of scanning every scheme's text
+"""
+
+import bisect
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from data.records import SchemeRecord
+
+# BM25 term-frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+# Field weights: an objective match counts twice a category match
+FIELD_WEIGHTS = {"objectives": 2.0, "categories": 1.0}
+# Goal words at least this long also match longer terms they prefix ("water" -> "watershed")
+MIN_PREFIX_LENGTH = 4
+
+STOP_WORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "it", "its",
+    "my", "of", "on", "or", "our", "the", "their", "to", "with"
+))
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric words without stop words ("water_management" -> water, management)"""
+    return [word for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOP_WORDS]
+
+class SchemeTextIndex:
+    """Term -> (scheme positions, BM25 weights), aligned with the catalog's schemes"""
+
+    def __init__(self, schemes: Sequence[SchemeRecord]):
+        self.size = len(schemes)
+        fields = {
+            field: [Counter(token for text in scheme.get(field) or () for token in tokenize(text)) for scheme in schemes]
+            for field in FIELD_WEIGHTS
+        }
+
+        # Documents are whole schemes (all fields) for document frequency
+        document_frequency: Counter = Counter()
+        for position in range(self.size):
+            document_frequency.update({term for field in fields.values() for term in field[position]})
+
+        weights: Dict[str, Dict[int, float]] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            lengths = [sum(counts.values()) for counts in fields[field]]
+            average = sum(lengths) / self.size if self.size and any(lengths) else 1.0
+            for position, counts in enumerate(fields[field]):
+                norm = K1 * (1 - B + B * lengths[position] / average)
+                for term, frequency in counts.items():
+                    postings = weights.setdefault(term, {})
+                    postings[position] = postings.get(position, 0.0) + weight * frequency * (K1 + 1) / (frequency + norm)
+
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, postings in weights.items():
+            n = document_frequency[term]
+            idf = math.log(1 + (self.size - n + 0.5) / (n + 0.5))
+            positions = np.fromiter(sorted(postings), dtype=np.intp, count=len(postings))
+            self.postings[term] = (positions, np.array([postings[p] * idf for p in positions.tolist()]))
+        # Sorted vocabulary for prefix lookups
+        self.terms = tuple(sorted(self.postings))
+
+    def _expand(self, word: str) -> List[str]:
+        if len(word) < MIN_PREFIX_LENGTH:
+            return [word] if word in self.postings else []
+        start = bisect.bisect_left(self.terms, word)
+        end = bisect.bisect_left(self.terms, word + "\uffff", start)
+        return list(self.terms[start:end])
+
+    def score(self, goal: str) -> np.ndarray:
+        """BM25 score of every scheme for one goal (0 where none of its words occur)"""
+        scores = np.zeros(self.size)
+        for word in dict.fromkeys(tokenize(goal)):
+            # A word matching several terms (by prefix) counts its best one per scheme
+            word_scores = np.zeros(self.size)
+            for term in self._expand(word):
+                positions, weights = self.postings[term]
+                np.maximum.at(word_scores, positions, weights)
+            scores += word_scores
+        return scores
+
+    def match(self, goals: Iterable[str], candidates: np.ndarray) -> List[Tuple[int, float, List[str]]]:
+        """(position, relevance, matching goals) of the candidate schemes matching any goal, in catalog order"""
+        goals = list(dict.fromkeys(goals))
+        if not goals or not len(candidates):
+            return []
+        # goals x candidates
+        scores = np.stack([self.score(goal)[candidates] for goal in goals])
+        totals = scores.sum(axis=0)
+        hits = np.flatnonzero(totals > 0)
+        return [
+            (position, round(total, 2), [goal for goal, found in zip(goals, found_goals) if found])
+            for position, total, found_goals in zip(
+                candidates[hits].tolist(), totals[hits].tolist(), (scores[:, hits] > 0).T.tolist()
+            )
+        ]
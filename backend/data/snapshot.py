@@ -0,0 +1,233 @@
+"""
+Versioned binary snapshot of the crop variety tables
+crops.csv (plus regional variety CSVs in data/varieties/, same schema) and soil_types.csv are parsed once
+into .npy columns that the service memory-maps at startup instead of re-parsing
+
+Build manually with:
+    python -m data.snapshot [--out DIR] [crops.csv ...]
+"""
+
+import csv
+import hashlib
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+from glob import glob
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data.publish import current_directory, publish_directory, staging_directory
+
+# Bump when the on-disk layout changes; older snapshots are rebuilt
+FORMAT_VERSION = 1
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CROP_CSVS = [os.path.join(DATA_DIR, "crops.csv")]
+DEFAULT_VARIETY_GLOB = os.path.join(DATA_DIR, "varieties", "*.csv")
+DEFAULT_SOIL_CSV = os.path.join(DATA_DIR, "soil_types.csv")
+DEFAULT_SNAPSHOT_DIR = os.getenv("CROP_SNAPSHOT_DIR", os.path.join(DATA_DIR, "snapshots"))
+
+# Numeric columns: CSV header -> (column name, dtype)
+NUMERIC_COLUMNS = {
+    "water_requirement_mm": ("water_requirement_mm", np.float32),
+    "duration_days": ("duration_days", np.int32),
+    "expected_yield_quintal_per_hectare": ("yield_quintal_per_hectare", np.float32),
+    "market_price_inr_per_quintal": ("price_inr_per_quintal", np.float32),
+}
+# Categorical columns: CSV header -> column name (stored as int16 codes + vocabulary)
+CATEGORICAL_COLUMNS = {
+    "suitable_soil": "soil",
+    "season": "season",
+}
+
+class CropVarietySnapshot:
+    """Read-only, memory-mapped crop variety table"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.version = self.manifest["version"]
+        self.rows = self.manifest["rows"]
+        self.vocabularies: Dict[str, List[str]] = self.manifest["vocabularies"]
+        self.soils: List[Dict] = self.manifest["soils"]
+        # Pages are only read when touched, so memory stays flat as the table grows
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.load(os.path.join(path, spec["file"]), mmap_mode="r")
+            for name, spec in self.manifest["columns"].items()
+        }
+
+    def name(self, row: int) -> str:
+        offsets = self.columns["name_offsets"]
+        return bytes(self.columns["names"][offsets[row]:offsets[row + 1]]).decode("utf-8")
+
+    def record(self, row: int) -> Dict:
+        record = {"name": self.name(row)}
+        for column in CATEGORICAL_COLUMNS.values():
+            record[column] = self.vocabularies[column][self.columns[column][row]]
+        for column, dtype in NUMERIC_COLUMNS.values():
+            value = self.columns[column][row]
+            record[column] = int(value) if np.issubdtype(dtype, np.integer) else float(value)
+        return record
+
+    def find(self, soil: Optional[str] = None, season: Optional[str] = None,
+             limit: int = 50, offset: int = 0) -> Dict:
+        """Rows matching an optional soil and season (case-insensitive), paginated"""
+        mask = np.ones(self.rows, dtype=bool)
+        for column, value in (("soil", soil), ("season", season)):
+            if value:
+                codes = [code for code, label in enumerate(self.vocabularies[column]) if label.lower() == value.lower()]
+                mask &= np.isin(self.columns[column], codes)
+        matches = np.flatnonzero(mask)
+        return {
+            "total": int(len(matches)),
+            "items": [self.record(int(row)) for row in matches[offset:offset + limit]]
+        }
+
+def build_snapshot(crop_csvs: Sequence[str], soil_csv: str, out_dir: str) -> str:
+    """Parse the CSVs into a new snapshot under out_dir and make it current; returns its path"""
+    sources = [path for path in [*crop_csvs, soil_csv] if os.path.exists(path)]
+    digest = hashlib.sha256(f"format:{FORMAT_VERSION}".encode("utf-8"))
+    for path in sources:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    version = digest.hexdigest()[:16]
+    # Unchanged content (e.g. a touched CSV) is already published: never rewrite a live version
+    current = load_snapshot(out_dir)
+    if current is not None and current.version == version:
+        return current.path
+
+    names: List[bytes] = []
+    numeric: Dict[str, List] = {column: [] for column, _ in NUMERIC_COLUMNS.values()}
+    categorical: Dict[str, List[str]] = {column: [] for column in CATEGORICAL_COLUMNS.values()}
+    for path in crop_csvs:
+        if not os.path.exists(path):
+            continue
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                names.append(row["crop_name"].strip().encode("utf-8"))
+                for header, (column, _) in NUMERIC_COLUMNS.items():
+                    numeric[column].append(float(row[header] or 0))
+                for header, column in CATEGORICAL_COLUMNS.items():
+                    categorical[column].append(row[header].strip())
+
+    columns: Dict[str, np.ndarray] = {}
+    # Names as one UTF-8 blob plus row offsets
+    offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum([len(name) for name in names], out=offsets[1:])
+    columns["names"] = np.frombuffer(b"".join(names), dtype=np.uint8)
+    columns["name_offsets"] = offsets
+    for column, dtype in NUMERIC_COLUMNS.values():
+        columns[column] = np.asarray(numeric[column], dtype=dtype)
+    vocabularies = {}
+    for column, values in categorical.items():
+        vocabularies[column] = sorted(set(values))
+        lookup = {label: code for code, label in enumerate(vocabularies[column])}
+        columns[column] = np.asarray([lookup[value] for value in values], dtype=np.int16)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "created_at": datetime.utcnow().isoformat(),
+        "rows": len(names),
+        "sources": {path: _source_stat(path) for path in sources},
+        "columns": {name: {"file": f"{name}.npy", "dtype": str(array.dtype)} for name, array in columns.items()},
+        "vocabularies": vocabularies,
+        "soils": _parse_soils(soil_csv) if os.path.exists(soil_csv) else []
+    }
+
+    # Write into a staging directory, then publish it as the current version
+    staging = staging_directory(out_dir)
+    for name, array in columns.items():
+        np.save(os.path.join(staging, f"{name}.npy"), array)
+    with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return publish_directory(staging, out_dir)
+
+def load_snapshot(snapshot_dir: str = DEFAULT_SNAPSHOT_DIR) -> Optional[CropVarietySnapshot]:
+    """Open the current snapshot, or None if there is none"""
+    path = current_directory(snapshot_dir)
+    if path is None or not os.path.exists(os.path.join(path, "manifest.json")):
+        return None
+    return CropVarietySnapshot(path)
+
+def default_crop_csvs() -> List[str]:
+    return DEFAULT_CROP_CSVS + sorted(glob(DEFAULT_VARIETY_GLOB))
+
+def is_stale(snapshot: CropVarietySnapshot, crop_csvs: Sequence[str], soil_csv: str) -> bool:
+    """Whether the source CSVs changed since the snapshot was built (stat only, no parsing)"""
+    if snapshot.manifest.get("format_version") != FORMAT_VERSION:
+        return True
+    sources = [path for path in [*crop_csvs, soil_csv] if os.path.exists(path)]
+    recorded = snapshot.manifest.get("sources", {})
+    return set(sources) != set(recorded) or any(_source_stat(path) != recorded[path] for path in sources)
+
+_snapshot: Optional[CropVarietySnapshot] = None
+_lock = threading.Lock()
+
+def get_variety_snapshot() -> Optional[CropVarietySnapshot]:
+    """The current snapshot, built from the CSVs on first use if missing or stale"""
+    if _snapshot is None:
+        refresh_variety_snapshot()
+    return _snapshot
+
+def refresh_variety_snapshot() -> Tuple[Optional[CropVarietySnapshot], bool]:
+    """Rebuild the snapshot if the CSVs changed and swap it in; returns (current, swapped)
+
+    Blocking; run it off the event loop. Readers keep the snapshot they hold until the swap.
+    """
+    global _snapshot
+    with _lock:
+        crop_csvs = default_crop_csvs()
+        snapshot = _snapshot or load_snapshot()
+        if snapshot is not None and not is_stale(snapshot, crop_csvs, DEFAULT_SOIL_CSV):
+            swapped = snapshot is not _snapshot
+            _snapshot = snapshot
+            return snapshot, swapped
+        try:
+            path = build_snapshot(crop_csvs, DEFAULT_SOIL_CSV, DEFAULT_SNAPSHOT_DIR)
+        except OSError as e:
+            print(f"⚠️ Could not build crop variety snapshot: {e}")
+            return _snapshot, False
+        if snapshot is not None and snapshot.path == path:
+            # Sources were touched but their content is unchanged
+            swapped = snapshot is not _snapshot
+            _snapshot = snapshot
+            return snapshot, swapped
+        snapshot = CropVarietySnapshot(path)
+        print(f"📦 Built crop variety snapshot {snapshot.version} ({snapshot.rows} rows)")
+        _snapshot = snapshot
+        return snapshot, True
+
+def _source_stat(path: str) -> Dict:
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def _parse_soils(path: str) -> List[Dict]:
+    soils = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            ph_min, _, ph_max = row["ph_range"].partition("-")
+            soils.append({
+                "soil_type": row["soil_type"].strip(),
+                "water_retention": row["water_retention"].strip(),
+                "suitable_crops": [crop.strip() for crop in row["suitable_crops"].split(",") if crop.strip()],
+                "ph_range": [float(ph_min), float(ph_max or ph_min)],
+                "characteristics": row["characteristics"].strip(),
+                "common_regions": [region.strip() for region in row["common_regions"].split("-") if region.strip()]
+            })
+    return soils
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    out_dir = DEFAULT_SNAPSHOT_DIR
+    if "--out" in args:
+        position = args.index("--out")
+        out_dir = args[position + 1]
+        del args[position:position + 2]
+    path = build_snapshot(args or default_crop_csvs(), DEFAULT_SOIL_CSV, out_dir)
+    snapshot = CropVarietySnapshot(path)
+    print(f"✅ Snapshot {snapshot.version}: {snapshot.rows} crop rows, {len(snapshot.soils)} soils -> {path}")
@@ -0,0 +1,68 @@
+"""
+Awaitable data access for async request handlers
+Blocking SQLAlchemy work runs on a dedicated, bounded thread pool instead of the event loop
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .models import SessionLocal, AdaptationPlan, AnalysisJob
+from .crud import ClimateAdaptationCRUD, AnalysisJobCRUD
+
+# Keep this at or below the SQLAlchemy connection pool size
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="db")
+
+async def run_in_db(func, *args, **kwargs):
+    """Run blocking database work on the DB thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, functools.partial(func, *args, **kwargs))
+
+class _AsyncCRUD:
+    """Runs each call of a sync CRUD class in its own session on the DB pool"""
+
+    crud_class = None
+
+    async def _call(self, method: str, *args, **kwargs):
+        def work():
+            with SessionLocal() as db:
+                # Returned rows are detached but keep their loaded attributes
+                return getattr(self.crud_class(db), method)(*args, **kwargs)
+        return await run_in_db(work)
+
+class AsyncClimateAdaptationCRUD(_AsyncCRUD):
+    crud_class = ClimateAdaptationCRUD
+
+    async def create_adaptation_plan(self, farm_details: Dict, adaptation_plan: Dict) -> AdaptationPlan:
+        return await self._call("create_adaptation_plan", farm_details, adaptation_plan)
+
+    async def create_adaptation_plans(self, entries: List[Tuple[Dict, Dict]]) -> List[int]:
+        return await self._call("create_adaptation_plans", entries)
+
+    async def get_plan_by_id(self, plan_id: int) -> Optional[AdaptationPlan]:
+        return await self._call("get_plan_by_id", plan_id)
+
+    async def get_nearby_plans(self, location: str, radius_km: float = 10.0) -> List[Dict]:
+        return await self._call("get_nearby_plans", location, radius_km)
+
+class AsyncAnalysisJobCRUD(_AsyncCRUD):
+    crud_class = AnalysisJobCRUD
+
+    async def create_job(self, job_id: str, request_payload: Dict, stage_progress: Dict) -> AnalysisJob:
+        return await self._call("create_job", job_id, request_payload, stage_progress)
+
+    async def get_job(self, job_id: str) -> Optional[AnalysisJob]:
+        return await self._call("get_job", job_id)
+
+    async def update_job(self, job_id: str, **fields) -> Optional[AnalysisJob]:
+        return await self._call("update_job", job_id, **fields)
+
+    async def get_unfinished_job_ids(self) -> List[str]:
+        return await self._call("get_unfinished_job_ids")
+
+# Global instances
+plans_db = AsyncClimateAdaptationCRUD()
+jobs_db = AsyncAnalysisJobCRUD()
@@ -1,7 +1,8 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func
-from typing import List, Dict, Optional
-from .models import AdaptationPlan
+from typing import List, Dict, Optional, Tuple
+from .models import AdaptationPlan, AnalysisJob
+from data.gazetteer import resolve_location
 import json
 import math
 
@@ -11,9 +12,36 @@ class ClimateAdaptationCRUD:
     
     def create_adaptation_plan(self, farm_details: Dict, adaptation_plan: Dict) -> AdaptationPlan:
         """Create a new adaptation plan"""
-        db_plan = AdaptationPlan(
+        db_plan = self._build_plan_row(farm_details, adaptation_plan)
+        
+        self.db.add(db_plan)
+        self.db.commit()
+        self.db.refresh(db_plan)
+        return db_plan
+    
+    def create_adaptation_plans(self, entries: List[Tuple[Dict, Dict]]) -> List[int]:
+        """Create many adaptation plans in a single transaction; returns their IDs"""
+        db_plans = [self._build_plan_row(farm_details, plan) for farm_details, plan in entries]
+        
+        try:
+            self.db.add_all(db_plans)
+            self.db.flush()  # Assigns primary keys without a refresh per row
+            plan_ids = [db_plan.id for db_plan in db_plans]
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return plan_ids
+    
+    def _build_plan_row(self, farm_details: Dict, adaptation_plan: Dict) -> AdaptationPlan:
+        place = resolve_location(farm_details["location"])
+        return AdaptationPlan(
             farm_id=adaptation_plan["farm_id"],
             location=farm_details["location"],
+            state=place.state if place else None,
+            district=place.district if place else None,
+            latitude=place.latitude if place else None,
+            longitude=place.longitude if place else None,
             farm_size=farm_details["farm_size"],
             soil_type=farm_details["soil_type"],
             water_source=farm_details["water_source"],
@@ -25,35 +53,59 @@ class ClimateAdaptationCRUD:
             recommended_crops=adaptation_plan["crop_recommendations"]["recommended_crops"],
             market_analysis=adaptation_plan["market_analysis"],
             government_schemes=adaptation_plan["government_schemes"],
-            farm_layout_svg=adaptation_plan["farm_layout_svg"],
+            farm_layout_svg=adaptation_plan.get("farm_layout_svg"),
+            layout_inputs=adaptation_plan.get("farm_layout"),
             
             implementation_timeline=adaptation_plan["implementation_timeline"],
             estimated_costs=adaptation_plan["estimated_costs"],
-            expected_benefits=adaptation_plan["expected_benefits"]
+            expected_benefits=adaptation_plan["expected_benefits"],
+            knowledge_base_version=adaptation_plan.get("knowledge_base_version")
         )
-        
-        self.db.add(db_plan)
-        self.db.commit()
-        self.db.refresh(db_plan)
-        return db_plan
     
     def get_plan_by_id(self, plan_id: int) -> Optional[AdaptationPlan]:
         """Get adaptation plan by ID"""
         return self.db.query(AdaptationPlan).filter(AdaptationPlan.id == plan_id).first()
     
     def get_nearby_plans(self, location: str, radius_km: float = 10.0) -> List[Dict]:
-        """Get adaptation plans from nearby farms"""
-        # Simple location matching for prototype
-        # In production, use proper geospatial queries
-        plans = self.db.query(AdaptationPlan).filter(
-            AdaptationPlan.location.contains(location.split(',')[0])  # Match city/state
-        ).limit(10).all()
+        """Get adaptation plans from nearby farms, closest first"""
+        place = resolve_location(location)
+        text_match = AdaptationPlan.location.contains(location.split(',')[0])  # Match city/state
+        
+        if place is None:
+            plans = self.db.query(AdaptationPlan).filter(text_match).limit(10).all()
+            distances = [None] * len(plans)
+        else:
+            # Bounding box and planar ordering in SQL, exact great-circle distance here
+            lon_scale = max(math.cos(math.radians(place.latitude)), 0.01)
+            lat_margin = radius_km / 111.0
+            lon_margin = lat_margin / lon_scale
+            lat_offset = AdaptationPlan.latitude - place.latitude
+            lon_offset = (AdaptationPlan.longitude - place.longitude) * lon_scale
+            candidates = self.db.query(AdaptationPlan).filter(
+                AdaptationPlan.latitude.between(place.latitude - lat_margin, place.latitude + lat_margin),
+                AdaptationPlan.longitude.between(place.longitude - lon_margin, place.longitude + lon_margin)
+            ).order_by(lat_offset * lat_offset + lon_offset * lon_offset, AdaptationPlan.id).limit(10).all()
+            
+            plans, distances = [], []
+            for plan in candidates:
+                distance = place.distance_km(plan.latitude, plan.longitude)
+                if distance <= radius_km:
+                    plans.append(plan)
+                    distances.append(distance)
+            if len(plans) < 10:
+                # Plans saved before locations were resolved
+                legacy = self.db.query(AdaptationPlan).filter(
+                    AdaptationPlan.latitude.is_(None), text_match
+                ).limit(10 - len(plans)).all()
+                plans += legacy
+                distances += [None] * len(legacy)
         
         nearby_plans = []
-        for plan in plans:
+        for plan, distance in zip(plans, distances):
             nearby_plans.append({
                 "id": plan.id,
                 "location": plan.location,
+                "distance_km": round(distance, 1) if distance is not None else None,
                 "farm_size": plan.farm_size,
                 "soil_type": plan.soil_type,
                 "recommended_crops": plan.recommended_crops,
@@ -97,4 +149,42 @@ class ClimateAdaptationCRUD:
             self.db.delete(plan)
             self.db.commit()
             return True
-        return False
\ No newline at end of file
+        return False
+
+class AnalysisJobCRUD:
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def create_job(self, job_id: str, request_payload: Dict, stage_progress: Dict) -> AnalysisJob:
+        """Create a queued plan generation job"""
+        job = AnalysisJob(
+            id=job_id,
+            status="queued",
+            request_payload=request_payload,
+            stage_progress=stage_progress
+        )
+        self.db.add(job)
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+    
+    def get_job(self, job_id: str) -> Optional[AnalysisJob]:
+        """Get a job by ID"""
+        return self.db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+    
+    def update_job(self, job_id: str, **fields) -> Optional[AnalysisJob]:
+        """Update job status, progress or outcome"""
+        job = self.get_job(job_id)
+        if job:
+            for key, value in fields.items():
+                setattr(job, key, value)
+            self.db.commit()
+            self.db.refresh(job)
+        return job
+    
+    def get_unfinished_job_ids(self) -> List[str]:
+        """IDs of jobs that were queued or running, oldest first"""
+        jobs = self.db.query(AnalysisJob.id).filter(
+            AnalysisJob.status.in_(["queued", "running"])
+        ).order_by(AnalysisJob.created_at).all()
+        return [job.id for job in jobs]
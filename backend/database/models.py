@@ -1,12 +1,19 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON, Text
+from sqlalchemy import create_engine, inspect, text, Column, Integer, String, Float, DateTime, JSON, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
+import json
 import os
+from data.records import json_default
 
 # Database setup
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./climate_adaptation.db")
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
+    # Plans hold catalog records/views; store them as plain JSON
+    json_serializer=lambda value: json.dumps(value, default=json_default)
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -16,6 +23,11 @@ class AdaptationPlan(Base):
     id = Column(Integer, primary_key=True, index=True)
     farm_id = Column(String, unique=True, index=True)
     location = Column(String, index=True)
+    # Resolved from the location text against the gazetteer (null if it names no known place)
+    state = Column(String, index=True)
+    district = Column(String)
+    latitude = Column(Float, index=True)
+    longitude = Column(Float)
     farm_size = Column(Float)
     soil_type = Column(String)
     water_source = Column(String)
@@ -32,6 +44,7 @@ class AdaptationPlan(Base):
     market_analysis = Column(JSON)
     government_schemes = Column(JSON)
     farm_layout_svg = Column(Text)
+    layout_inputs = Column(JSON)  # Lets the layout be rendered on demand
     
     # Implementation details
     implementation_timeline = Column(JSON)
@@ -39,9 +52,38 @@ class AdaptationPlan(Base):
     expected_benefits = Column(JSON)
     
     # Metadata
+    knowledge_base_version = Column(String)  # Fingerprint of the crop/scheme/market data used
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+    
+    id = Column(String, primary_key=True, index=True)
+    status = Column(String, index=True, default="queued")  # queued, running, completed, failed
+    request_payload = Column(JSON)
+    stage_progress = Column(JSON)
+    plan_id = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    
+    # Metadata
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+def ensure_schema():
+    """Create tables and add nullable columns introduced after a database was created"""
+    Base.metadata.create_all(bind=engine)
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=engine.dialect)
+                with engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
 def get_db():
     db = SessionLocal()
     try:
@@ -1,23 +1,44 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Header, Query
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 # StaticFiles not needed for this setup
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, Tuple
 import uvicorn
+import asyncio
+import hashlib
+import hmac
+import json
 import os
-from datetime import datetime
+import time
+from datetime import date, datetime
 
-from database.models import Base, engine, get_db
-from database.crud import ClimateAdaptationCRUD
+from database.models import ensure_schema
+from database.async_crud import plans_db, jobs_db
 from agents.climate_analyzer import ClimateAnalyzer
 from agents.crop_advisor import CropAdvisor
 from agents.market_analyzer import MarketAnalyzer
 from agents.scheme_finder import SchemeFinder
-from utils.svg_generator import SVGGenerator
+from utils.svg_generator import SVGGenerator, compact_svg
+from data.catalog import get_knowledge_base, pin_knowledge_base, reload_knowledge_base
+from data.climate_grid import DEFAULT_CLIMATE_DIR, get_climate_grid, reload_climate_grid
+from data.gazetteer import DEFAULT_GAZETTEER_CSV, get_gazetteer, location_cache_stats, reload_gazetteer
+from data.mandi_prices import DEFAULT_MANDI_DIR, SEGMENT_LIST, get_mandi_store, reload_mandi_store
+from data.mandi_registry import DEFAULT_REGISTRY_CSV, get_mandi_registry, reload_mandi_registry
+from data.records import json_default
+from data.snapshot import get_variety_snapshot, refresh_variety_snapshot
 from services.gen_ai_service import gen_ai_service
-
-# Create tables
-Base.metadata.create_all(bind=engine)
+from services.pipeline import Stage, StageCallback, StagePipeline
+from services.job_queue import JobQueue
+from services.market_analytics import DEFAULT_ANALYTICS_DIR, get_market_analytics, reload_market_analytics
+from services.plan_cache import plan_cache
+from services.recommendation_table import DEFAULT_TABLE_DIR, get_recommendation_table, reload_recommendation_table
+from services.climate_tiles import DEFAULT_TILES_DIR, get_climate_tiles, reload_climate_tiles
+from services.weather_stream import get_weather_store
+from services.response_cache import PrecomputedPayload, etag_matches, response_cache
+
+# Create tables (and add any newer columns to existing ones)
+ensure_schema()
 
 app = FastAPI(title="Climate Adaptation System", version="1.0.0")
 
@@ -32,6 +53,14 @@ app.add_middleware(
 
 # Static files will be served by the frontend directly
 
+# Store only layout inputs with each plan and render the SVG on request
+LAZY_FARM_LAYOUT = os.getenv("LAZY_FARM_LAYOUT", "false").lower() in ("1", "true", "yes")
+
+# Knowledge base hot reload: admin endpoints need ADMIN_TOKEN; the watcher polls source files
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+KNOWLEDGE_BASE_WATCH_SECONDS = float(os.getenv("KNOWLEDGE_BASE_WATCH_SECONDS", "0"))
+reference_data_watcher: Dict[str, asyncio.Task] = {}
+
 # Initialize components
 climate_analyzer = ClimateAnalyzer()
 crop_advisor = CropAdvisor()
@@ -54,126 +83,382 @@ class ClimateAdaptationRequest(BaseModel):
     climate_concerns: List[str]
     adaptation_goals: List[str]
 
+class BatchAnalysisRequest(BaseModel):
+    items: List[ClimateAdaptationRequest] = Field(..., min_length=1, max_length=1000)
+
+class WeatherObservation(BaseModel):
+    station_id: str
+    date: date
+    latitude: float
+    longitude: float
+    rainfall_mm: Optional[float] = None
+    tmax_c: Optional[float] = None
+
+class WeatherObservationBatch(BaseModel):
+    observations: List[WeatherObservation] = Field(..., min_length=1, max_length=100000)
+
 class NearbyFarmQuery(BaseModel):
     location: str
     radius_km: float = 10.0
 
+# Rule-based agent pipeline: schemes only need farm details, so they run
+# alongside the climate -> crops -> market chain
+async def _climate_stage(request: ClimateAdaptationRequest, results: Dict) -> Dict:
+    return await climate_analyzer.analyze_risks(
+        location=request.farm_details.location,
+        concerns=request.climate_concerns
+    )
+
+async def _crops_stage(request: ClimateAdaptationRequest, results: Dict) -> Dict:
+    return await crop_advisor.recommend_crops(
+        farm_details=request.farm_details.dict(),
+        climate_risks=results["climate_analysis"]["risks"]
+    )
+
+async def _market_stage(request: ClimateAdaptationRequest, results: Dict) -> Dict:
+    return await market_analyzer.analyze_market_potential(
+        crops=results["crop_recommendations"]["recommended_crops"],
+        location=request.farm_details.location
+    )
+
+async def _schemes_stage(request: ClimateAdaptationRequest, results: Dict) -> Dict:
+    return await scheme_finder.find_relevant_schemes(
+        farm_details=request.farm_details.dict(),
+        adaptation_goals=request.adaptation_goals
+    )
+
+async def _layout_stage(request: ClimateAdaptationRequest, results: Dict) -> Optional[str]:
+    if LAZY_FARM_LAYOUT:
+        return None  # Rendered on demand at /plan/{id}/layout.svg
+    return svg_generator.generate_farm_layout(
+        farm_size=request.farm_details.farm_size,
+        recommended_crops=results["crop_recommendations"]["recommended_crops"][:5],
+        water_source=request.farm_details.water_source
+    )
+
+async def _costs_stage(request: ClimateAdaptationRequest, results: Dict) -> Dict:
+    return _calculate_costs(results["crop_recommendations"], results["government_schemes"])
+
+AGENT_STAGES = [
+    Stage("climate_analysis", _climate_stage),
+    Stage("crop_recommendations", _crops_stage, depends_on=["climate_analysis"]),
+    Stage("market_analysis", _market_stage, depends_on=["crop_recommendations"]),
+    Stage("government_schemes", _schemes_stage),
+]
+agent_pipeline = StagePipeline(AGENT_STAGES)
+
+# Streaming also renders the layout and costs as soon as their inputs are ready
+streaming_pipeline = StagePipeline(AGENT_STAGES + [
+    Stage("farm_layout_svg", _layout_stage, depends_on=["crop_recommendations"]),
+    Stage("estimated_costs", _costs_stage, depends_on=["crop_recommendations", "government_schemes"]),
+])
+
+# Plan sections in the order a client can render them
+PLAN_SECTIONS = [
+    "climate_analysis", "crop_recommendations", "market_analysis", "government_schemes",
+    "farm_layout_svg", "farm_layout", "estimated_costs", "implementation_timeline", "expected_benefits"
+]
+
 @app.get("/")
 async def root():
     return {"message": "Climate Adaptation System API", "version": "1.0.0"}
 
 @app.post("/analyze-climate")
-async def analyze_climate_adaptation(
-    request: ClimateAdaptationRequest,
-    db = Depends(get_db)
-):
+async def analyze_climate_adaptation(request: ClimateAdaptationRequest):
     """Generate comprehensive climate adaptation plan for a farm using Gen AI"""
     try:
-        crud = ClimateAdaptationCRUD(db)
-        
-        # Check if Gen AI is available
-        use_gen_ai = gen_ai_service.is_available()
+        return await _create_plan(request)
         
-        if use_gen_ai:
-            # Use Gen AI for comprehensive analysis
-            print("🤖 Using Gen AI for analysis...")
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/jobs/analyze-climate", status_code=202)
+async def submit_analysis_job(request: ClimateAdaptationRequest):
+    """Queue plan generation and return a job id to poll"""
+    try:
+        job_id = await job_queue.submit(request.dict())
+        return {
+            "success": True,
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/jobs/{job_id}",
+            "result_url": f"/jobs/{job_id}/result"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """Get status and stage progress of a plan generation job"""
+    job = await jobs_db.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return {
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "stage_progress": job.stage_progress,
+        "plan_id": job.plan_id,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+
+@app.get("/jobs/{job_id}/result")
+async def get_analysis_job_result(job_id: str):
+    """Get the adaptation plan produced by a completed job"""
+    job = await jobs_db.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    
+    return {
+        "success": True,
+        "job_id": job.id,
+        "plan_id": job.plan_id,
+        "plan": await plans_db.get_plan_by_id(job.plan_id)
+    }
+
+@app.post("/analyze-climate/stream")
+async def analyze_climate_adaptation_stream(
+    request: ClimateAdaptationRequest,
+    stream_format: str = Query("ndjson", alias="format"),
+    accept: Optional[str] = Header(None)
+):
+    """Stream plan sections as each stage finishes (NDJSON, or SSE with format=sse)"""
+    use_sse = stream_format == "sse" or "text/event-stream" in (accept or "")
+    return StreamingResponse(
+        _stream_plan_events(request, use_sse),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _stream_plan_events(request: ClimateAdaptationRequest, use_sse: bool):
+    """Yield encoded section events while the pipeline runs, then a completion event"""
+    started = time.perf_counter()
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    async def emit(event: str, payload: Dict):
+        payload = {"event": event, "elapsed_ms": round((time.perf_counter() - started) * 1000, 2), **payload}
+        await queue.put((event, payload))
+    
+    async def on_stage_complete(section: str, result: Any):
+        await emit("section", {"section": section, "data": result, "source": "agents"})
+    
+    @pin_knowledge_base
+    async def produce():
+        try:
+            cache_key = _plan_cache_key(request)
+            cached_plan = plan_cache.get(cache_key) if cache_key else None
+            stage_timings = {}
             
-            # Generate AI-powered analysis
-            ai_analysis = await gen_ai_service.generate_climate_analysis(
-                farm_details=request.farm_details.dict(),
-                climate_concerns=request.climate_concerns,
-                adaptation_goals=request.adaptation_goals
-            )
+            if cached_plan is not None:
+                adaptation_plan = cached_plan
+                for section in PLAN_SECTIONS:
+                    if section in adaptation_plan:
+                        await emit("section", {"section": section, "data": adaptation_plan[section], "source": "cache"})
+            else:
+                ai_task = None
+                if gen_ai_service.is_available():
+                    ai_task = asyncio.ensure_future(_timed_gen_ai_analysis(request))
+                
+                try:
+                    results, stage_timings = await streaming_pipeline.run(request, on_stage_complete=on_stage_complete)
+                except BaseException:
+                    # Failed, or the client went away: don't leave the LLM call running in the background
+                    if ai_task is not None:
+                        _abandon(ai_task)
+                    raise
+                
+                ai_data = None
+                if ai_task is not None:
+                    remaining = gen_ai_service.deadline_seconds - (time.perf_counter() - started)
+                    try:
+                        ai_analysis, stage_timings["gen_ai"] = await asyncio.wait_for(ai_task, timeout=max(remaining, 0))
+                        ai_data = _parse_ai_analysis(ai_analysis)
+                    except asyncio.TimeoutError:
+                        print("⏱️ Gen AI missed the deadline, using rule-based results")
+                    except Exception as e:
+                        print(f"⚠️ Gen AI analysis failed ({e!r}), using rule-based results")
+                
+                if ai_data is not None:
+                    for section in agent_pipeline.stages:
+                        ai_data.setdefault(section, results[section])
+                    adaptation_plan = _assemble_plan(request, ai_data, use_gen_ai=True)
+                else:
+                    adaptation_plan = _assemble_plan(request, results, use_gen_ai=False,
+                                                     farm_layout=results["farm_layout_svg"])
+                
+                # Sections not produced by a pipeline stage, or replaced by the LLM
+                for section in PLAN_SECTIONS:
+                    if section not in results or adaptation_plan[section] != results[section]:
+                        source = "gen_ai" if ai_data is not None and section in ai_data else "agents"
+                        await emit("section", {"section": section, "data": adaptation_plan[section], "source": source})
+                
+                if cache_key:
+                    plan_cache.set(cache_key, adaptation_plan)
             
-            # Parse AI response (it should be JSON)
-            try:
-                import json
-                ai_data = json.loads(ai_analysis)
-            except:
-                # If AI doesn't return valid JSON, use structured agents
-                use_gen_ai = False
+            adaptation_plan["farm_id"] = _new_farm_id()
+            plan_id = None
+            if cached_plan is None or plan_cache.persist_hits:
+                # Save to database
+                saved_plan = await plans_db.create_adaptation_plan(
+                    farm_details=request.farm_details.dict(),
+                    adaptation_plan=adaptation_plan
+                )
+                plan_id = saved_plan.id
+            
+            await emit("complete", {
+                "success": True,
+                "plan_id": plan_id,
+                "farm_id": adaptation_plan["farm_id"],
+                "farm_layout_url": _layout_url(plan_id),
+                "knowledge_base_version": adaptation_plan.get("knowledge_base_version"),
+                "ai_powered": adaptation_plan["ai_powered"],
+                "cached": cached_plan is not None,
+                "stage_timings_ms": stage_timings
+            })
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            await emit("error", {"success": False, "detail": str(e)})
+        finally:
+            await queue.put(None)
+    
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            event, payload = item
+            data = json.dumps(payload, default=json_default)
+            yield f"event: {event}\ndata: {data}\n\n" if use_sse else f"{data}\n"
+    finally:
+        # Client went away: stop generating
+        if not producer.done():
+            producer.cancel()
+
+@app.post("/analyze-climate/batch")
+@pin_knowledge_base
+async def analyze_climate_adaptation_batch(batch: BatchAnalysisRequest):
+    """Generate rule-based adaptation plans for many farms (e.g. an FPO roster) at once"""
+    try:
+        items = batch.items
+        plans: Dict[int, Dict] = {}
+        errors: Dict[int, str] = {}
+        cache_keys: Dict[int, str] = {}
+        cached = set()
         
-        # Always use rule-based agents as fallback or supplement
-        print("📊 Using rule-based agents...")
+        for index, item in enumerate(items):
+            cache_key = _plan_cache_key(item)
+            cached_plan = plan_cache.get(cache_key) if cache_key else None
+            if cached_plan is not None:
+                plans[index] = cached_plan
+                cached.add(index)
+            else:
+                cache_keys[index] = cache_key
         
-        # Step 1: Climate Risk Analysis
-        climate_analysis = await climate_analyzer.analyze_risks(
-            location=request.farm_details.location,
-            concerns=request.climate_concerns
-        )
+        analyses = {index: {} for index in cache_keys}
         
-        # Step 2: Crop Recommendations
-        crop_recommendations = await crop_advisor.recommend_crops(
-            farm_details=request.farm_details.dict(),
-            climate_risks=climate_analysis["risks"]
-        )
+        def record(section: str, outcomes: Dict[int, Any]):
+            for index, outcome in outcomes.items():
+                if index not in analyses:
+                    continue  # Already failed in an earlier section
+                if isinstance(outcome, Exception):
+                    errors[index] = str(outcome)
+                    analyses.pop(index, None)
+                else:
+                    analyses[index][section] = outcome
         
-        # Step 3: Market Analysis
-        market_analysis = await market_analyzer.analyze_market_potential(
-            crops=crop_recommendations["recommended_crops"],
-            location=request.farm_details.location
-        )
+        # Step 1: Climate analysis once per distinct location and concerns
+        record("climate_analysis", await _run_once_per_key(
+            {index: (_location_key(items[index]), tuple(items[index].climate_concerns)) for index in analyses},
+            lambda index: climate_analyzer.analyze_risks(
+                location=items[index].farm_details.location,
+                concerns=items[index].climate_concerns
+            )
+        ))
         
-        # Step 4: Government Schemes
-        available_schemes = await scheme_finder.find_relevant_schemes(
-            farm_details=request.farm_details.dict(),
-            adaptation_goals=request.adaptation_goals
+        # Step 2: Score crops for all farms together, with schemes alongside
+        indexes = list(analyses)
+        crop_outcomes, scheme_outcomes = await asyncio.gather(
+            _recommend_crops_batch(
+                indexes,
+                [items[index].farm_details.dict() for index in indexes],
+                [analyses[index]["climate_analysis"]["risks"] for index in indexes]
+            ),
+            _run_once_per_key(
+                {index: (_location_key(items[index]), items[index].farm_details.farm_size,
+                         tuple(items[index].adaptation_goals)) for index in indexes},
+                lambda index: scheme_finder.find_relevant_schemes(
+                    farm_details=items[index].farm_details.dict(),
+                    adaptation_goals=items[index].adaptation_goals
+                )
+            )
         )
+        record("crop_recommendations", crop_outcomes)
+        record("government_schemes", scheme_outcomes)
         
-        if not use_gen_ai:
-            # Use rule-based results
-            ai_data = {
-                "climate_analysis": climate_analysis,
-                "crop_recommendations": crop_recommendations,
-                "market_analysis": market_analysis,
-                "government_schemes": available_schemes
-            }
-        
-        # Step 5: Generate Farm Layout (always use SVG generator)
-        recommended_crops = ai_data.get("crop_recommendations", {}).get("recommended_crops", [])
-        if isinstance(recommended_crops, dict):
-            recommended_crops = list(recommended_crops.keys())[:5]
+        # Step 3: Market analysis once per distinct crop set and location
+        record("market_analysis", await _run_once_per_key(
+            {index: (tuple(analyses[index]["crop_recommendations"]["recommended_crops"]),
+                     _location_key(items[index])) for index in analyses},
+            lambda index: market_analyzer.analyze_market_potential(
+                crops=analyses[index]["crop_recommendations"]["recommended_crops"],
+                location=items[index].farm_details.location
+            )
+        ))
         
-        farm_layout = svg_generator.generate_farm_layout(
-            farm_size=request.farm_details.farm_size,
-            recommended_crops=recommended_crops[:5],
-            water_source=request.farm_details.water_source
-        )
+        for index, ai_data in analyses.items():
+            try:
+                plans[index] = _assemble_plan(items[index], ai_data, use_gen_ai=False)
+            except Exception as e:
+                errors[index] = str(e)
+                continue
+            if cache_keys[index]:
+                plan_cache.set(cache_keys[index], plans[index])
         
-        # Compile comprehensive plan
-        adaptation_plan = {
-            "farm_id": f"farm_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            "ai_powered": use_gen_ai,
-            "climate_analysis": ai_data.get("climate_analysis", {}),
-            "crop_recommendations": ai_data.get("crop_recommendations", {}),
-            "market_analysis": ai_data.get("market_analysis", {}),
-            "government_schemes": ai_data.get("government_schemes", {}),
-            "farm_layout_svg": farm_layout,
-            "implementation_timeline": ai_data.get("implementation_timeline") or _generate_timeline(
-                ai_data.get("crop_recommendations", {}), 
-                ai_data.get("climate_analysis", {})
-            ),
-            "estimated_costs": ai_data.get("cost_analysis") or _calculate_costs(
-                ai_data.get("crop_recommendations", {}), 
-                ai_data.get("government_schemes", {})
-            ),
-            "expected_benefits": _calculate_benefits(
-                ai_data.get("crop_recommendations", {}), 
-                ai_data.get("market_analysis", {})
-            )
-        }
+        # Persist every successful plan in one transaction; cache hits only if PLAN_CACHE_PERSIST_HITS
+        for index in plans:
+            plans[index]["farm_id"] = _new_farm_id()
+        to_save = sorted(index for index in plans if index not in cached or plan_cache.persist_hits)
+        plan_ids = {}
+        if to_save:
+            try:
+                saved_ids = await plans_db.create_adaptation_plans([
+                    (items[index].farm_details.dict(), plans[index]) for index in to_save
+                ])
+                plan_ids = dict(zip(to_save, saved_ids))
+            except Exception as e:
+                errors.update({index: f"Failed to save plan: {e}" for index in to_save})
+        for index in plans:
+            plans[index]["farm_layout_url"] = _layout_url(plan_ids.get(index))
         
-        # Save to database
-        saved_plan = crud.create_adaptation_plan(
-            farm_details=request.farm_details.dict(),
-            adaptation_plan=adaptation_plan
-        )
+        results = []
+        for index in range(len(items)):
+            if index in errors:
+                results.append({"index": index, "success": False, "error": errors[index]})
+            else:
+                results.append({
+                    "index": index,
+                    "success": True,
+                    "plan_id": plan_ids.get(index),
+                    "adaptation_plan": plans[index],
+                    "cached": index in cached
+                })
         
         return {
-            "success": True,
-            "plan_id": saved_plan.id,
-            "adaptation_plan": adaptation_plan,
-            "ai_powered": use_gen_ai
+            "success": not errors,
+            "count": len(items),
+            "succeeded": len(items) - len(errors),
+            "failed": len(errors),
+            "results": results
         }
         
     except Exception as e:
@@ -181,16 +466,119 @@ async def analyze_climate_adaptation(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.on_event("startup")
+async def start_job_queue():
+    await job_queue.start()
+
+@app.on_event("startup")
+async def open_variety_snapshot():
+    # Memory-maps the prebuilt snapshot; only parses the CSVs if it is missing or stale
+    await asyncio.get_running_loop().run_in_executor(None, get_variety_snapshot)
+
+@app.on_event("startup")
+async def open_recommendation_table():
+    # Built offline with `python -m services.recommendation_table`; crop advice is computed live without it
+    table = await asyncio.get_running_loop().run_in_executor(None, get_recommendation_table)
+    if table is not None and table.fingerprint != get_knowledge_base().fingerprint:
+        print("⚠️ Recommendation table was built from different knowledge-base data; "
+              "the next reference-data reload rebuilds it")
+
+@app.on_event("startup")
+async def open_mandi_data():
+    # Prices appended with `python -m data.mandi_prices FILE.csv` and the MANDI_REGISTRY_CSV markets;
+    # catalog prices and urban/rural accessibility defaults are used without them
+    await asyncio.get_running_loop().run_in_executor(None, get_mandi_store)
+    await asyncio.get_running_loop().run_in_executor(None, get_mandi_registry)
+    # Rebuilt daily with `python -m services.market_analytics`
+    await asyncio.get_running_loop().run_in_executor(None, get_market_analytics)
+
+@app.on_event("startup")
+async def open_climate_grid():
+    # Built offline with `python -m data.climate_grid`; climate risks use regional defaults without it
+    await asyncio.get_running_loop().run_in_executor(None, get_climate_grid)
+
+@app.on_event("startup")
+async def open_climate_tiles():
+    # Rebuilt by the batch job `python -m services.climate_tiles`; the grid is read per request without it
+    await asyncio.get_running_loop().run_in_executor(None, get_climate_tiles)
+
+@app.on_event("startup")
+async def open_weather_store():
+    # Restores the running statistics from their checkpoint and replays the log after it
+    await asyncio.get_running_loop().run_in_executor(None, get_weather_store)
+
+@app.on_event("startup")
+async def start_reference_data_watcher():
+    if KNOWLEDGE_BASE_WATCH_SECONDS > 0:
+        reference_data_watcher["task"] = asyncio.ensure_future(_watch_reference_data())
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    await job_queue.stop()
+
+@app.on_event("shutdown")
+async def checkpoint_weather_store():
+    await asyncio.get_running_loop().run_in_executor(None, get_weather_store().checkpoint)
+
+@app.on_event("shutdown")
+async def stop_reference_data_watcher():
+    task = reference_data_watcher.pop("task", None)
+    if task:
+        task.cancel()
+
+@app.get("/admin/knowledge-base")
+async def get_knowledge_base_info(x_admin_token: Optional[str] = Header(None)):
+    """Current knowledge-base and crop variety snapshot versions"""
+    _require_admin(x_admin_token)
+    return {"success": True, **_reference_data_versions()}
+
+@app.post("/admin/knowledge-base/reload")
+async def reload_reference_data_endpoint(x_admin_token: Optional[str] = Header(None)):
+    """Rebuild the knowledge base and variety snapshot and swap them in without a restart"""
+    _require_admin(x_admin_token)
+    try:
+        return {"success": True, **await _reload_reference_data()}
+    except Exception as e:
+        # The previous data keeps serving
+        raise HTTPException(status_code=500, detail=f"Reload failed: {e}")
+
+@app.post("/admin/weather/observations")
+async def ingest_weather_observations(batch: WeatherObservationBatch, x_admin_token: Optional[str] = Header(None)):
+    """Append daily station observations and update the per-district running climate statistics"""
+    _require_admin(x_admin_token)
+    store = get_weather_store()
+    loop = asyncio.get_running_loop()
+    accepted = await loop.run_in_executor(
+        None, store.ingest, [observation.dict() for observation in batch.observations]
+    )
+    return {
+        "success": True,
+        "accepted": accepted,
+        "rejected": len(batch.observations) - accepted,
+        "weather_stream": store.stats()
+    }
+
+@app.get("/cache/stats")
+async def get_plan_cache_stats():
+    """Get adaptation plan cache counters"""
+    table = get_recommendation_table()
+    climate_grid = get_climate_grid()
+    climate_tiles = get_climate_tiles()
+    return {
+        "success": True,
+        "plan_cache": plan_cache.stats(),
+        "recommendation_table": table.stats() if table else None,
+        "location_cache": location_cache_stats(),
+        "climate_grid": climate_grid.stats() if climate_grid else None,
+        "climate_tiles": climate_tiles.stats() if climate_tiles else None,
+        "weather_stream": get_weather_store().stats()
+    }
+
 @app.post("/nearby-farms")
-async def get_nearby_farm_plans(
-    query: NearbyFarmQuery,
-    db = Depends(get_db)
-):
+async def get_nearby_farm_plans(query: NearbyFarmQuery):
     """Find adaptation plans from nearby farms"""
     try:
-        crud = ClimateAdaptationCRUD(db)
-        
-        nearby_plans = crud.get_nearby_plans(
+        nearby_plans = await plans_db.get_nearby_plans(
             location=query.location,
             radius_km=query.radius_km
         )
@@ -205,11 +593,10 @@ async def get_nearby_farm_plans(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/plan/{plan_id}")
-async def get_adaptation_plan(plan_id: int, db = Depends(get_db)):
+async def get_adaptation_plan(plan_id: int):
     """Retrieve a specific adaptation plan"""
     try:
-        crud = ClimateAdaptationCRUD(db)
-        plan = crud.get_plan_by_id(plan_id)
+        plan = await plans_db.get_plan_by_id(plan_id)
         
         if not plan:
             raise HTTPException(status_code=404, detail="Plan not found")
@@ -222,26 +609,76 @@ async def get_adaptation_plan(plan_id: int, db = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/plan/{plan_id}/layout.svg")
+async def get_plan_layout_svg(plan_id: int, if_none_match: Optional[str] = Header(None)):
+    """Render a plan's farm layout SVG on demand"""
+    plan = await plans_db.get_plan_by_id(plan_id)
+    if not plan:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    
+    if plan.layout_inputs:
+        body, etag = svg_generator.render_layout(**plan.layout_inputs)
+    elif plan.farm_layout_svg:
+        # Plans saved before layout inputs were stored
+        body = compact_svg(plan.farm_layout_svg).encode("utf-8")
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    else:
+        raise HTTPException(status_code=404, detail="Plan has no farm layout")
+    
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="image/svg+xml", headers=headers)
+
 @app.get("/crops")
-async def get_crop_database():
+async def get_crop_database(if_none_match: Optional[str] = Header(None),
+                            accept_encoding: Optional[str] = Header(None)):
     """Get available crops database"""
     try:
-        from data.knowledge_base import get_crops_data
-        crops = get_crops_data()
-        return {"success": True, "crops": crops}
+        kb = get_knowledge_base()
+        payload = response_cache.get("crops", lambda: {"success": True, "crops": kb.crops}, version=kb.version)
+        return _precomputed_response(payload, if_none_match, accept_encoding)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/schemes")
-async def get_government_schemes():
+async def get_government_schemes(if_none_match: Optional[str] = Header(None),
+                                 accept_encoding: Optional[str] = Header(None)):
     """Get available government schemes"""
     try:
-        from data.knowledge_base import get_schemes_data
-        schemes = get_schemes_data()
-        return {"success": True, "schemes": schemes}
+        kb = get_knowledge_base()
+        payload = response_cache.get("schemes", lambda: {"success": True, "schemes": kb.schemes}, version=kb.version)
+        return _precomputed_response(payload, if_none_match, accept_encoding)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _precomputed_response(payload: PrecomputedPayload, if_none_match: Optional[str],
+                          accept_encoding: Optional[str]) -> Response:
+    encoding, body = payload.select(accept_encoding)
+    headers = {"ETag": payload.etag(encoding), "Vary": "Accept-Encoding", "Cache-Control": "public, max-age=300"}
+    if etag_matches(if_none_match, *payload.etags()):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/crop-varieties")
+async def get_crop_varieties(soil: Optional[str] = None, season: Optional[str] = None,
+                             limit: int = Query(50, ge=1, le=500), offset: int = Query(0, ge=0)):
+    """Search the crop variety tables by soil and season"""
+    snapshot = get_variety_snapshot()
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Crop variety snapshot is not available")
+    return {"success": True, "version": snapshot.version, **snapshot.find(soil, season, limit, offset)}
+
+@app.get("/soil-types")
+async def get_soil_types():
+    """Get soil type reference data"""
+    snapshot = get_variety_snapshot()
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Crop variety snapshot is not available")
+    return {"success": True, "version": snapshot.version, "soil_types": snapshot.soils}
+
 class AIChatRequest(BaseModel):
     message: str
     context: Optional[Dict] = None
@@ -276,6 +713,306 @@ async def ai_chat_assistant(request: AIChatRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@pin_knowledge_base
+async def _create_plan(request: ClimateAdaptationRequest,
+                       on_stage_complete: Optional[StageCallback] = None,
+                       force_persist: bool = False) -> Dict:
+    """Produce (or reuse from cache) a plan for the request and save it"""
+    # Near-identical requests reuse a cached plan: no agents, LLM or SVG
+    cache_key = _plan_cache_key(request)
+    cached_plan = plan_cache.get(cache_key) if cache_key else None
+    
+    if cached_plan is not None:
+        print("♻️ Serving adaptation plan from cache...")
+        adaptation_plan = cached_plan
+        stage_timings = {}
+    else:
+        adaptation_plan, stage_timings = await _generate_adaptation_plan(request, on_stage_complete)
+        if cache_key:
+            plan_cache.set(cache_key, adaptation_plan)
+    
+    adaptation_plan["farm_id"] = _new_farm_id()
+    plan_id = None
+    if cached_plan is None or plan_cache.persist_hits or force_persist:
+        # Save to database
+        saved_plan = await plans_db.create_adaptation_plan(
+            farm_details=request.farm_details.dict(),
+            adaptation_plan=adaptation_plan
+        )
+        plan_id = saved_plan.id
+    adaptation_plan["farm_layout_url"] = _layout_url(plan_id)
+    
+    return {
+        "success": True,
+        "plan_id": plan_id,
+        "adaptation_plan": adaptation_plan,
+        "ai_powered": adaptation_plan["ai_powered"],
+        "cached": cached_plan is not None,
+        "stage_timings_ms": stage_timings
+    }
+
+async def _run_analysis_job(request_payload: Dict, on_stage_complete) -> int:
+    """Job queue handler: build and save the plan for a queued request"""
+    request = ClimateAdaptationRequest(**request_payload)
+    
+    async def report_stage(stage: str, result: Any):
+        await on_stage_complete(stage)
+    
+    result = await _create_plan(request, on_stage_complete=report_stage, force_persist=True)
+    return result["plan_id"]
+
+job_queue = JobQueue(
+    _run_analysis_job,
+    stages=list(agent_pipeline.stages),
+    concurrency=max(1, int(os.getenv("ANALYSIS_JOB_WORKERS", "2")))
+)
+
+async def _generate_adaptation_plan(request: ClimateAdaptationRequest,
+                                    on_stage_complete: Optional[StageCallback] = None) -> Tuple[Dict, Dict]:
+    """Run Gen AI and/or the agent pipeline; returns (plan without farm_id, stage timings)"""
+    # Check if Gen AI is available
+    use_gen_ai = gen_ai_service.is_available()
+    ai_data = None
+    started = time.perf_counter()
+    
+    if use_gen_ai and gen_ai_service.race_mode:
+        # Speculative mode: LLM and rule-based agents run side by side
+        print("🏁 Racing Gen AI against rule-based agents...")
+        ai_task = asyncio.ensure_future(_timed_gen_ai_analysis(request))
+        try:
+            stage_results, stage_timings = await agent_pipeline.run(request, on_stage_complete=on_stage_complete)
+        except BaseException:
+            # Failed or cancelled: don't leave the LLM call running in the background
+            _abandon(ai_task)
+            raise
+        
+        remaining = gen_ai_service.deadline_seconds - (time.perf_counter() - started)
+        try:
+            # wait_for cancels the LLM call if it misses the deadline
+            ai_analysis, stage_timings["gen_ai"] = await asyncio.wait_for(ai_task, timeout=max(remaining, 0))
+            ai_data = _parse_ai_analysis(ai_analysis)
+        except asyncio.TimeoutError:
+            print("⏱️ Gen AI missed the deadline, using rule-based results")
+        except Exception as e:
+            # The rule-based results are complete on their own
+            print(f"⚠️ Gen AI analysis failed ({e!r}), using rule-based results")
+    else:
+        gen_ai_ms = None
+        if use_gen_ai:
+            # Use Gen AI for comprehensive analysis
+            print("🤖 Using Gen AI for analysis...")
+            try:
+                ai_analysis, gen_ai_ms = await _timed_gen_ai_analysis(request)
+                ai_data = _parse_ai_analysis(ai_analysis)
+            except Exception as e:
+                print(f"⚠️ Gen AI analysis failed ({e!r}), using rule-based agents for every section")
+        
+        # Rule-based agents only compute the sections the LLM did not cover
+        print("📊 Using rule-based agents...")
+        covered = {section: ai_data[section] for section in agent_pipeline.stages if ai_data and section in ai_data}
+        stage_results, stage_timings = await agent_pipeline.run(request, provided=covered,
+                                                                on_stage_complete=on_stage_complete)
+        if gen_ai_ms is not None:
+            stage_timings["gen_ai"] = gen_ai_ms
+    
+    # If AI doesn't return valid JSON, use structured agents
+    use_gen_ai = ai_data is not None
+    if use_gen_ai:
+        # Rule-based sections fill anything the LLM left out
+        for section, result in stage_results.items():
+            ai_data.setdefault(section, result)
+    else:
+        # Use rule-based results
+        ai_data = stage_results
+    
+    return _assemble_plan(request, ai_data, use_gen_ai), stage_timings
+
+def _assemble_plan(request: ClimateAdaptationRequest, ai_data: Dict, use_gen_ai: bool,
+                   farm_layout: Optional[str] = None) -> Dict:
+    """Add the farm layout and derived sections to the analysis results"""
+    # Step 5: Generate Farm Layout (always use SVG generator)
+    recommended_crops = ai_data.get("crop_recommendations", {}).get("recommended_crops", [])
+    if isinstance(recommended_crops, dict):
+        recommended_crops = list(recommended_crops.keys())[:5]
+    
+    layout_inputs = {
+        "farm_size": request.farm_details.farm_size,
+        "recommended_crops": recommended_crops[:5],
+        "water_source": request.farm_details.water_source
+    }
+    if LAZY_FARM_LAYOUT:
+        farm_layout = None  # Rendered on demand at /plan/{id}/layout.svg
+    elif farm_layout is None:
+        farm_layout = svg_generator.generate_farm_layout(**layout_inputs)
+    
+    # Compile comprehensive plan
+    adaptation_plan = {
+        "ai_powered": use_gen_ai,
+        "knowledge_base_version": get_knowledge_base().fingerprint,
+        "climate_analysis": ai_data.get("climate_analysis", {}),
+        "crop_recommendations": ai_data.get("crop_recommendations", {}),
+        "market_analysis": ai_data.get("market_analysis", {}),
+        "government_schemes": ai_data.get("government_schemes", {}),
+        "farm_layout_svg": farm_layout,
+        "farm_layout": layout_inputs,
+        "implementation_timeline": ai_data.get("implementation_timeline") or _generate_timeline(
+            ai_data.get("crop_recommendations", {}), 
+            ai_data.get("climate_analysis", {})
+        ),
+        "estimated_costs": ai_data.get("cost_analysis") or _calculate_costs(
+            ai_data.get("crop_recommendations", {}), 
+            ai_data.get("government_schemes", {})
+        ),
+        "expected_benefits": _calculate_benefits(
+            ai_data.get("crop_recommendations", {}), 
+            ai_data.get("market_analysis", {})
+        )
+    }
+    
+    return adaptation_plan
+
+
+def _location_key(request: ClimateAdaptationRequest) -> str:
+    return " ".join(request.farm_details.location.lower().split())
+
+async def _recommend_crops_batch(indexes: List[int], farms: List[Dict],
+                                 climate_risks: List[List[str]]) -> Dict[int, Any]:
+    """Crop recommendations (or exceptions) by index; one bad farm fails only itself, not the roster"""
+    try:
+        return dict(zip(indexes, await crop_advisor.recommend_crops_batch(farms, climate_risks)))
+    except Exception as e:
+        print(f"⚠️ Batch crop scoring failed ({e}), scoring farms one at a time")
+    outcomes = await asyncio.gather(
+        *(crop_advisor.recommend_crops(farm, risks) for farm, risks in zip(farms, climate_risks)),
+        return_exceptions=True
+    )
+    return dict(zip(indexes, outcomes))
+
+async def _run_once_per_key(keys: Dict[int, Any], run) -> Dict[int, Any]:
+    """Await run(index) once per distinct key and fan the outcome (or exception) out to every index"""
+    first_index = {}
+    for index, key in keys.items():
+        first_index.setdefault(key, index)
+    outcomes = await asyncio.gather(*(run(index) for index in first_index.values()), return_exceptions=True)
+    by_key = dict(zip(first_index, outcomes))
+    return {index: by_key[key] for index, key in keys.items()}
+
+def _require_admin(token: Optional[str]):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN")
+    if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+def _reference_data_versions() -> Dict:
+    kb = get_knowledge_base()
+    snapshot = get_variety_snapshot()
+    mandi = get_mandi_store()
+    registry = get_mandi_registry()
+    analytics = get_market_analytics()
+    return {
+        "knowledge_base": {
+            "version": kb.version,
+            "fingerprint": kb.fingerprint,
+            "loaded_at": kb.loaded_at.isoformat() if kb.loaded_at else None,
+            "crops": len(kb.crops),
+            "schemes": len(kb.schemes)
+        },
+        "variety_snapshot": {"version": snapshot.version, "rows": snapshot.rows} if snapshot else None,
+        "gazetteer": {"places": len(get_gazetteer().places)},
+        "mandi_prices": mandi.stats() if mandi else None,
+        "mandi_registry": registry.stats() if registry else None,
+        "market_analytics": analytics.stats() if analytics else None
+    }
+
+async def _reload_reference_data() -> Dict:
+    """Rebuild reference data on worker threads; requests keep using the old data until the swap"""
+    loop = asyncio.get_running_loop()
+    _, kb_swapped = await loop.run_in_executor(None, reload_knowledge_base)
+    _, table_swapped = await loop.run_in_executor(None, reload_recommendation_table)
+    _, snapshot_swapped = await loop.run_in_executor(None, refresh_variety_snapshot)
+    _, gazetteer_swapped = await loop.run_in_executor(None, reload_gazetteer)
+    _, mandi_swapped = await loop.run_in_executor(None, reload_mandi_store)
+    _, registry_swapped = await loop.run_in_executor(None, reload_mandi_registry)
+    _, analytics_swapped = await loop.run_in_executor(None, reload_market_analytics)
+    _, climate_swapped = await loop.run_in_executor(None, reload_climate_grid)
+    _, tiles_swapped = await loop.run_in_executor(None, reload_climate_tiles)
+    if (kb_swapped or table_swapped or snapshot_swapped or gazetteer_swapped or mandi_swapped or registry_swapped
+            or analytics_swapped or climate_swapped or tiles_swapped):
+        print(f"🔄 Reference data reloaded (knowledge base: {kb_swapped}, recommendation table: {table_swapped}, "
+              f"variety snapshot: {snapshot_swapped}, gazetteer: {gazetteer_swapped}, mandi prices: {mandi_swapped}, "
+              f"mandi registry: {registry_swapped}, market analytics: {analytics_swapped}, "
+              f"climate grid: {climate_swapped}, climate tiles: {tiles_swapped})")
+    # Caches keyed by the knowledge-base version/fingerprint miss from here on
+    return {"reloaded": {"knowledge_base": kb_swapped, "recommendation_table": table_swapped,
+                         "variety_snapshot": snapshot_swapped, "gazetteer": gazetteer_swapped, "mandi_prices": mandi_swapped,
+                         "mandi_registry": registry_swapped, "market_analytics": analytics_swapped,
+                         "climate_grid": climate_swapped, "climate_tiles": tiles_swapped},
+            **_reference_data_versions()}
+
+def _reference_data_mtimes() -> Tuple:
+    from data import knowledge_base
+    from data.snapshot import DEFAULT_SOIL_CSV, default_crop_csvs
+    # The mandi segment list is replaced whenever a segment is added or merged away
+    paths = [knowledge_base.__file__, DEFAULT_SOIL_CSV, DEFAULT_GAZETTEER_CSV,
+             os.path.join(DEFAULT_MANDI_DIR, SEGMENT_LIST), DEFAULT_REGISTRY_CSV,
+             os.path.join(DEFAULT_ANALYTICS_DIR, "CURRENT"), os.path.join(DEFAULT_TABLE_DIR, "CURRENT"),
+             os.path.join(DEFAULT_CLIMATE_DIR, "CURRENT"), os.path.join(DEFAULT_TILES_DIR, "CURRENT"),
+             *default_crop_csvs()]
+    return tuple((path, os.stat(path).st_mtime_ns) for path in paths if os.path.exists(path))
+
+async def _watch_reference_data():
+    """Reload reference data whenever one of its source files changes"""
+    last_seen = _reference_data_mtimes()
+    while True:
+        await asyncio.sleep(KNOWLEDGE_BASE_WATCH_SECONDS)
+        current = _reference_data_mtimes()
+        if current == last_seen:
+            continue
+        last_seen = current
+        try:
+            await _reload_reference_data()
+        except Exception as e:
+            print(f"⚠️ Reference data reload failed, keeping previous data: {e}")
+
+def _plan_cache_key(request: ClimateAdaptationRequest) -> Optional[str]:
+    # Plans built from different knowledge-base data never share a cache entry
+    if not plan_cache.enabled:
+        return None
+    return plan_cache.make_key(request.dict(), namespace=get_knowledge_base().fingerprint)
+
+def _layout_url(plan_id: Optional[int]) -> Optional[str]:
+    return f"/plan/{plan_id}/layout.svg" if plan_id is not None else None
+
+def _new_farm_id() -> str:
+    """Unique farm id; microseconds keep fast (e.g. cached) requests from colliding"""
+    return f"farm_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+
+async def _timed_gen_ai_analysis(request: ClimateAdaptationRequest) -> Tuple[Optional[str], float]:
+    """Run the Gen AI analysis and report its wall time in ms"""
+    started = time.perf_counter()
+    ai_analysis = await gen_ai_service.generate_climate_analysis(
+        farm_details=request.farm_details.dict(),
+        climate_concerns=request.climate_concerns,
+        adaptation_goals=request.adaptation_goals
+    )
+    return ai_analysis, round((time.perf_counter() - started) * 1000, 2)
+
+def _abandon(task: asyncio.Future):
+    """Cancel a speculative task whose result is no longer wanted"""
+    task.cancel()
+    # Retrieve its outcome so a call that had already failed is not logged as never retrieved
+    task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+def _parse_ai_analysis(ai_analysis: Optional[str]) -> Optional[Dict]:
+    """Parse AI response (it should be JSON); None if unusable"""
+    try:
+        ai_data = json.loads(ai_analysis)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(ai_data, dict):
+        return None
+    return gen_ai_service.validate_analysis_sections(ai_data)
+
 def _generate_ai_response(message: str, context: Dict) -> str:
     """Generate AI response based on message and context"""
     
@@ -0,0 +1,171 @@
+"""
+Precomputed climate risk tiles per district
+Severity scores and trend summaries from the climate grid change at most monthly, so a batch job
+computes them for every gazetteer place (district, or state centre) into a compact table keyed by
+district id (Place.key); ClimateAnalyzer reads a place's tile instead of touching the grid per request
+
+Rebuild (e.g. monthly, after refreshing the grid) with:
+    python -m services.climate_tiles [--out DIR]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from data.climate_grid import ClimateGrid
+from data.gazetteer import Gazetteer, Place
+from data.publish import current_directory, publish_directory, staging_directory
+from data.records import freeze
+
+# Bump when the table layout changes
+FORMAT_VERSION = 1
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TILES_DIR = os.getenv("CLIMATE_TILES_DIR", os.path.join(BACKEND_DIR, "data", "climate_tiles"))
+
+# Severities are stored as whole percent in one byte; this marks a risk the grid says nothing about
+NO_SEVERITY = 255
+
+class ClimateTiles:
+    """Read-only table: district id -> (risk severities, climate trends)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.risks: Tuple[str, ...] = tuple(self.manifest["risks"])
+        severities = np.load(os.path.join(path, "severities.npy"))
+        with open(os.path.join(path, "trends.json"), encoding="utf-8") as f:
+            trends = json.load(f)
+        # A few hundred places: expanded once here so a lookup is one dict access
+        self._tiles: Dict[str, Tuple[Dict, Dict]] = {}
+        for row, district in enumerate(self.manifest["districts"]):
+            scores = {
+                risk: round(int(value) / 100, 2)
+                for risk, value in zip(self.risks, severities[row]) if value != NO_SEVERITY
+            }
+            # Shared by every request for the district, so they must stay read-only
+            self._tiles[district] = (freeze(scores), freeze(trends[row]))
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, place: Place) -> Optional[Tuple[Dict, Dict]]:
+        """(severity by risk, trends) for the place, or None if it has no tile"""
+        tile = self._tiles.get(place.key)
+        if tile is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return tile
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "districts": len(self._tiles),
+            "climate_period": self.manifest["climate_period"],
+            "created_at": self.manifest["created_at"],
+            "build_seconds": self.manifest["build_seconds"],
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+def build_climate_tiles(analyzer, gazetteer: Gazetteer, grid: ClimateGrid, out_dir: str = DEFAULT_TILES_DIR) -> str:
+    """Score every gazetteer place against the climate grid and write the table; returns its path"""
+    from agents.climate_analyzer import SEVERITY_INDICATORS
+
+    started = time.perf_counter()
+    risks = list(SEVERITY_INDICATORS)
+    districts: List[str] = []
+    seen = set()
+    rows: List[List[int]] = []
+    trends: List[Dict] = []
+    for place in gazetteer.places:
+        climate = grid.profile(place.latitude, place.longitude)
+        if not climate or place.key in seen:
+            continue
+        seen.add(place.key)
+        districts.append(place.key)
+        # Only risks the grid has an indicator for; the rest keep the analyzer's regional defaults
+        severities, place_trends = analyzer.grid_assessment(climate)
+        rows.append([round(severities[risk] * 100) if risk in severities else NO_SEVERITY for risk in risks])
+        trends.append(place_trends)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "created_at": datetime.utcnow().isoformat(),
+        "climate_period": f"{grid.start_year}-{grid.start_year + grid.years - 1}",
+        "climate_grid_created_at": grid.manifest.get("created_at"),
+        "risks": risks,
+        "districts": districts,
+        "build_seconds": round(time.perf_counter() - started, 3)
+    }
+
+    # Write into a staging directory, then publish it as the current version
+    staging = staging_directory(out_dir)
+    np.save(os.path.join(staging, "severities.npy"), np.asarray(rows, dtype=np.uint8).reshape(len(rows), len(risks)))
+    with open(os.path.join(staging, "trends.json"), "w", encoding="utf-8") as f:
+        json.dump(trends, f, ensure_ascii=False, separators=(",", ":"))
+    with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return publish_directory(staging, out_dir)
+
+_tiles: Optional[ClimateTiles] = None
+_loaded = False
+_lock = threading.Lock()
+
+def get_climate_tiles() -> Optional[ClimateTiles]:
+    """The district tiles from CLIMATE_TILES_DIR, or None if they have not been built"""
+    global _tiles, _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                _tiles = _open_tiles(current_directory(DEFAULT_TILES_DIR))
+                _loaded = True
+    return _tiles
+
+def reload_climate_tiles() -> Tuple[Optional[ClimateTiles], bool]:
+    """Reopen the tiles if the batch job published new ones; returns (current, swapped)"""
+    global _tiles, _loaded
+    with _lock:
+        path = current_directory(DEFAULT_TILES_DIR)
+        if _tiles is not None and _tiles.path == path:
+            _loaded = True
+            return _tiles, False
+        tiles = _open_tiles(path)
+        swapped = tiles is not _tiles
+        _tiles, _loaded = tiles, True
+        return _tiles, swapped
+
+def _open_tiles(path: Optional[str]) -> Optional[ClimateTiles]:
+    if path is None:
+        return None
+    tiles = ClimateTiles(path)
+    if tiles.manifest.get("format_version") != FORMAT_VERSION:
+        return None
+    print(f"🗺️ Loaded climate risk tiles ({len(tiles.manifest['districts'])} districts, "
+          f"{tiles.manifest['climate_period']})")
+    return tiles
+
+if __name__ == "__main__":
+    sys.path.insert(0, BACKEND_DIR)
+    from agents.climate_analyzer import ClimateAnalyzer
+    from data.climate_grid import get_climate_grid
+    from data.gazetteer import get_gazetteer
+
+    args = sys.argv[1:]
+    out_dir = args[args.index("--out") + 1] if "--out" in args else DEFAULT_TILES_DIR
+
+    grid = get_climate_grid()
+    if grid is None:
+        print("Build the climate grid first: python -m data.climate_grid --rainfall DIR --tmax DIR")
+        sys.exit(1)
+    path = build_climate_tiles(ClimateAnalyzer(), get_gazetteer(), grid, out_dir)
+    tiles = ClimateTiles(path)
+    print(f"✅ {len(tiles.manifest['districts'])} district tiles in {tiles.manifest['build_seconds']:.2f}s -> {path}")
@@ -21,6 +21,17 @@ try:
 except ImportError:
     ANTHROPIC_AVAILABLE = False
 
+def _is_str_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+# Minimal shape each analysis section needs before downstream code can rely on it
+ANALYSIS_SECTION_VALIDATORS = {
+    "climate_analysis": lambda section: _is_str_list(section.get("risks")),
+    "crop_recommendations": lambda section: _is_str_list(section.get("recommended_crops")),
+    "market_analysis": lambda section: isinstance(section.get("crop_market_analysis"), dict),
+    "government_schemes": lambda section: isinstance(section.get("recommended_schemes"), list),
+}
+
 class GenAIService:
     """Service for generating AI-powered climate adaptation recommendations"""
     
@@ -32,6 +43,11 @@ class GenAIService:
         self.use_openai = OPENAI_AVAILABLE and self.openai_api_key
         self.use_anthropic = ANTHROPIC_AVAILABLE and self.anthropic_api_key
         
+        # Race mode starts the LLM call alongside the rule-based agents; the
+        # LLM result is only used if it lands within the deadline
+        self.race_mode = os.getenv("GEN_AI_RACE_MODE", "false").lower() in ("1", "true", "yes")
+        self.deadline_seconds = float(os.getenv("GEN_AI_DEADLINE_SECONDS", "20"))
+        
         if self.use_openai:
             openai.api_key = self.openai_api_key
             self.model = "gpt-3.5-turbo-16k"  # Use 16k context model for detailed responses
@@ -43,6 +59,15 @@ class GenAIService:
         """Check if any AI service is available"""
         return self.use_openai or self.use_anthropic
     
+    def validate_analysis_sections(self, ai_data: Dict) -> Dict:
+        """Drop malformed sections from a parsed analysis so agents can fill them in"""
+        for section, is_valid in ANALYSIS_SECTION_VALIDATORS.items():
+            value = ai_data.get(section)
+            if value is not None and not (isinstance(value, dict) and is_valid(value)):
+                print(f"⚠️ Discarding malformed Gen AI section: {section}")
+                del ai_data[section]
+        return ai_data
+    
     async def generate_climate_analysis(self, farm_details: Dict, climate_concerns: list, adaptation_goals: list) -> str:
         """Generate comprehensive climate adaptation analysis using Gen AI"""
         
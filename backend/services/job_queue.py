@@ -0,0 +1,93 @@
+"""
+Asynchronous plan generation jobs
+Submissions return a job id immediately; an in-process worker pool produces the plan
+"""
+
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from database.async_crud import jobs_db
+
+# handler(request_payload, on_stage_complete) -> plan_id
+JobHandler = Callable[[Dict, Callable[[str], Awaitable[None]]], Awaitable[int]]
+
+class JobQueue:
+    """Bounded worker pool over the persistent analysis_jobs table"""
+
+    def __init__(self, handler: JobHandler, stages: List[str], concurrency: int = 2):
+        self.handler = handler
+        self.stages = stages
+        self.concurrency = concurrency
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self):
+        """Re-queue jobs left over from a previous run and start the workers"""
+        self._queue = asyncio.Queue()
+        for job_id in await jobs_db.get_unfinished_job_ids():
+            # Jobs interrupted mid-run start over from the beginning
+            await jobs_db.update_job(job_id, status="queued", stage_progress=self._initial_progress())
+            self._queue.put_nowait(job_id)
+        if self._queue.qsize():
+            print(f"🔁 Resuming {self._queue.qsize()} queued analysis jobs")
+
+        self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        """Stop the workers; unfinished jobs stay queued in the database"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, request_payload: Dict) -> str:
+        """Persist a new job and queue it; returns the job id"""
+        if self._queue is None:
+            # start() re-queues every unfinished job from the database, so queueing before it
+            # would run this one twice; fail before anything is persisted
+            raise RuntimeError("JobQueue.start() must be awaited (app startup) before submitting jobs")
+        job_id = uuid.uuid4().hex
+        await jobs_db.create_job(job_id, request_payload, self._initial_progress())
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def _initial_progress(self) -> Dict:
+        return {stage: "pending" for stage in self.stages}
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except Exception as e:
+                print(f"❌ Analysis job {job_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str):
+        job = await jobs_db.get_job(job_id)
+        if not job or job.status not in ("queued", "running"):
+            return
+        payload = job.request_payload
+        progress = dict(job.stage_progress or self._initial_progress())
+        await jobs_db.update_job(job_id, status="running", started_at=datetime.utcnow())
+
+        async def on_stage_complete(stage: str):
+            progress[stage] = "done"
+            await jobs_db.update_job(job_id, stage_progress=dict(progress))
+
+        try:
+            plan_id = await self.handler(payload, on_stage_complete)
+        except Exception as e:
+            await jobs_db.update_job(job_id, status="failed", error=str(e), finished_at=datetime.utcnow())
+            return
+
+        # Stages covered by the cache or the LLM never ran
+        progress = {stage: state if state == "done" else "skipped" for stage, state in progress.items()}
+        await jobs_db.update_job(job_id, status="completed", plan_id=plan_id, stage_progress=progress,
+                                 finished_at=datetime.utcnow())
@@ -0,0 +1,319 @@
+"""
+Daily market analytics snapshot
+A batch job over the mandi price store: for every (crop, market) series it computes rolling
+volatility, a seasonal decomposition, the price trend and price percentiles in one vectorized
+pass per crop over the (markets x days) price matrix, then medians per district, state and the
+whole country. MarketAnalyzer reads a crop's figures for a region with one dict lookup
+
+Rebuild daily with:
+    python -m services.market_analytics [--out DIR]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import warnings
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from data.gazetteer import Place
+from data.mandi_prices import MONTHS, VOLATILITY_LEVELS, MandiPriceStore
+from data.publish import current_directory, publish_directory, staging_directory
+from data.records import freeze
+
+# Bump when the snapshot layout changes
+FORMAT_VERSION = 1
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ANALYTICS_DIR = os.getenv("MARKET_ANALYTICS_DIR", os.path.join(BACKEND_DIR, "data", "market_analytics"))
+
+# Days of history in the price matrix, and windows within it
+HISTORY_DAYS = 3 * 365
+VOLATILITY_DAYS = 30
+TREND_DAYS = 90
+SEASON_DAYS = 365
+# Series with fewer observed days are left out
+MIN_OBSERVED_DAYS = 60
+# Markets analyzed together
+BLOCK_ROWS = 1024
+
+METRICS = (
+    "current_price", "volatility", "volatility_percentile", "trend_per_month",
+    "price_percentile", "p10", "p50", "p90", "seasonal_amplitude", "observed_days"
+)
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Sum over the trailing window along each row (NaN treated as 0); columns before a full window are NaN"""
+    cumulative = np.cumsum(np.nan_to_num(values), axis=1)
+    sums = np.full(values.shape, np.nan)
+    sums[:, window - 1] = cumulative[:, window - 1]
+    sums[:, window:] = cumulative[:, window:] - cumulative[:, :-window]
+    return sums
+
+def analyze_price_matrix(prices: np.ndarray, first_day: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(metrics, seasonal indices) for each row of a (series x days) matrix of daily prices per kg"""
+    # Short or gappy series yield NaN figures (empty windows, all-NaN months); that is expected
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return _analyze_price_matrix(prices, first_day)
+
+def _analyze_price_matrix(prices: np.ndarray, first_day: int) -> Tuple[np.ndarray, np.ndarray]:
+    series, days = prices.shape
+    observed_days = np.sum(~np.isnan(prices), axis=1)
+
+    # Carry the last traded price over days without trading
+    index = np.where(np.isnan(prices), 0, np.arange(days))
+    np.maximum.accumulate(index, axis=1, out=index)
+    filled = prices[np.arange(series)[:, None], index]
+    current = filled[:, -1]
+
+    # Rolling volatility: std of daily log changes over the trailing window, scaled to a month
+    changes = np.diff(np.log(filled), axis=1)
+    valid = (~np.isnan(changes)).astype(np.float64)
+    window = min(VOLATILITY_DAYS, changes.shape[1])
+    count = _rolling_sum(valid, window)
+    total = _rolling_sum(changes, window)
+    squares = _rolling_sum(changes ** 2, window)
+    variance = (squares - total ** 2 / count) / (count - 1)
+    rolling_volatility = np.sqrt(np.clip(variance, 0, None)) * np.sqrt(30)
+    rolling_volatility[count < window / 2] = np.nan
+    volatility = rolling_volatility[:, -1]
+    volatility_percentile = np.sum(rolling_volatility <= volatility[:, None], axis=1) / \
+        np.maximum(np.sum(~np.isnan(rolling_volatility), axis=1), 1)
+
+    # Least-squares slope over the trend window, as a share of the current price per month
+    recent = filled[:, -TREND_DAYS:]
+    mask = ~np.isnan(recent)
+    x = np.where(mask, np.arange(recent.shape[1]), 0.0)
+    n = np.maximum(mask.sum(axis=1), 1)
+    x_mean = x.sum(axis=1) / n
+    y_mean = np.nansum(recent, axis=1) / n
+    dx = np.where(mask, x - x_mean[:, None], 0.0)
+    dy = np.where(mask, recent - y_mean[:, None], 0.0)
+    slope = (dx * dy).sum(axis=1) / (dx ** 2).sum(axis=1)
+    trend_per_month = slope * 30 / current
+
+    # Where today's price sits in the history, and the history's spread
+    price_percentile = np.sum(prices <= current[:, None], axis=1) / np.maximum(observed_days, 1)
+    p10, p50, p90 = np.nanpercentile(prices, [10, 50, 90], axis=1) if days else (current, current, current)
+
+    # Seasonal decomposition: price over its centred one-year moving average, averaged per calendar month
+    seasonal = np.full((series, 12), np.nan)
+    if days > SEASON_DAYS:
+        half = SEASON_DAYS // 2
+        trend = np.full(filled.shape, np.nan)
+        observed = (~np.isnan(filled)).astype(np.float64)
+        moving = _rolling_sum(filled, SEASON_DAYS) / _rolling_sum(observed, SEASON_DAYS)
+        trend[:, half:days - half] = moving[:, SEASON_DAYS - 1:]
+        ratio = filled / trend
+        months = np.array([date.fromordinal(first_day + offset).month - 1 for offset in range(days)])
+        for month in range(12):
+            columns = ratio[:, months == month]
+            if columns.size:
+                seasonal[:, month] = np.nanmean(columns, axis=1)
+        seasonal /= np.nanmean(seasonal, axis=1, keepdims=True)
+    amplitude = np.nanmax(seasonal, axis=1) - np.nanmin(seasonal, axis=1)
+
+    metrics = np.column_stack([
+        current, volatility, volatility_percentile, trend_per_month, price_percentile,
+        p10, p50, p90, amplitude, observed_days
+    ]).astype(np.float32)
+    return metrics, seasonal.astype(np.float32)
+
+def _crop_matrix(store: MandiPriceStore, crop_id: int, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(market ids, markets x days matrix of mean modal price per kg) for one crop"""
+    low, high = np.int64((crop_id << 32) | start), np.int64((crop_id << 32) | end)
+    days, markets, prices = [], [], []
+    for columns in store.columns:
+        first, last = np.searchsorted(columns["key"], low), np.searchsorted(columns["key"], high, side="right")
+        days.append(np.asarray(columns["key"][first:last] & 0xFFFFFFFF) - start)
+        markets.append(np.asarray(columns["market"][first:last]))
+        prices.append(np.asarray(columns["modal_price"][first:last], dtype=np.float64))
+    days, markets, prices = np.concatenate(days), np.concatenate(markets), np.concatenate(prices)
+    market_ids, rows = np.unique(markets, return_inverse=True)
+    width = end - start + 1
+    flat = rows.astype(np.int64) * width + days
+    counts = np.bincount(flat, minlength=len(market_ids) * width)
+    totals = np.bincount(flat, weights=prices, minlength=len(market_ids) * width)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Days without trading become NaN
+        matrix = (totals / counts).reshape(len(market_ids), width) / 100  # ₹ per quintal -> ₹ per kg
+    return market_ids, matrix
+
+def build_market_analytics(store: MandiPriceStore, out_dir: str = DEFAULT_ANALYTICS_DIR,
+                           as_of: Optional[date] = None) -> str:
+    """Analyze every (crop, market) series in the store and write the snapshot; returns its path"""
+    started = time.perf_counter()
+    if as_of is None:
+        as_of = store.last_day()
+        if as_of is None:
+            raise ValueError("The mandi price store holds no prices")
+    end = as_of.toordinal()
+    start = end - HISTORY_DAYS + 1
+
+    keys: List[str] = []
+    metric_rows: List[np.ndarray] = []
+    seasonal_rows: List[np.ndarray] = []
+    for crop_id, crop in enumerate(store.crops):
+        # One crop at a time keeps the matrix to (its markets x days)
+        market_ids, matrix = _crop_matrix(store, crop_id, start, end)
+        if not len(market_ids):
+            continue
+        keep = np.sum(~np.isnan(matrix), axis=1) >= MIN_OBSERVED_DAYS
+        market_ids, matrix = market_ids[keep], matrix[keep]
+        if not len(market_ids):
+            continue
+        # Rows are independent: blocks of markets bound the temporaries for crops traded everywhere
+        blocks = [analyze_price_matrix(matrix[block:block + BLOCK_ROWS], start)
+                  for block in range(0, len(matrix), BLOCK_ROWS)]
+        metrics = np.concatenate([block[0] for block in blocks])
+        seasonal = np.concatenate([block[1] for block in blocks])
+
+        # Per market, then medians per district, per state and for all markets
+        groups: Dict[str, List[int]] = {}
+        for row, market in enumerate(market_ids.tolist()):
+            state, district, name = store.markets[market]
+            keys.append(_key(crop, state, district, name))
+            for region in (_key(crop, state, district), _key(crop, state), _key(crop)):
+                groups.setdefault(region, []).append(row)
+        metric_rows.append(metrics)
+        seasonal_rows.append(seasonal)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # All-NaN columns in a group stay NaN
+            for region, rows in groups.items():
+                keys.append(region)
+                metric_rows.append(np.nanmedian(metrics[rows], axis=0, keepdims=True))
+                seasonal_rows.append(np.nanmedian(seasonal[rows], axis=0, keepdims=True))
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "as_of": as_of.isoformat(),
+        "created_at": datetime.utcnow().isoformat(),
+        "price_store_version": list(store.version),
+        "metrics": list(METRICS),
+        "keys": keys,
+        "build_seconds": round(time.perf_counter() - started, 3)
+    }
+
+    # Write into a staging directory, then publish it as the current version
+    staging = staging_directory(out_dir)
+    np.save(os.path.join(staging, "metrics.npy"),
+            np.concatenate(metric_rows).astype(np.float32) if metric_rows else np.empty((0, len(METRICS)), np.float32))
+    np.save(os.path.join(staging, "seasonal.npy"),
+            np.concatenate(seasonal_rows).astype(np.float32) if seasonal_rows else np.empty((0, 12), np.float32))
+    with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    return publish_directory(staging, out_dir)
+
+def _key(crop: str, state: Optional[str] = None, district: Optional[str] = None, market: Optional[str] = None) -> str:
+    return "|".join([crop] + [part.lower() for part in (state, district, market) if part is not None])
+
+class MarketAnalytics:
+    """Read-only daily snapshot: (crop, region or market) -> price analytics"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.as_of = self.manifest["as_of"]
+        self.rows = {key: row for row, key in enumerate(self.manifest["keys"])}
+        self.metrics = np.load(os.path.join(path, "metrics.npy"), mmap_mode="r")
+        self.seasonal = np.load(os.path.join(path, "seasonal.npy"), mmap_mode="r")
+
+    def lookup(self, crop: str, place: Optional[Place]) -> Optional[Dict]:
+        """Figures for the crop in the place's district, else its state, else the country; None if untraded"""
+        crop = crop.lower()
+        candidates = []
+        if place is not None:
+            if place.district:
+                candidates.append((_key(crop, place.state, place.district), f"{place.district}, {place.state}"))
+            candidates.append((_key(crop, place.state), place.state))
+        candidates.append((_key(crop), "All India"))
+        for key, region in candidates:
+            row = self.rows.get(key)
+            if row is not None:
+                return self._figures(row, region)
+        return None
+
+    def _figures(self, row: int, region: str) -> Dict:
+        values = dict(zip(METRICS, (float(value) for value in self.metrics[row])))
+        volatility = values["volatility"]
+        figures = {
+            "region": region,
+            "as_of": self.as_of,
+            "current_price": round(values["current_price"], 2),
+            "volatility": None if np.isnan(volatility) else
+                next((name for bound, name in VOLATILITY_LEVELS if volatility < bound), "very_high"),
+            "monthly_volatility_pct": None if np.isnan(volatility) else round(volatility * 100, 1),
+            "volatility_percentile": round(values["volatility_percentile"] * 100),
+            "trend_per_month_pct": None if np.isnan(values["trend_per_month"]) else round(values["trend_per_month"] * 100, 1),
+            "price_percentile": round(values["price_percentile"] * 100),
+            "price_range": {"p10": round(values["p10"], 2), "p50": round(values["p50"], 2), "p90": round(values["p90"], 2)}
+        }
+        seasonal = self.seasonal[row]
+        if not np.isnan(values["seasonal_amplitude"]):
+            figures["seasonal_amplitude_pct"] = round(values["seasonal_amplitude"] * 100, 1)
+            figures["peak_month"] = MONTHS[int(np.nanargmax(seasonal))]
+            figures["low_month"] = MONTHS[int(np.nanargmin(seasonal))]
+        return freeze(figures)
+
+    def stats(self) -> Dict:
+        return {
+            "as_of": self.as_of,
+            "rows": len(self.rows),
+            "created_at": self.manifest["created_at"],
+            "build_seconds": self.manifest["build_seconds"]
+        }
+
+_analytics: Optional[MarketAnalytics] = None
+_loaded = False
+_lock = threading.Lock()
+
+def get_market_analytics() -> Optional[MarketAnalytics]:
+    """The snapshot from MARKET_ANALYTICS_DIR, or None if it has not been built"""
+    global _analytics, _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                _analytics = _open_analytics(current_directory(DEFAULT_ANALYTICS_DIR))
+                if _analytics is not None:
+                    print(f"📊 Loaded market analytics snapshot ({len(_analytics.rows)} series, as of {_analytics.as_of})")
+                _loaded = True
+    return _analytics
+
+def reload_market_analytics() -> Tuple[Optional[MarketAnalytics], bool]:
+    """Reopen the snapshot if the daily job published a new one; returns (current, swapped)"""
+    global _analytics, _loaded
+    with _lock:
+        path = current_directory(DEFAULT_ANALYTICS_DIR)
+        if _analytics is not None and _analytics.path == path:
+            return _analytics, False
+        analytics = _open_analytics(path)
+        swapped = analytics is not _analytics
+        _analytics, _loaded = analytics, True
+        return _analytics, swapped
+
+def _open_analytics(path: Optional[str]) -> Optional[MarketAnalytics]:
+    if path is None:
+        return None
+    analytics = MarketAnalytics(path)
+    return analytics if analytics.manifest.get("format_version") == FORMAT_VERSION else None
+
+if __name__ == "__main__":
+    sys.path.insert(0, BACKEND_DIR)
+    from data.mandi_prices import get_mandi_store
+
+    args = sys.argv[1:]
+    out_dir = args[args.index("--out") + 1] if "--out" in args else DEFAULT_ANALYTICS_DIR
+
+    store = get_mandi_store()
+    if store is None:
+        print("Load mandi prices first: python -m data.mandi_prices FILE.csv")
+        sys.exit(1)
+    path = build_market_analytics(store, out_dir)
+    analytics = MarketAnalytics(path)
+    print(f"✅ {len(analytics.rows)} series as of {analytics.as_of} in {analytics.manifest['build_seconds']:.2f}s -> {path}")
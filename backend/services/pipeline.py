@@ -0,0 +1,91 @@
+"""
+Stage scheduler for the climate adaptation agent pipeline
+Runs agent stages as a dependency graph so independent stages overlap
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+StageFunc = Callable[[Any, Dict[str, Any]], Awaitable[Any]]
+StageCallback = Callable[[str, Any], Awaitable[None]]
+
+class Stage:
+    """A named pipeline step with the stages it depends on"""
+
+    def __init__(self, name: str, func: StageFunc, depends_on: Sequence[str] = ()):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+
+class StagePipeline:
+    """Run stages concurrently, starting each one as soon as its dependencies finish"""
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = {stage.name: stage for stage in stages}
+        self._validate()
+
+    def _validate(self):
+        """Reject unknown dependencies and cycles up front"""
+        for stage in self.stages.values():
+            for dependency in stage.depends_on:
+                if dependency not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dependency}'")
+
+        visiting, done = set(), set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Stage dependency cycle detected at '{name}'")
+            visiting.add(name)
+            for dependency in self.stages[name].depends_on:
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    async def run(self, context: Any,
+                  provided: Optional[Dict[str, Any]] = None,
+                  on_stage_complete: Optional[StageCallback] = None) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """Execute all stages; returns (results by stage, wall time per stage in ms)
+
+        Stages whose results are already in `provided` are skipped and their
+        values are handed to dependents as-is. `on_stage_complete(name, result)`
+        is awaited as each computed stage finishes, before its dependents start.
+        """
+        loop = asyncio.get_running_loop()
+        done = {name: loop.create_future() for name in self.stages}
+        results: Dict[str, Any] = {}
+        timings: Dict[str, float] = {}
+
+        for name, value in (provided or {}).items():
+            if name in self.stages:
+                results[name] = value
+                done[name].set_result(True)
+
+        async def run_stage(stage: Stage):
+            for dependency in stage.depends_on:
+                await done[dependency]
+
+            started = time.perf_counter()
+            results[stage.name] = await stage.func(context, results)
+            timings[stage.name] = round((time.perf_counter() - started) * 1000, 2)
+            if on_stage_complete is not None:
+                await on_stage_complete(stage.name, results[stage.name])
+            done[stage.name].set_result(True)
+
+        tasks = [asyncio.ensure_future(run_stage(stage))
+                 for stage in self.stages.values() if stage.name not in results]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # A failed stage leaves its dependents waiting forever; cancel them
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        return results, timings
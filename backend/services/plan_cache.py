@@ -0,0 +1,149 @@
+"""
+Content-addressed cache for adaptation plans
+Near-identical farm requests share one plan instead of re-running agents, LLM and SVG
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from data.records import json_default
+
+class PlanCache:
+    """In-memory LRU + TTL plan cache with an optional SQLite tier"""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 6 * 3600,
+                 budget_band: float = 5000, sqlite_path: Optional[str] = None,
+                 enabled: bool = True, persist_hits: bool = True):
+        self.enabled = enabled
+        # Whether a cache hit still gets its own farm_id and database row
+        self.persist_hits = persist_hits
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.budget_band = budget_band
+        # key -> (expires_at, serialized plan); JSON keeps entries compact and
+        # hands every caller its own copy
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._disk = None
+        if sqlite_path:
+            self._disk = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS plan_cache "
+                "(key TEXT PRIMARY KEY, plan TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._disk.execute("CREATE INDEX IF NOT EXISTS ix_plan_cache_expires ON plan_cache (expires_at)")
+            self._disk.commit()
+
+    @classmethod
+    def from_env(cls) -> "PlanCache":
+        """Build the cache from PLAN_CACHE_* environment variables"""
+        return cls(
+            max_entries=int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "512")),
+            ttl_seconds=float(os.getenv("PLAN_CACHE_TTL_SECONDS", str(6 * 3600))),
+            budget_band=float(os.getenv("PLAN_CACHE_BUDGET_BAND", "5000")),
+            sqlite_path=os.getenv("PLAN_CACHE_SQLITE_PATH") or None,
+            enabled=os.getenv("PLAN_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"),
+            persist_hits=os.getenv("PLAN_CACHE_PERSIST_HITS", "true").lower() in ("1", "true", "yes")
+        )
+
+    def make_key(self, request: Dict, namespace: str = "") -> str:
+        """Canonical hash of a normalized ClimateAdaptationRequest (and the data version it is built on)"""
+        farm = request["farm_details"]
+
+        def clean(value: str) -> str:
+            return " ".join(str(value).lower().split())
+
+        normalized = {
+            "location": ",".join(clean(part) for part in farm["location"].split(",") if part.strip()),
+            "farm_size": round(float(farm["farm_size"]), 2),
+            "soil_type": clean(farm["soil_type"]),
+            "water_source": clean(farm["water_source"]),
+            "current_crops": sorted({clean(crop) for crop in farm["current_crops"]}),
+            "budget_band": int(float(farm["budget"]) // self.budget_band) if self.budget_band > 0 else farm["budget"],
+            "experience_level": clean(farm["experience_level"]),
+            "climate_concerns": sorted({clean(concern) for concern in request["climate_concerns"]}),
+            "adaptation_goals": sorted({clean(goal) for goal in request["adaptation_goals"]}),
+            "namespace": namespace
+        }
+        canonical = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a fresh copy of the cached plan, or None on miss/expiry"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(entry[1])
+            if entry:
+                del self._entries[key]
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT plan, expires_at FROM plan_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] > now:
+                    self._remember(key, row[1], row[0])
+                    self.hits += 1
+                    return json.loads(row[0])
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, plan: Dict):
+        """Store a plan under its request key"""
+        expires_at = time.time() + self.ttl_seconds
+        serialized = json.dumps(plan, separators=(",", ":"), default=json_default)
+        with self._lock:
+            self._remember(key, expires_at, serialized)
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO plan_cache (key, plan, expires_at) VALUES (?, ?, ?)",
+                    (key, serialized, expires_at)
+                )
+                self._disk.execute("DELETE FROM plan_cache WHERE expires_at <= ?", (time.time(),))
+                self._disk.commit()
+
+    def _remember(self, key: str, expires_at: float, serialized: str):
+        self._entries[key] = (expires_at, serialized)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop every cached plan (memory and disk)"""
+        with self._lock:
+            self._entries.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM plan_cache")
+                self._disk.commit()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "disk_tier": self._disk is not None
+        }
+
+# Global instance
+plan_cache = PlanCache.from_env()
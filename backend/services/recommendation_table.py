@@ -0,0 +1,262 @@
+"""
+Materialized crop recommendations for the discrete farm-profile space
+CropAdvisor rankings depend only on matched climate zones, matched soils, water-source class,
+the set of known risks and the budget-per-acre band, so they can be precomputed offline and
+served with one lookup; only reasons and farm-size scaled yields are added per request
+
+Build offline with:
+    python -m services.recommendation_table [--out DIR] [--max-risks N]
+A built table is rebuilt on reload when the knowledge base it was ranked from changes
+"""
+
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data.catalog import KnowledgeBase, freeze
+from data.publish import current_directory, publish_directory, staging_directory
+
+# Bump when the key layout or payload shape changes
+FORMAT_VERSION = 1
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TABLE_DIR = os.getenv("RECOMMENDATION_TABLE_DIR", os.path.join(BACKEND_DIR, "data", "recommendations"))
+
+# Crop water requirement levels a water source can meet, with a source string for each class
+WATER_CLASSES = (("low",), ("low", "medium"), ("low", "medium", "high"))
+WATER_CLASS_SOURCES = ("rain-fed", "borewell", "canal")
+
+class ProfileEncoder:
+    """Packs the inputs a crop ranking depends on into one 64-bit key"""
+
+    def __init__(self, zones: Sequence[str], soils: Sequence[str], risks: Sequence[str], costs: Sequence[float]):
+        self.zones = tuple(zones)
+        self.soils = tuple(soils)
+        self.risks = tuple(risks)
+        self.risk_index = {risk: bit for bit, risk in enumerate(self.risks)}
+        # Distinct input costs; a budget band is how many of them fit budget * 0.7 and budget
+        self.costs = tuple(sorted(set(costs)))
+        self.band_bits = len(self.costs).bit_length()
+        self.widths = (len(self.zones), len(self.soils), 2, len(self.risks), self.band_bits, self.band_bits)
+        if sum(self.widths) > 64:
+            raise ValueError("Farm-profile space is too large for a 64-bit key")
+
+    @classmethod
+    def from_knowledge_base(cls, kb: KnowledgeBase) -> "ProfileEncoder":
+        return cls(kb.crops_by_climate_zone, kb.crops_by_soil, kb.crop_table.risks,
+                   kb.crop_table.input_cost.tolist())
+
+    def to_manifest(self) -> Dict:
+        return {"zones": self.zones, "soils": self.soils, "risks": self.risks, "costs": self.costs}
+
+    def budget_band(self, budget_per_acre: float) -> Tuple[int, int]:
+        # Same comparisons as CropAdvisor._score_crops
+        return (bisect.bisect_right(self.costs, budget_per_acre * 0.7),
+                bisect.bisect_right(self.costs, budget_per_acre))
+
+    def encode(self, location: str, soil_type: str, water_levels: Sequence[str],
+               climate_risks: Sequence[str], budget_per_acre: float) -> Optional[int]:
+        """Key for a farm profile, or None when it falls outside the enumerable space"""
+        location, soil_type = location.lower(), soil_type.lower()
+        try:
+            water_class = WATER_CLASSES.index(tuple(water_levels))
+        except ValueError:
+            return None
+        risk_mask = 0
+        for risk in climate_risks:
+            if risk in self.risk_index:
+                bit = 1 << self.risk_index[risk]
+                if risk_mask & bit:
+                    return None  # Repeated risks score twice; not materialized
+                risk_mask |= bit
+        fields = (
+            sum(1 << bit for bit, zone in enumerate(self.zones) if zone in location),
+            sum(1 << bit for bit, soil in enumerate(self.soils) if soil in soil_type),
+            water_class,
+            risk_mask,
+            *self.budget_band(budget_per_acre)
+        )
+        key = 0
+        for value, width in zip(fields, self.widths):
+            key = (key << width) | value
+        return key
+
+class RecommendationTable:
+    """Read-only lookup table: profile key -> precomputed ranking"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.fingerprint = self.manifest["knowledge_base_fingerprint"]
+        vocabulary = self.manifest["vocabulary"]
+        self.encoder = ProfileEncoder(vocabulary["zones"], vocabulary["soils"], vocabulary["risks"], vocabulary["costs"])
+        self.keys = np.load(os.path.join(path, "keys.npy"), mmap_mode="r")
+        self.payload_ids = np.load(os.path.join(path, "payload_ids.npy"), mmap_mode="r")
+        with open(os.path.join(path, "payloads.json"), encoding="utf-8") as f:
+            # Shared by every request that hits them, so they must stay read-only
+            self.payloads = freeze(json.load(f))
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, kb: KnowledgeBase, location: str, soil_type: str, water_levels: Sequence[str],
+               climate_risks: Sequence[str], budget_per_acre: float) -> Optional[Dict]:
+        """Precomputed ranking for the profile, or None (outside the table or built from other data)"""
+        key = None
+        if kb.fingerprint == self.fingerprint:
+            key = self.encoder.encode(location, soil_type, water_levels, climate_risks, budget_per_acre)
+        if key is not None:
+            # A plain int would promote the whole key column to float64
+            position = int(np.searchsorted(self.keys, np.uint64(key)))
+            if position < len(self.keys) and int(self.keys[position]) == key:
+                self.hits += 1
+                return self.payloads[self.payload_ids[position]]
+        self.misses += 1
+        return None
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "knowledge_base_fingerprint": self.fingerprint,
+            "profiles": len(self.keys),
+            "distinct_rankings": len(self.payloads),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+def build_recommendation_table(advisor, kb: KnowledgeBase, out_dir: str = DEFAULT_TABLE_DIR,
+                               max_risks: int = 3) -> str:
+    """Enumerate the farm-profile space, rank every profile and write the table; returns its path"""
+    encoder = ProfileEncoder.from_knowledge_base(kb)
+
+    # A location or soil naming one zone/soil matches it and any vocabulary entry it contains
+    # (e.g. "semi_arid" also matches "arid")
+    zone_words = [""] + list(encoder.zones)
+    soil_words = [""] + list(encoder.soils) + [" ".join(pair) for pair in combinations(encoder.soils, 2)]
+    risk_sets = [list(subset) for size in range(max_risks + 1) for subset in combinations(encoder.risks, size)]
+    budgets = _representative_budgets(encoder)
+
+    keys: Dict[int, int] = {}
+    payloads: List[Dict] = []
+    payload_index: Dict[str, int] = {}
+    for location in zone_words:
+        for soil_type in soil_words:
+            for water_levels, water_source in zip(WATER_CLASSES, WATER_CLASS_SOURCES):
+                for risks in risk_sets:
+                    suitable = advisor._filter_crops_by_conditions(kb, location, soil_type, water_source, risks)
+                    for budget_per_acre in budgets:
+                        key = encoder.encode(location, soil_type, water_levels, risks, budget_per_acre)
+                        if key in keys:
+                            continue
+                        ranking = advisor._rank_candidates(
+                            kb, suitable, {"budget": budget_per_acre, "farm_size": 1}, risks
+                        )
+                        serialized = json.dumps(ranking, sort_keys=True, separators=(",", ":"))
+                        if serialized not in payload_index:
+                            payload_index[serialized] = len(payloads)
+                            payloads.append(ranking)
+                        keys[key] = payload_index[serialized]
+
+    ordered = sorted(keys)
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "knowledge_base_fingerprint": kb.fingerprint,
+        "created_at": datetime.utcnow().isoformat(),
+        "max_risks": max_risks,
+        "profiles": len(ordered),
+        "distinct_rankings": len(payloads),
+        "vocabulary": encoder.to_manifest()
+    }
+
+    staging = staging_directory(out_dir)
+    np.save(os.path.join(staging, "keys.npy"), np.asarray(ordered, dtype=np.uint64))
+    np.save(os.path.join(staging, "payload_ids.npy"), np.asarray([keys[key] for key in ordered], dtype=np.int32))
+    with open(os.path.join(staging, "payloads.json"), "w", encoding="utf-8") as f:
+        json.dump(payloads, f, separators=(",", ":"))
+    with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return publish_directory(staging, out_dir)
+
+def _representative_budgets(encoder: ProfileEncoder) -> List[float]:
+    """One budget-per-acre value for every reachable budget band"""
+    thresholds = sorted({cost for cost in encoder.costs} | {cost / 0.7 for cost in encoder.costs})
+    candidates = [0.0] + thresholds + [(low + high) / 2 for low, high in zip(thresholds, thresholds[1:])]
+    if thresholds:
+        candidates.append(thresholds[-1] * 2)
+    budgets = {}
+    for budget_per_acre in sorted(candidates):
+        budgets.setdefault(encoder.budget_band(budget_per_acre), budget_per_acre)
+    return list(budgets.values())
+
+_table: Optional[RecommendationTable] = None
+_loaded = False
+_lock = threading.Lock()
+
+def get_recommendation_table() -> Optional[RecommendationTable]:
+    """The materialized table from RECOMMENDATION_TABLE_DIR, or None if it has not been built"""
+    global _table, _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                _table = _open_table(_table_path())
+                _loaded = True
+    return _table
+
+def reload_recommendation_table() -> Tuple[Optional[RecommendationTable], bool]:
+    """Reopen a newly published table, rebuilding it if the knowledge base changed; returns (current, swapped)"""
+    global _table, _loaded
+    # Imported here: the advisor module imports this one
+    from agents.crop_advisor import CropAdvisor
+    from data.catalog import get_knowledge_base
+
+    with _lock:
+        path = _table_path()
+        table = _table if _table is not None and _table.path == path else _open_table(path)
+        kb = get_knowledge_base()
+        if table is not None and table.fingerprint != kb.fingerprint:
+            # Its lookups would all miss; re-rank the same profile space from the current data
+            print("🔄 Knowledge base changed; rebuilding the recommendation table")
+            path = build_recommendation_table(CropAdvisor(), kb, DEFAULT_TABLE_DIR,
+                                              table.manifest.get("max_risks", 3))
+            table = _open_table(path)
+        swapped = table is not _table
+        _table = table
+        _loaded = True
+        return _table, swapped
+
+def _table_path() -> str:
+    # Tables built before versioned publishing sit directly in the directory
+    return current_directory(DEFAULT_TABLE_DIR) or DEFAULT_TABLE_DIR
+
+def _open_table(path: str) -> Optional[RecommendationTable]:
+    if not os.path.exists(os.path.join(path, "manifest.json")):
+        return None
+    table = RecommendationTable(path)
+    if table.manifest.get("format_version") != FORMAT_VERSION:
+        return None
+    print(f"📋 Loaded recommendation table ({len(table.keys)} farm profiles)")
+    return table
+
+if __name__ == "__main__":
+    sys.path.insert(0, BACKEND_DIR)
+    from agents.crop_advisor import CropAdvisor
+    from data.catalog import get_knowledge_base
+
+    args = sys.argv[1:]
+    out_dir = args[args.index("--out") + 1] if "--out" in args else DEFAULT_TABLE_DIR
+    max_risks = int(args[args.index("--max-risks") + 1]) if "--max-risks" in args else 3
+
+    started = time.perf_counter()
+    path = build_recommendation_table(CropAdvisor(), get_knowledge_base(), out_dir, max_risks)
+    table = RecommendationTable(path)
+    print(f"✅ {len(table.keys)} farm profiles, {len(table.payloads)} distinct rankings "
+          f"in {time.perf_counter() - started:.1f}s -> {path}")
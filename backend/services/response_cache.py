@@ -0,0 +1,93 @@
+"""
+Precomputed responses for static reference endpoints
+Payloads are serialized and compressed once per knowledge-base version, then served as bytes
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from data.records import json_default
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+class PrecomputedPayload:
+    """One JSON payload with its identity, gzip and brotli encodings"""
+
+    def __init__(self, payload: Dict):
+        self.body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=json_default).encode("utf-8")
+        self.digest = hashlib.sha256(self.body).hexdigest()[:32]
+        # encoding -> bytes; identity is always present
+        self.variants = {"identity": self.body, "gzip": gzip.compress(self.body, compresslevel=9, mtime=0)}
+        if BROTLI_AVAILABLE:
+            self.variants["br"] = brotli.compress(self.body, quality=11)
+
+    def etag(self, encoding: str) -> str:
+        # Strong ETags are per representation, so each encoding gets its own
+        return f'"{self.digest}"' if encoding == "identity" else f'"{self.digest}-{encoding}"'
+
+    def etags(self):
+        return [self.etag(encoding) for encoding in self.variants]
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[str, bytes]:
+        """Pick the smallest encoding the client accepts"""
+        accepted = _parse_accept_encoding(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and accepted.get(encoding, accepted.get("*", 0)) > 0:
+                return encoding, self.variants[encoding]
+        return "identity", self.body
+
+class ResponseCache:
+    """Named payloads, rebuilt only when the knowledge-base version changes"""
+
+    def __init__(self):
+        # name -> (version, PrecomputedPayload)
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, build: Callable[[], Dict], version=0) -> PrecomputedPayload:
+        entry = self._entries.get(name)
+        if entry and entry[0] == version:
+            return entry[1]
+        with self._lock:
+            entry = self._entries.get(name)
+            if not entry or entry[0] != version:
+                entry = (version, PrecomputedPayload(build()))
+                self._entries[name] = entry
+            return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def _parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    accepted = {}
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+    return accepted
+
+def etag_matches(if_none_match: Optional[str], *etags: str) -> bool:
+    """Whether an If-None-Match header matches any of the given ETags"""
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or any(etag in candidates for etag in etags)
+
+# Global instance
+response_cache = ResponseCache()
@@ -0,0 +1,315 @@
+"""
+Streaming weather observations
+Daily station observations are appended to a log and folded into running statistics per district
+in O(1) each: per-month climatology (Welford mean/variance), recent anomalies (exponentially
+weighted) and extreme-event counts per year. A checkpoint of the statistics plus the log offset
+lets a restart replay only what came after it
+"""
+
+import csv
+import json
+import os
+import tempfile
+import threading
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from data.gazetteer import Place, get_gazetteer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_WEATHER_DIR = os.getenv("WEATHER_DATA_DIR", os.path.join(BACKEND_DIR, "data", "weather"))
+
+# Weight of the newest observation in the recent anomalies (~ a 30-day window)
+ANOMALY_ALPHA = 1 / 30
+# Observations of a calendar month needed before it serves as a district's normal
+MIN_BASELINE = 20
+# IMD thresholds: heavy rain is 64.5 mm or more in a day; a heat-wave day reaches 40 °C and
+# 4.5 °C above normal, or 45 °C outright
+HEAVY_RAIN_MM = 64.5
+HEAT_WAVE_MIN_C = 40.0
+HEAT_WAVE_DEPARTURE_C = 4.5
+SEVERE_HEAT_C = 45.0
+# Plausible readings; anything else (NaN included) marks a faulty observation, rejected whole.
+# India's records are about 1,560 mm of rain in a day and 51 °C
+MAX_DAILY_RAINFALL_MM = 2000.0
+TMAX_RANGE_C = (-50.0, 60.0)
+# Statistics are checkpointed after this many new observations (and at shutdown); on restart
+# the log replay covers whatever came after the last checkpoint
+CHECKPOINT_EVERY = int(os.getenv("WEATHER_CHECKPOINT_EVERY", "50000"))
+
+LOG_FIELDS = ("station_id", "date", "latitude", "longitude", "rainfall_mm", "tmax_c")
+
+class RunningStats:
+    """Welford's online mean and variance"""
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def std(self) -> float:
+        return (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else 0.0
+
+    def to_list(self) -> List:
+        return [self.count, self.mean, self.m2]
+
+class DistrictWeather:
+    """Running statistics of every observation made in one district"""
+
+    __slots__ = ("tmax", "rainfall", "tmax_anomaly", "rainfall_anomaly", "rainfall_normal",
+                 "extremes", "observations", "last_date")
+
+    def __init__(self):
+        # Per calendar month, so anomalies are against the season's normal
+        self.tmax = [RunningStats() for _ in range(12)]
+        self.rainfall = [RunningStats() for _ in range(12)]
+        # Exponentially weighted recent departures (None until a normal exists)
+        self.tmax_anomaly: Optional[float] = None
+        self.rainfall_anomaly: Optional[float] = None
+        self.rainfall_normal: Optional[float] = None
+        # year -> [heat-wave days, heavy-rain days]
+        self.extremes: Dict[int, List[int]] = {}
+        self.observations = 0
+        self.last_date: Optional[date] = None
+
+    def add(self, day: date, rainfall_mm: Optional[float], tmax_c: Optional[float]):
+        month = day.month - 1
+        extremes = self.extremes.get(day.year)
+        if extremes is None:
+            extremes = self.extremes[day.year] = [0, 0]
+
+        if tmax_c is not None:
+            normal = self.tmax[month]
+            departure = tmax_c - normal.mean if normal.count >= MIN_BASELINE else None
+            if departure is not None:
+                self.tmax_anomaly = departure if self.tmax_anomaly is None else \
+                    self.tmax_anomaly + ANOMALY_ALPHA * (departure - self.tmax_anomaly)
+            if tmax_c >= SEVERE_HEAT_C or (
+                    tmax_c >= HEAT_WAVE_MIN_C and departure is not None and departure >= HEAT_WAVE_DEPARTURE_C):
+                extremes[0] += 1
+            normal.add(tmax_c)
+
+        if rainfall_mm is not None:
+            normal = self.rainfall[month]
+            if normal.count >= MIN_BASELINE:
+                if self.rainfall_anomaly is None:
+                    self.rainfall_anomaly, self.rainfall_normal = rainfall_mm - normal.mean, normal.mean
+                else:
+                    self.rainfall_anomaly += ANOMALY_ALPHA * (rainfall_mm - normal.mean - self.rainfall_anomaly)
+                    self.rainfall_normal += ANOMALY_ALPHA * (normal.mean - self.rainfall_normal)
+            if rainfall_mm >= HEAVY_RAIN_MM:
+                extremes[1] += 1
+            normal.add(rainfall_mm)
+
+        self.observations += 1
+        if self.last_date is None or day > self.last_date:
+            self.last_date = day
+
+    def summary(self) -> Dict:
+        """Current anomalies and this year's extreme-event counts"""
+        summary = {"observations": self.observations,
+                   "observed_through": self.last_date.isoformat() if self.last_date else None}
+        if self.tmax_anomaly is not None:
+            summary["tmax_anomaly_c"] = self.tmax_anomaly
+        if self.rainfall_anomaly is not None and self.rainfall_normal:
+            summary["rainfall_anomaly_pct"] = self.rainfall_anomaly / self.rainfall_normal * 100
+        if self.last_date is not None:
+            heat_wave_days, heavy_rain_days = self.extremes.get(self.last_date.year, (0, 0))
+            summary.update(year=self.last_date.year, heat_wave_days=heat_wave_days, heavy_rain_days=heavy_rain_days)
+        return summary
+
+    def to_dict(self) -> Dict:
+        return {
+            "tmax": [stats.to_list() for stats in self.tmax],
+            "rainfall": [stats.to_list() for stats in self.rainfall],
+            "tmax_anomaly": self.tmax_anomaly,
+            "rainfall_anomaly": self.rainfall_anomaly,
+            "rainfall_normal": self.rainfall_normal,
+            "extremes": {str(year): counts for year, counts in self.extremes.items()},
+            "observations": self.observations,
+            "last_date": self.last_date.isoformat() if self.last_date else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "DistrictWeather":
+        weather = cls()
+        weather.tmax = [RunningStats(*values) for values in data["tmax"]]
+        weather.rainfall = [RunningStats(*values) for values in data["rainfall"]]
+        weather.tmax_anomaly = data["tmax_anomaly"]
+        weather.rainfall_anomaly = data["rainfall_anomaly"]
+        weather.rainfall_normal = data["rainfall_normal"]
+        weather.extremes = {int(year): counts for year, counts in data["extremes"].items()}
+        weather.observations = data["observations"]
+        weather.last_date = date.fromisoformat(data["last_date"]) if data["last_date"] else None
+        return weather
+
+class WeatherStore:
+    """Observation log plus running statistics per district"""
+
+    def __init__(self, path: Optional[str] = DEFAULT_WEATHER_DIR, checkpoint_every: int = CHECKPOINT_EVERY):
+        # path=None keeps everything in memory (no log, no checkpoint)
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        self.districts: Dict[str, DistrictWeather] = {}
+        # station id -> district key; a station is placed once, on its first observation
+        self.stations: Dict[str, Optional[str]] = {}
+        self.observations = 0
+        self.rejected = 0
+        self._log_offset = 0
+        self._since_checkpoint = 0
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._restore()
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.path, "observations.csv")
+
+    @property
+    def checkpoint_path(self) -> str:
+        return os.path.join(self.path, "checkpoint.json")
+
+    def ingest(self, observations: Iterable[Dict]) -> int:
+        """Append observations and fold them into the statistics; returns how many were used"""
+        accepted = []
+        with self._lock:
+            for observation in observations:
+                if self._apply(observation):
+                    accepted.append(observation)
+            if self.path and accepted:
+                with open(self.log_path, "a", newline="", encoding="utf-8") as f:
+                    writer = csv.writer(f)
+                    writer.writerows([observation.get(field) for field in LOG_FIELDS] for observation in accepted)
+                    self._log_offset = f.tell()
+                self._since_checkpoint += len(accepted)
+            due = bool(self.path) and self._since_checkpoint >= self.checkpoint_every
+        if due:
+            self.checkpoint()
+        return len(accepted)
+
+    def _apply(self, observation: Dict) -> bool:
+        try:
+            rainfall_mm = _reading(observation.get("rainfall_mm"), 0.0, MAX_DAILY_RAINFALL_MM)
+            tmax_c = _reading(observation.get("tmax_c"), *TMAX_RANGE_C)
+            latitude = _reading(observation["latitude"], -90.0, 90.0)
+            longitude = _reading(observation["longitude"], -180.0, 180.0)
+            if latitude is None or longitude is None:
+                raise ValueError("Observation without a position")
+            day = observation["date"]
+            day = day if isinstance(day, date) else date.fromisoformat(day)
+        except ValueError:
+            # One bad value (a NaN above all) would poison a month's running mean for good
+            self.rejected += 1
+            return False
+        station_id = str(observation["station_id"])
+        district = self.stations.get(station_id, False)
+        if district is False:
+            place = get_gazetteer().nearest_district(latitude, longitude)
+            district = self.stations[station_id] = place.key if place else None
+        if district is None or (rainfall_mm is None and tmax_c is None):
+            self.rejected += 1
+            return False
+
+        weather = self.districts.get(district)
+        if weather is None:
+            weather = self.districts[district] = DistrictWeather()
+        weather.add(day, rainfall_mm, tmax_c)
+        self.observations += 1
+        return True
+
+    def district(self, place: Place) -> Optional[Dict]:
+        """Running summary for the place's district, or None if nothing was observed there"""
+        weather = self.districts.get(place.key)
+        return weather.summary() if weather else None
+
+    def checkpoint(self):
+        """Persist the statistics and how much of the log they cover"""
+        if not self.path:
+            return
+        with self._lock:
+            self._since_checkpoint = 0
+            state = {
+                "log_offset": self._log_offset,
+                "observations": self.observations,
+                "stations": dict(self.stations),
+                "districts": {key: weather.to_dict() for key, weather in self.districts.items()}
+            }
+        fd, staging = tempfile.mkstemp(prefix=".checkpoint-", dir=self.path)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(staging, self.checkpoint_path)
+
+    def _restore(self):
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                state = json.load(f)
+            self._log_offset = state["log_offset"]
+            self.observations = state["observations"]
+            self.stations = state["stations"]
+            self.districts = {key: DistrictWeather.from_dict(data) for key, data in state["districts"].items()}
+        if not os.path.exists(self.log_path):
+            return
+        # Observations logged after the checkpoint
+        with open(self.log_path, "rb") as f:
+            f.seek(self._log_offset)
+            pending = f.read()
+        complete = pending.rfind(b"\n") + 1
+        if complete < len(pending):
+            # A write cut short by a crash: drop the torn row so the next append starts on a fresh line
+            with open(self.log_path, "r+b") as f:
+                f.truncate(self._log_offset + complete)
+            self.rejected += 1
+        self._log_offset += complete
+        replayed = 0
+        for row in csv.reader(pending[:complete].decode("utf-8", errors="replace").splitlines()):
+            if len(row) != len(LOG_FIELDS):
+                self.rejected += 1
+                continue
+            observation = dict(zip(LOG_FIELDS, row))
+            for field in ("rainfall_mm", "tmax_c"):
+                observation[field] = observation[field] or None
+            replayed += self._apply(observation)
+        if replayed:
+            print(f"🌡️ Replayed {replayed} weather observations logged after the last checkpoint")
+        if self.rejected:
+            print(f"⚠️ Skipped {self.rejected} malformed weather log rows")
+
+    def stats(self) -> Dict:
+        return {
+            "observations": self.observations,
+            "rejected": self.rejected,
+            "stations": len(self.stations),
+            "districts": len(self.districts)
+        }
+
+def _reading(value, low: float, high: float) -> Optional[float]:
+    """The reading as a float (None if missing); ValueError unless low <= value <= high"""
+    if value is None:
+        return None
+    value = float(value)
+    # NaN fails every comparison
+    if not low <= value <= high:
+        raise ValueError(f"Implausible reading {value}")
+    return value
+
+_store: Optional[WeatherStore] = None
+_store_lock = threading.Lock()
+
+def get_weather_store() -> WeatherStore:
+    """The store in WEATHER_DATA_DIR, restored from its checkpoint and log on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = WeatherStore()
+    return _store
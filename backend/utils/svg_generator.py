@@ -1,5 +1,8 @@
-from typing import List, Dict
+from typing import List, Dict, Tuple
+from functools import lru_cache
+import hashlib
 import math
+import re
 
 class SVGGenerator:
     """Generate SVG diagrams for farm layouts"""
@@ -21,6 +24,18 @@ class SVGGenerator:
             "water": "#2196F3",
             "infrastructure": "#9E9E9E"
         }
+        self._render_cached = lru_cache(maxsize=1024)(self._render_compact)
+    
+    def render_layout(self, farm_size: float, recommended_crops: List[str],
+                      water_source: str) -> Tuple[bytes, str]:
+        """Compact SVG bytes and a strong ETag, memoized by the layout inputs"""
+        return self._render_cached(float(farm_size), tuple(recommended_crops), water_source)
+    
+    def _render_compact(self, farm_size: float, recommended_crops: Tuple[str, ...],
+                        water_source: str) -> Tuple[bytes, str]:
+        svg = self.generate_farm_layout(farm_size, list(recommended_crops), water_source)
+        body = compact_svg(svg).encode("utf-8")
+        return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
     
     def generate_farm_layout(self, farm_size: float, recommended_crops: List[str], 
                            water_source: str) -> str:
@@ -221,4 +236,10 @@ class SVGGenerator:
                   font-size="12" fill="#333">{crop.title()}</text>
             '''
         
-        return svg_content
\ No newline at end of file
+        return svg_content
+
+def compact_svg(svg: str) -> str:
+    """Strip comments and indentation whitespace from generated SVG markup"""
+    svg = re.sub(r"<!--.*?-->", "", svg, flags=re.DOTALL)
+    svg = re.sub(r">\s+<", "><", svg)
+    return re.sub(r"\s+", " ", svg).strip()
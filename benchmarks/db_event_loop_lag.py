@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark event-loop lag while saving adaptation plans
+Compares blocking CRUD calls inside async handlers with the DB thread pool
+"""
+
+import sys
+import os
+import asyncio
+import statistics
+import tempfile
+import time
+
+# Use a throwaway database before any backend module creates the engine
+DB_DIR = tempfile.mkdtemp(prefix="gra_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'bench.db')}"
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from database.models import Base, engine, SessionLocal
+from database.crud import ClimateAdaptationCRUD
+from database.async_crud import plans_db
+from utils.svg_generator import SVGGenerator
+
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "200"))
+TICK_SECONDS = 0.005
+
+FARM_DETAILS = {
+    "location": "Pune, Maharashtra",
+    "farm_size": 5.0,
+    "soil_type": "black",
+    "water_source": "borewell",
+    "current_crops": ["cotton"],
+    "budget": 100000,
+    "experience_level": "intermediate"
+}
+
+def build_plan(i: int) -> dict:
+    crops = ["Cotton", "Soybean", "Groundnut"]
+    return {
+        "farm_id": f"bench_{i}_{time.time_ns()}",
+        "climate_analysis": {"risks": ["drought", "heat_waves"]},
+        "crop_recommendations": {"recommended_crops": crops},
+        "market_analysis": {"crop_market_analysis": {crop: {"current_price": 40} for crop in crops}},
+        "government_schemes": {"recommended_schemes": []},
+        "farm_layout_svg": SVGGenerator().generate_farm_layout(5.0, crops, "borewell"),
+        "implementation_timeline": [],
+        "estimated_costs": {},
+        "expected_benefits": {}
+    }
+
+async def monitor_lag(samples: list, stop: asyncio.Event):
+    """Record how late each short sleep wakes up"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        samples.append((time.perf_counter() - started - TICK_SECONDS) * 1000)
+
+async def save_blocking(i: int):
+    # What the handlers did before: sync session work on the event loop
+    db = SessionLocal()
+    try:
+        ClimateAdaptationCRUD(db).create_adaptation_plan(FARM_DETAILS, build_plan(i))
+    finally:
+        db.close()
+
+async def save_offloaded(i: int):
+    await plans_db.create_adaptation_plan(FARM_DETAILS, build_plan(i))
+
+async def run_case(save) -> dict:
+    samples, stop = [], asyncio.Event()
+    monitor = asyncio.ensure_future(monitor_lag(samples, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(save(i) for i in range(REQUESTS)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await monitor
+
+    samples.sort()
+    return {
+        "throughput_rps": REQUESTS / elapsed,
+        "lag_p50_ms": statistics.median(samples) if samples else 0.0,
+        "lag_p99_ms": samples[int(len(samples) * 0.99) - 1] if samples else 0.0,
+        "lag_max_ms": samples[-1] if samples else 0.0,
+        "ticks": len(samples)
+    }
+
+async def main():
+    Base.metadata.create_all(bind=engine)
+    print(f"⏱️ Event-loop lag while saving {REQUESTS} plans concurrently")
+    print("=" * 60)
+    for label, save in [("blocking CRUD on loop", save_blocking), ("DB thread pool", save_offloaded)]:
+        result = await run_case(save)
+        print(f"{label:24s} {result['throughput_rps']:8.1f} req/s | "
+              f"lag p50 {result['lag_p50_ms']:6.2f} ms, p99 {result['lag_p99_ms']:7.2f} ms, "
+              f"max {result['lag_max_ms']:7.2f} ms ({result['ticks']} ticks)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark streaming weather ingestion
+Observations per second folded into the per-district running statistics, in memory and with
+the append-only log, plus checkpoint and restart (checkpoint + log replay) times
+"""
+
+import sys
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from data.gazetteer import get_gazetteer
+from services.weather_stream import WeatherStore
+
+STATIONS = int(os.getenv("BENCH_STATIONS", "500"))
+DAYS = int(os.getenv("BENCH_DAYS", "365"))
+BATCH = int(os.getenv("BENCH_BATCH", "5000"))
+
+def generate_observations() -> list:
+    """One observation per station per day, stations scattered around district headquarters"""
+    rng = random.Random(42)
+    districts = [place for place in get_gazetteer().places if place.district]
+    stations = []
+    for i in range(STATIONS):
+        place = rng.choice(districts)
+        stations.append((f"ST{i:05d}", place.latitude + rng.uniform(-0.3, 0.3), place.longitude + rng.uniform(-0.3, 0.3)))
+
+    observations = []
+    start = date(2023, 1, 1)
+    for offset in range(DAYS):
+        day = start + timedelta(days=offset)
+        seasonal = 8 * (1 if 3 <= day.month <= 6 else -1)
+        for station_id, latitude, longitude in stations:
+            observations.append({
+                "station_id": station_id,
+                "date": day,
+                "latitude": latitude,
+                "longitude": longitude,
+                "rainfall_mm": max(0.0, rng.gauss(2, 15)) if 6 <= day.month <= 9 else 0.0,
+                "tmax_c": rng.gauss(32 + seasonal, 2.5)
+            })
+    return observations
+
+def ingest(store: WeatherStore, observations: list) -> float:
+    started = time.perf_counter()
+    for start in range(0, len(observations), BATCH):
+        store.ingest(observations[start:start + BATCH])
+    return time.perf_counter() - started
+
+def main():
+    observations = generate_observations()
+    print(f"🌡️ Ingesting {len(observations):,} observations ({STATIONS} stations x {DAYS} days, batches of {BATCH})")
+    print("=" * 60)
+
+    # Place every station first so the timings cover the steady state
+    get_gazetteer()
+    warm = WeatherStore(path=None)
+    warm.ingest(observations[:STATIONS])
+
+    in_memory = WeatherStore(path=None)
+    in_memory.stations = dict(warm.stations)
+    elapsed = ingest(in_memory, observations)
+    print(f"{'in memory':24s} {len(observations) / elapsed:12,.0f} obs/s ({elapsed * 1e6 / len(observations):.2f} µs each)")
+
+    directory = tempfile.mkdtemp(prefix="gra_weather_")
+    try:
+        logged = WeatherStore(path=directory)
+        logged.stations = dict(warm.stations)
+        elapsed = ingest(logged, observations)
+        print(f"{'with observation log':24s} {len(observations) / elapsed:12,.0f} obs/s ({elapsed * 1e6 / len(observations):.2f} µs each)")
+
+        started = time.perf_counter()
+        logged.checkpoint()
+        print(f"{'checkpoint':24s} {(time.perf_counter() - started) * 1000:12.1f} ms "
+              f"({len(logged.districts)} districts)")
+
+        started = time.perf_counter()
+        WeatherStore(path=directory)
+        print(f"{'restart from checkpoint':24s} {(time.perf_counter() - started) * 1000:12.1f} ms")
+
+        os.remove(logged.checkpoint_path)
+        started = time.perf_counter()
+        WeatherStore(path=directory)
+        print(f"{'restart, full log replay':24s} {(time.perf_counter() - started) * 1000:12.1f} ms")
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    main()
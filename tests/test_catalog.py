@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from data import knowledge_base
+from data.catalog import KnowledgeBase, _to_bits, bit_positions
+
+def _schemes():
+    return [
+        {"name": "Any size", "eligibility": {"farm_size": {"min": 0, "max": None}, "states": []}},
+        {"name": "Small farms", "eligibility": {"farm_size": {"min": 0.5, "max": 2}, "states": []}},
+        {"name": "Medium farms", "eligibility": {"farm_size": {"min": 2, "max": 10}, "states": ["Punjab"]}},
+        {"name": "Large farms", "eligibility": {"farm_size": {"min": 10}, "states": ["Kerala", "Tamil Nadu"]}},
+        {"name": "No limits", "eligibility": {}},
+        {"name": "Exactly five", "eligibility": {"farm_size": {"min": 5, "max": 5}, "states": ["Punjab"]}},
+    ]
+
+def _eligible_by_size(schemes, farm_size):
+    found = []
+    for position, scheme in enumerate(schemes):
+        size = scheme.get("eligibility", {}).get("farm_size", {})
+        low, high = size.get("min", 0), size.get("max")
+        if low <= farm_size and (high is None or farm_size <= high):
+            found.append(position)
+    return found
+
+@pytest.mark.parametrize("size", [0, 1, 7, 8, 9, 64, 1000])
+def test_bits_round_trip(size):
+    rng = random.Random(size)
+    for _ in range(20):
+        positions = sorted(rng.sample(range(size), rng.randint(0, size))) if size else []
+        bits = _to_bits(positions, size)
+        assert bits == sum(1 << position for position in positions)
+        assert bit_positions(bits).tolist() == positions
+
+def test_bit_positions_of_empty_set():
+    assert bit_positions(0).tolist() == []
+
+def test_farm_size_bands_match_scan():
+    schemes = _schemes()
+    kb = KnowledgeBase([], schemes, {})
+    sizes = [-1, 0, 0.25, 0.5, 1, 2, 2.0001, 3, 4.999, 5, 5.5, 10, 10.5, 50, 1e6]
+    for farm_size in sizes:
+        assert bit_positions(kb.scheme_bits_for_farm_size(farm_size)).tolist() == _eligible_by_size(schemes, farm_size)
+
+def test_farm_size_bands_match_scan_for_catalog():
+    schemes = knowledge_base.get_schemes_data()
+    kb = KnowledgeBase([], schemes, {})
+    for farm_size in [x / 4 for x in range(0, 240)]:
+        assert bit_positions(kb.scheme_bits_for_farm_size(farm_size)).tolist() == _eligible_by_size(schemes, farm_size)
+
+def test_state_filters_include_national_schemes():
+    kb = KnowledgeBase([], _schemes(), {})
+    named = lambda bits: [scheme["name"] for scheme in kb.schemes_at(bits)]
+
+    assert named(kb.scheme_bits_for_state("punjab")) == ["Any size", "Small farms", "Medium farms", "No limits",
+                                                          "Exactly five"]
+    assert named(kb.scheme_bits_for_state("Tamil Nadu")) == ["Any size", "Small farms", "Large farms", "No limits"]
+    assert named(kb.scheme_bits_for_state("Goa")) == named(kb.national_schemes)
+    assert named(kb.scheme_bits_for_location("Madurai, Tamil Nadu")) == named(kb.scheme_bits_for_state("tamil nadu"))
+
+def test_crop_filters_match_scan():
+    crops = knowledge_base.get_crops_data()
+    kb = KnowledgeBase(crops, [], {})
+    names = lambda bits: [crop["name"] for crop in kb.crops_at(bits)]
+
+    for soil_type in ["black", "sandy loam", "red laterite", "black cotton soil", "unknown"]:
+        assert names(kb.crop_bits_for_soil(soil_type)) == [
+            crop["name"] for crop in crops
+            if not crop.get("soil_types") or any(soil in soil_type for soil in crop["soil_types"])
+        ]
+    for levels in [["low"], ["low", "medium"], ["low", "medium", "high"], []]:
+        assert names(kb.crop_bits_for_water_requirements(levels)) == [
+            crop["name"] for crop in crops if crop.get("water_requirement", "medium") in levels
+        ]
+    for location, risks in [("arid rajasthan", []), ("tropical coast", ["flooding"]), ("nowhere", ["drought"])]:
+        assert names(kb.crop_bits_for_climate(location, tolerant_to=risks)) == [
+            crop["name"] for crop in crops
+            if not crop.get("climate_zones") or any(zone in location for zone in crop["climate_zones"])
+            or any(crop.get("risk_tolerance", {}).get(risk) == "high" for risk in risks)
+        ]
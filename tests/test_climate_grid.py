@@ -0,0 +1,117 @@
+import asyncio
+import calendar
+import os
+
+import numpy as np
+import pytest
+
+from agents import climate_analyzer as climate_analyzer_module
+from agents.climate_analyzer import ClimateAnalyzer
+from data import climate_grid as climate_grid_module
+from data.climate_grid import IMD_GRIDS, ClimateGrid, build_climate_grid, reload_climate_grid
+from services.weather_stream import WeatherStore
+
+# A 4x4 one-degree patch around Pune (18.52, 73.86), cell (1, 1); the row above is missing
+SMALL_GRID = {"lat0": 17.5, "lon0": 72.5, "step": 1.0, "nlat": 4, "nlon": 4}
+YEARS = range(2001, 2007)
+
+def _write_years(directory, variable, daily_value):
+    """One .grd file per year; daily_value(year, cell_row, cell_col) -> value (None marks missing)"""
+    grid = IMD_GRIDS[variable]
+    os.makedirs(directory, exist_ok=True)
+    for year in YEARS:
+        days = 366 if calendar.isleap(year) else 365
+        values = np.full((days, grid["nlat"], grid["nlon"]), grid["missing"], dtype="<f4")
+        for row in range(grid["nlat"]):
+            for col in range(grid["nlon"]):
+                value = daily_value(year, row, col)
+                if value is not None:
+                    values[:, row, col] = value
+        values.tofile(os.path.join(directory, f"ind{year}_rfp25.grd"))
+    return str(directory)
+
+@pytest.fixture
+def small_grids(monkeypatch):
+    monkeypatch.setitem(IMD_GRIDS, "rainfall", dict(SMALL_GRID, missing=-999.0, aggregate="sum"))
+    monkeypatch.setitem(IMD_GRIDS, "tmax", dict(SMALL_GRID, missing=99.9, aggregate="mean"))
+
+def _build(tmp_path, rain_per_day=3.0, tmax=36.0):
+    # Rainfall doubles over the record at (1, 1); row 2 has no rainfall data at all
+    rainfall = _write_years(tmp_path / "rain", "rainfall",
+                            lambda year, row, col: None if row == 2 else rain_per_day * (1 + (year - 2001) / 5))
+    temperature = _write_years(tmp_path / "tmax", "tmax", lambda year, row, col: tmax + (year - 2001) * 0.2)
+    return build_climate_grid({"rainfall": rainfall, "tmax": temperature}, str(tmp_path / "climate"))
+
+def test_profile_reads_the_cell_series(tmp_path, small_grids):
+    grid = ClimateGrid(_build(tmp_path))
+    assert (grid.start_year, grid.years) == (2001, len(YEARS))
+
+    profile = grid.profile(18.52, 73.86)
+    annual = [sum(3.0 * (1 + (year - 2001) / 5) * calendar.monthrange(year, month)[1] for month in range(1, 13))
+              for year in YEARS]
+    assert profile["period"] == "2001-2006"
+    assert profile["mean_annual_rainfall_mm"] == pytest.approx(np.mean(annual), rel=1e-5)
+    assert profile["rainfall_trend_pct"] > 0
+    assert profile["mean_tmax_c"] == pytest.approx(36.0 + 0.2 * np.mean(range(len(YEARS))), rel=1e-5)
+    assert profile["hot_month_frequency"] == 0.0
+    # Outside every grid, beyond the search radius
+    assert grid.profile(35.0, 95.0) is None
+
+def test_missing_cells_use_the_nearest_cell_with_data(tmp_path, small_grids):
+    grid = ClimateGrid(_build(tmp_path))
+    # Row 2 has no rainfall: the nearest row with data is read instead (ties go to the southern one)
+    assert grid.cell("rainfall", 19.5, 73.5) == 1 * 4 + 1
+    assert grid.cell("tmax", 19.5, 73.5) == 2 * 4 + 1
+
+def test_reload_swaps_only_when_a_new_grid_is_published(tmp_path, small_grids, monkeypatch):
+    monkeypatch.setattr(climate_grid_module, "DEFAULT_CLIMATE_DIR", str(tmp_path / "climate"))
+    monkeypatch.setattr(climate_grid_module, "_climate_grid", None)
+    monkeypatch.setattr(climate_grid_module, "_loaded", False)
+
+    assert reload_climate_grid() == (None, False)
+    _build(tmp_path)
+    first, swapped = reload_climate_grid()
+    assert swapped and first is not None
+    assert reload_climate_grid() == (first, False)
+
+    _build(tmp_path, rain_per_day=6.0)
+    second, swapped = reload_climate_grid()
+    assert swapped and second.path != first.path
+    assert second.profile(18.52, 73.86)["mean_annual_rainfall_mm"] == pytest.approx(
+        2 * first.profile(18.52, 73.86)["mean_annual_rainfall_mm"], rel=1e-5)
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    async def no_sleep(delay):
+        return None
+    monkeypatch.setattr(climate_analyzer_module.asyncio, "sleep", no_sleep)
+    monkeypatch.setattr(climate_analyzer_module, "get_climate_tiles", lambda: None)
+    monkeypatch.setattr(climate_analyzer_module, "get_weather_store", lambda: WeatherStore(path=None))
+    return ClimateAnalyzer()
+
+def test_analyzer_scores_risks_from_the_grid(tmp_path, small_grids, analyzer, monkeypatch):
+    grid = ClimateGrid(_build(tmp_path, tmax=40.0))
+    monkeypatch.setattr(climate_analyzer_module, "get_climate_grid", lambda: grid)
+    result = asyncio.run(analyzer.analyze_risks("Pune, Maharashtra", []))
+    # Every month averages 40 °C or more: the heat-wave indicator is at its top
+    assert result["severity_scores"]["heat_waves"] == 1.0
+    assert result["climate_trends"]["data_period"] == "2001-2006"
+    assert result["climate_trends"]["temperature_trend"] == f"{grid.profile(18.52, 73.86)['warming_c']:+.1f}°C over last decade"
+
+def test_analyzer_falls_back_to_regional_defaults_without_a_grid(analyzer, monkeypatch):
+    monkeypatch.setattr(climate_analyzer_module, "get_climate_grid", lambda: None)
+    result = asyncio.run(analyzer.analyze_risks("Pune, Maharashtra", ["cyclones"]))
+    assert result["risks"] == ["drought", "irregular_rainfall", "heat_waves", "cyclones"]
+    assert result["severity_scores"] == {"drought": 0.7, "irregular_rainfall": 0.6, "heat_waves": 0.8, "cyclones": 0.9}
+    assert result["climate_trends"]["temperature_trend"] == "+1.2°C over last decade"
+    assert "data_period" not in result["climate_trends"]
+    assert result["urgency_level"] == "High"
+
+def test_analyzer_falls_back_to_regional_defaults_outside_the_grid(tmp_path, small_grids, analyzer, monkeypatch):
+    grid = ClimateGrid(_build(tmp_path))
+    monkeypatch.setattr(climate_analyzer_module, "get_climate_grid", lambda: grid)
+    # Ludhiana is far outside the patch
+    result = asyncio.run(analyzer.analyze_risks("Ludhiana, Punjab", []))
+    assert result["severity_scores"] == {"water_scarcity": 0.7, "soil_degradation": 0.5,
+                                         "temperature_fluctuations": 0.4}
+    assert "data_period" not in result["climate_trends"]
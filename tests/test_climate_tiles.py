@@ -0,0 +1,95 @@
+import asyncio
+import calendar
+import json
+import os
+
+import numpy as np
+import pytest
+
+from agents import climate_analyzer as climate_analyzer_module
+from agents.climate_analyzer import ClimateAnalyzer
+from data.climate_grid import IMD_GRIDS, ClimateGrid, build_climate_grid
+from data.gazetteer import get_gazetteer
+from data.records import json_default
+from services import climate_tiles as climate_tiles_module
+from services.climate_tiles import ClimateTiles, build_climate_tiles, reload_climate_tiles
+from services.weather_stream import WeatherStore
+
+# A 4x4 one-degree patch over western Maharashtra; places within MAX_CELL_SEARCH cells of it get tiles
+SMALL_GRID = {"lat0": 17.5, "lon0": 72.5, "step": 1.0, "nlat": 4, "nlon": 4}
+YEARS = range(2001, 2009)
+LOCATIONS = ["Pune, Maharashtra", "Mumbai", "Nashik, Maharashtra", "Latur", "Kolhapur, Maharashtra",
+             "Jaipur, Rajasthan", "Ludhiana, Punjab", "Kochi, Kerala", "unknown place"]
+
+def _write_years(directory, variable, daily_value):
+    grid = IMD_GRIDS[variable]
+    os.makedirs(directory, exist_ok=True)
+    rows, cols = np.meshgrid(np.arange(grid["nlat"]), np.arange(grid["nlon"]), indexing="ij")
+    for year in YEARS:
+        days = 366 if calendar.isleap(year) else 365
+        day_numbers = np.arange(days)[:, None, None]
+        values = daily_value(year, day_numbers, rows, cols).astype("<f4")
+        values.tofile(os.path.join(directory, f"{variable}{year}.grd"))
+    return str(directory)
+
+@pytest.fixture
+def grid(tmp_path, monkeypatch):
+    monkeypatch.setitem(IMD_GRIDS, "rainfall", dict(SMALL_GRID, missing=-999.0, aggregate="sum"))
+    monkeypatch.setitem(IMD_GRIDS, "tmax", dict(SMALL_GRID, missing=99.9, aggregate="mean"))
+    # Cells differ in wetness, variability and warming, so districts get different tiles
+    rainfall = _write_years(tmp_path / "rain", "rainfall", lambda year, day, row, col: np.broadcast_to(
+        (2.0 + col) * (1 + 0.3 * row * ((year * 7) % 5 - 2) / 2) * (day % 3 == 0), (len(day), 4, 4)))
+    tmax = _write_years(tmp_path / "tmax", "tmax", lambda year, day, row, col: np.broadcast_to(
+        33.0 + row + 0.1 * col * (year - 2001) + 4 * np.sin(day / 58.0), (len(day), 4, 4)))
+    return ClimateGrid(build_climate_grid({"rainfall": rainfall, "tmax": tmax}, str(tmp_path / "climate")))
+
+@pytest.fixture
+def analyzer(grid, monkeypatch):
+    async def no_sleep(delay):
+        return None
+    monkeypatch.setattr(climate_analyzer_module.asyncio, "sleep", no_sleep)
+    monkeypatch.setattr(climate_analyzer_module, "get_climate_grid", lambda: grid)
+    monkeypatch.setattr(climate_analyzer_module, "get_weather_store", lambda: WeatherStore(path=None))
+    return ClimateAnalyzer()
+
+def _analyze(analyzer, monkeypatch, tiles, location, concerns):
+    monkeypatch.setattr(climate_analyzer_module, "get_climate_tiles", lambda: tiles)
+    # Compared as served: tile payloads are frozen (tuples), live ones are lists
+    return json.loads(json.dumps(asyncio.run(analyzer.analyze_risks(location, concerns)), default=json_default))
+
+def test_tile_lookups_match_live_analysis(tmp_path, grid, analyzer, monkeypatch):
+    tiles = ClimateTiles(build_climate_tiles(analyzer, get_gazetteer(), grid, str(tmp_path / "tiles")))
+    served_tiles = [tiles.lookup(place) for place in get_gazetteer().places]
+    assert len({json.dumps(tile, default=json_default) for tile in served_tiles if tile}) > 1
+    hits, misses = tiles.hits, tiles.misses
+    for location in LOCATIONS:
+        for concerns in ([], ["drought", "flooding", "cyclones"], ["water_scarcity", "heat_waves"]):
+            served = _analyze(analyzer, monkeypatch, tiles, location, concerns)
+            live = _analyze(analyzer, monkeypatch, None, location, concerns)
+            assert served == live, (location, concerns)
+    # Places near the patch were served from tiles; the rest fell through to the grid and defaults
+    assert tiles.hits > hits and tiles.misses > misses
+
+def test_grid_assessment_covers_only_indicated_risks(grid):
+    severities, trends = ClimateAnalyzer().grid_assessment({"period": "2001-2008", "rainfall_cv": 0.25})
+    assert severities == {"irregular_rainfall": 0.6}
+    assert trends["data_period"] == "2001-2008"
+    severities, _ = ClimateAnalyzer().grid_assessment(grid.profile(18.52, 73.86))
+    assert set(severities) == set(climate_analyzer_module.SEVERITY_INDICATORS)
+
+def test_reload_swaps_only_when_new_tiles_are_published(tmp_path, grid, monkeypatch):
+    out_dir = str(tmp_path / "tiles")
+    monkeypatch.setattr(climate_tiles_module, "DEFAULT_TILES_DIR", out_dir)
+    monkeypatch.setattr(climate_tiles_module, "_tiles", None)
+    monkeypatch.setattr(climate_tiles_module, "_loaded", False)
+
+    assert reload_climate_tiles() == (None, False)
+    build_climate_tiles(ClimateAnalyzer(), get_gazetteer(), grid, out_dir)
+    first, swapped = reload_climate_tiles()
+    assert swapped and first is not None
+    assert reload_climate_tiles() == (first, False)
+
+    build_climate_tiles(ClimateAnalyzer(), get_gazetteer(), grid, out_dir)
+    second, swapped = reload_climate_tiles()
+    assert swapped and second.path != first.path
+    assert second.manifest["districts"] == first.manifest["districts"]
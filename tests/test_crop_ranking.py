@@ -0,0 +1,200 @@
+import asyncio
+import itertools
+import json
+import random
+
+import numpy as np
+import pytest
+
+from agents import crop_advisor as crop_advisor_module
+from agents.crop_advisor import CropAdvisor
+from data import knowledge_base
+from data.catalog import KnowledgeBase, get_knowledge_base
+from data.records import json_default
+
+LOCATIONS = ["Pune, Maharashtra", "tropical coast, Kerala", "arid Rajasthan", "Ludhiana, Punjab temperate",
+             "subtropical hills"]
+SOILS = ["black", "loamy", "sandy loam", "clay", "red laterite", "black cotton soil"]
+WATER_SOURCES = ["borewell", "canal", "river", "rainfed", "open well"]
+RISK_SETS = [[], ["drought"], ["drought", "heat_waves"], ["flooding", "pest_outbreaks"], ["drought", "drought"]]
+BUDGETS = [(20000, 3), (300000, 3), (50000, 0)]
+
+# Reference: the original list scans over the raw knowledge base, before indexes and vectorized scoring
+
+def _reference_filter(crops, location, soil_type, water_source, climate_risks):
+    def climate_ok(crop):
+        zones = crop.get("climate_zones", [])
+        if any(zone in location for zone in zones):
+            return True
+        tolerance = crop.get("risk_tolerance", {})
+        if any(tolerance.get(risk) == "high" for risk in climate_risks):
+            return True
+        return len(zones) == 0
+
+    def soil_ok(crop):
+        soils = crop.get("soil_types", [])
+        return not soils or any(soil in soil_type for soil in soils)
+
+    def water_ok(crop):
+        requirement = crop.get("water_requirement", "medium")
+        if "bore" in water_source or "well" in water_source:
+            return requirement in ["low", "medium"]
+        if "river" in water_source or "canal" in water_source:
+            return True
+        return requirement == "low"
+
+    return [crop for crop in crops if climate_ok(crop) and soil_ok(crop) and water_ok(crop)]
+
+def _reference_score(crop, farm_details, climate_risks):
+    score = 50
+    tolerance = crop.get("risk_tolerance", {})
+    for risk in climate_risks:
+        score += {"high": 15, "medium": 5}.get(tolerance.get(risk), 0)
+    price = crop.get("market_price_per_kg", 0)
+    score += 10 if price > 50 else 5 if price > 20 else 0
+    days = crop.get("growth_duration_days", 120)
+    score += 10 if days < 90 else -5 if days > 180 else 0
+    cost = crop.get("input_cost_per_acre", 0)
+    per_acre = farm_details.get("budget", 0) / max(farm_details.get("farm_size", 1), 1)
+    score += 15 if cost <= per_acre * 0.7 else 5 if cost <= per_acre else -10
+    return min(100, max(0, score))
+
+def _reference_reason(crop, farm_details, climate_risks):
+    reasons = []
+    tolerance = crop.get("risk_tolerance", {})
+    resilient_to = [risk for risk in climate_risks if tolerance.get(risk) == "high"]
+    if resilient_to:
+        reasons.append(f"Highly resilient to {', '.join(resilient_to)}")
+    if crop.get("market_price_per_kg", 0) > 50:
+        reasons.append("High market value")
+    if crop.get("growth_duration_days", 120) < 90:
+        reasons.append("Quick harvest cycle")
+    per_acre = farm_details.get("budget", 0) / max(farm_details.get("farm_size", 1), 1)
+    if crop.get("input_cost_per_acre", 0) <= per_acre * 0.7:
+        reasons.append("Budget-friendly")
+    return "; ".join(reasons) if reasons else "Suitable for your farm conditions"
+
+def _reference_ranking(farm_details, climate_risks):
+    suitable = _reference_filter(
+        knowledge_base.get_crops_data(), farm_details["location"].lower(), farm_details["soil_type"].lower(),
+        farm_details["water_source"].lower(), climate_risks
+    )
+    scored = [
+        dict(crop, suitability_score=_reference_score(crop, farm_details, climate_risks),
+             recommendation_reason=_reference_reason(crop, farm_details, climate_risks))
+        for crop in suitable
+    ]
+    # Stable: ties keep catalog order
+    return sorted(scored, key=lambda crop: crop["suitability_score"], reverse=True)
+
+def _as_json(value):
+    # What the API serves: records and views export as plain dicts, tuples as lists
+    return json.loads(json.dumps(value, default=json_default))
+
+def _profiles():
+    for location, soil, water, risks, (budget, size) in itertools.product(
+        LOCATIONS, SOILS, WATER_SOURCES, RISK_SETS, BUDGETS
+    ):
+        yield {"location": location, "soil_type": soil, "water_source": water, "budget": budget,
+               "farm_size": size}, risks
+
+@pytest.fixture
+def live_advisor(monkeypatch):
+    """CropAdvisor computing every ranking live (no materialized table, no simulated latency)"""
+    monkeypatch.setattr(crop_advisor_module, "get_recommendation_table", lambda: None)
+
+    async def no_sleep(delay):
+        return None
+    monkeypatch.setattr(crop_advisor_module.asyncio, "sleep", no_sleep)
+    return CropAdvisor()
+
+def test_index_filters_match_list_scans(live_advisor):
+    kb = get_knowledge_base()
+    for farm_details, risks in _profiles():
+        positions = live_advisor._filter_crops_by_conditions(
+            kb, farm_details["location"].lower(), farm_details["soil_type"], farm_details["water_source"], risks
+        )
+        expected = _reference_filter(
+            knowledge_base.get_crops_data(), farm_details["location"].lower(), farm_details["soil_type"],
+            farm_details["water_source"], risks
+        )
+        assert [kb.crops[position]["name"] for position in positions] == [crop["name"] for crop in expected]
+
+def test_recommendations_match_original_ranking(live_advisor):
+    for farm_details, risks in _profiles():
+        result = asyncio.run(live_advisor.recommend_crops(farm_details, risks))
+        expected = _reference_ranking(farm_details, risks)[:5]
+
+        assert result["recommended_crops"] == [crop["name"] for crop in expected], (farm_details, risks)
+        assert _as_json(result["detailed_recommendations"]) == expected
+
+def test_batch_matches_single_requests(live_advisor):
+    profiles = list(_profiles())[::7]
+    batch = asyncio.run(live_advisor.recommend_crops_batch(
+        [farm for farm, _ in profiles], [risks for _, risks in profiles]
+    ))
+    for (farm_details, risks), result in zip(profiles, batch):
+        single = asyncio.run(live_advisor.recommend_crops(farm_details, risks))
+        assert result["recommended_crops"] == single["recommended_crops"]
+        assert result["yield_estimates"] == single["yield_estimates"]
+        assert result["crop_rotation_plan"] == single["crop_rotation_plan"]
+
+def test_crop_lookup_by_name_is_case_insensitive():
+    kb = get_knowledge_base()
+    for crop in knowledge_base.get_crops_data():
+        assert _as_json(kb.get_crop(crop["name"].upper())) == crop
+    assert kb.get_crop("no such crop") is None
+
+def _synthetic_crops(count, seed=7):
+    # Few distinct values, so scores tie often and top-k has to break ties by catalog order
+    rng = random.Random(seed)
+    risks = ["drought", "flooding", "heat_waves", "pest_attacks"]
+    crops = []
+    for i in range(count):
+        crop = {
+            "name": f"Crop {i}",
+            "category": rng.choice(["food_grain", "cash_crop", "vegetable"]),
+            "climate_zones": rng.sample(["tropical", "arid", "temperate"], rng.randint(0, 2)),
+            "soil_types": rng.sample(["black", "loamy", "clay"], rng.randint(0, 2)),
+            "water_requirement": rng.choice(["low", "medium", "high"]),
+            "season": rng.choice(["kharif", "rabi", "summer", "both"]),
+            "growth_duration_days": rng.choice([60, 90, 120, 200]),
+            "market_price_per_kg": rng.choice([10, 21, 50, 51]),
+            "input_cost_per_acre": rng.choice([5000, 14000, 20000, 40000]),
+            "risk_tolerance": {risk: rng.choice(["high", "medium", "low"]) for risk in rng.sample(risks, 2)}
+        }
+        if rng.random() < 0.1:
+            del crop["growth_duration_days"]
+        crops.append(crop)
+    return crops
+
+@pytest.mark.parametrize("risks", [[], ["drought"], ["flooding", "heat_waves", "unknown"], ["drought", "drought"]])
+@pytest.mark.parametrize("budget", [0, 40000, 60000, 200000])
+def test_vectorized_scores_and_top_k_match_scalar_reference(risks, budget):
+    crops = _synthetic_crops(400)
+    kb = KnowledgeBase(crops, [], {})
+    farm_details = {"budget": budget, "farm_size": 2}
+    advisor = CropAdvisor()
+
+    ids = np.arange(len(crops))
+    scores, _ = advisor._score_crops(kb.crop_table, ids, farm_details, risks)
+    assert scores.tolist() == [_reference_score(crop, farm_details, risks) for crop in crops]
+
+    ranking = advisor._rank_candidates(kb, ids, farm_details, risks)
+    expected = sorted(
+        range(len(crops)), key=lambda i: _reference_score(crops[i], farm_details, risks), reverse=True
+    )[:5]
+    assert [crop_id for crop_id, _, _ in ranking["ranked"]] == expected
+
+    result = advisor._finish_recommendations(kb, ranking, farm_details, risks)
+    assert [crop["recommendation_reason"] for crop in result["detailed_recommendations"]] == [
+        _reference_reason(crops[i], farm_details, risks) for i in expected
+    ]
+
+def test_top_k_orders_ties_by_catalog_position():
+    advisor = CropAdvisor()
+    scores = np.array([3, 7, 7, 1, 7, 3, 9, 7])
+    assert advisor._top_k(scores, 3).tolist() == [6, 1, 2]
+    assert advisor._top_k(scores, 20).tolist() == [6, 1, 2, 4, 7, 0, 5, 3]
+    assert advisor._top_k(scores, 2, mask=scores < 7).tolist() == [0, 5]
+    assert advisor._top_k(scores, 2, mask=scores > 100).tolist() == []
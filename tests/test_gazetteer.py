@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from data.gazetteer import NameMatcher, Place, get_gazetteer, haversine_km, resolve_location
+
+@pytest.mark.parametrize("location, key", [
+    ("Pune, Maharashtra", "Maharashtra/Pune"),
+    ("PUNE   maharashtra!", "Maharashtra/Pune"),
+    ("East Khasi Hills, Meghalaya", "Meghalaya/East Khasi Hills"),
+    ("Nagpur district", "Maharashtra/Nagpur"),
+    # Aliases and old names
+    ("Bombay", "Maharashtra/Mumbai"),
+    ("near Bangalore", "Karnataka/Bengaluru Urban"),
+    ("Orissa", "Odisha"),
+    # Misspellings
+    ("Ludhiyana, Punjab", "Punjab/Ludhiana"),
+    ("Kerela", "Kerala"),
+    # A name inside a longer one is part of it
+    ("Jammu and Kashmir", "Jammu and Kashmir"),
+    ("Jammu, Jammu and Kashmir", "Jammu and Kashmir/Jammu"),
+    # Districts sharing a name: the state picks one
+    ("Aurangabad, Bihar", "Bihar/Aurangabad"),
+    ("Aurangabad Maharashtra", "Maharashtra/Aurangabad"),
+])
+def test_resolves_known_places(location, key):
+    assert get_gazetteer().resolve(location).key == key
+
+@pytest.mark.parametrize("location", ["", "somewhere nice", "my farm", "Pun"])
+def test_unknown_text_resolves_to_none(location):
+    assert get_gazetteer().resolve(location) is None
+
+def test_names_match_whole_words_only():
+    # "Goa" inside "Goatherd" is not a place
+    assert get_gazetteer().resolve("Goatherd village") is None
+
+def test_resolve_location_is_cached_per_normalized_text():
+    first = resolve_location("Ludhiana, Punjab")
+    assert resolve_location("  ludhiana punjab ") is first
+    assert resolve_location(None) is None
+
+def test_place_key_and_read_only():
+    district = Place("Punjab", "Ludhiana", 30.9, 75.85)
+    state = Place("Punjab", None, 31.1, 75.3)
+    assert district.key == "Punjab/Ludhiana"
+    assert state.key == "Punjab"
+    with pytest.raises(TypeError):
+        district.state = "Haryana"
+
+def test_haversine_known_distance():
+    # Delhi to Mumbai, about 1150 km
+    assert haversine_km(28.6139, 77.2090, 19.0760, 72.8777) == pytest.approx(1150, abs=10)
+    assert haversine_km(10, 20, 10, 20) == 0
+
+def test_nearest_district_is_brute_force_minimum():
+    gazetteer = get_gazetteer()
+    rng = random.Random(3)
+    districts = [place for place in gazetteer.places if place.district]
+    for _ in range(25):
+        latitude, longitude = rng.uniform(8, 35), rng.uniform(68, 97)
+        nearest = gazetteer.nearest_district(latitude, longitude)
+        assert nearest.distance_km(latitude, longitude) == min(
+            place.distance_km(latitude, longitude) for place in districts
+        )
+
+def test_name_matcher_finds_every_occurrence():
+    rng = random.Random(5)
+    for _ in range(50):
+        patterns = {"".join(rng.choice("ab") for _ in range(rng.randint(1, 4))) for _ in range(6)}
+        payloads = {pattern: [position] for position, pattern in enumerate(sorted(patterns))}
+        text = "".join(rng.choice("abc") for _ in range(30))
+
+        expected = sorted(
+            (start, start + len(pattern), payloads[pattern][0])
+            for pattern in patterns for start in range(len(text)) if text.startswith(pattern, start)
+        )
+        assert sorted(NameMatcher(payloads).find(text)) == expected
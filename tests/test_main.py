@@ -0,0 +1,132 @@
+import asyncio
+import copy
+import json
+import os
+import tempfile
+
+import pytest
+
+# Importing the app creates its tables; keep them out of the working tree
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'plans.db')}")
+
+import main
+from services.plan_cache import PlanCache
+
+ITEM = {
+    "farm_details": {
+        "location": "Pune, Maharashtra",
+        "farm_size": 5.0,
+        "soil_type": "Black",
+        "water_source": "borewell",
+        "current_crops": ["cotton"],
+        "budget": 100000,
+        "experience_level": "intermediate"
+    },
+    "climate_concerns": ["drought"],
+    "adaptation_goals": ["water conservation"]
+}
+
+def _item(**farm_changes):
+    item = copy.deepcopy(ITEM)
+    item["farm_details"].update(farm_changes)
+    return item
+
+class SavedPlans:
+    """Stands in for plans_db: records what would be saved"""
+
+    def __init__(self):
+        self.saved = []
+
+    async def create_adaptation_plans(self, entries):
+        self.saved.extend(entries)
+        return list(range(len(self.saved) - len(entries) + 1, len(self.saved) + 1))
+
+@pytest.fixture
+def saved(monkeypatch):
+    async def no_sleep(delay):
+        return None
+    monkeypatch.setattr(main.asyncio, "sleep", no_sleep)
+    saved = SavedPlans()
+    monkeypatch.setattr(main.plans_db, "create_adaptation_plans", saved.create_adaptation_plans)
+    return saved
+
+def _batch(items):
+    return asyncio.run(main.analyze_climate_adaptation_batch(main.BatchAnalysisRequest(items=items)))
+
+@pytest.mark.parametrize("persist_hits", [False, True])
+def test_batch_persists_cache_hits_only_when_configured(saved, monkeypatch, persist_hits):
+    monkeypatch.setattr(main, "plan_cache", PlanCache(persist_hits=persist_hits))
+    first = _batch([_item(), _item(location="Ludhiana, Punjab")])
+    assert first["succeeded"] == 2 and len(saved.saved) == 2
+
+    second = _batch([_item(), _item(location="Ludhiana, Punjab"), _item(location="Nagpur, Maharashtra")])
+    assert second["succeeded"] == 3
+    assert [result["cached"] for result in second["results"]] == [True, True, False]
+    if persist_hits:
+        assert len(saved.saved) == 5
+        assert all(result["plan_id"] is not None for result in second["results"])
+    else:
+        # Only the miss gets a row; hits still get their own farm id
+        assert len(saved.saved) == 3
+        assert [result["plan_id"] is None for result in second["results"]] == [True, True, False]
+        assert second["results"][0]["adaptation_plan"]["farm_layout_url"] is None
+    farm_ids = [result["adaptation_plan"]["farm_id"] for result in first["results"] + second["results"]]
+    assert len(set(farm_ids)) == len(farm_ids)
+
+def test_batch_falls_back_to_single_crop_scoring_when_the_batch_fails(saved, monkeypatch):
+    monkeypatch.setattr(main, "plan_cache", PlanCache(enabled=False))
+    expected = _batch([_item(), _item(soil_type="Loamy")])
+
+    async def failing_batch(farms, climate_risks):
+        raise RuntimeError("scoring failed")
+    recommend_crops = main.crop_advisor.recommend_crops
+    async def failing_for_sandy(farm_details, climate_risks):
+        if farm_details["soil_type"] == "Sandy":
+            raise ValueError("no crops for sandy soil")
+        return await recommend_crops(farm_details, climate_risks)
+    monkeypatch.setattr(main.crop_advisor, "recommend_crops_batch", failing_batch)
+    monkeypatch.setattr(main.crop_advisor, "recommend_crops", failing_for_sandy)
+
+    result = _batch([_item(), _item(soil_type="Sandy"), _item(soil_type="Loamy")])
+    assert (result["succeeded"], result["failed"]) == (2, 1)
+    assert result["results"][1] == {"index": 1, "success": False, "error": "no crops for sandy soil"}
+    for served, reference in zip((result["results"][0], result["results"][2]), expected["results"]):
+        assert served["adaptation_plan"]["crop_recommendations"] == reference["adaptation_plan"]["crop_recommendations"]
+
+@pytest.fixture
+def failing_gen_ai(saved, monkeypatch):
+    async def generate_climate_analysis(**kwargs):
+        raise RuntimeError("provider returned garbage")
+    monkeypatch.setattr(main.gen_ai_service, "is_available", lambda: True)
+    monkeypatch.setattr(main.gen_ai_service, "generate_climate_analysis", generate_climate_analysis)
+    monkeypatch.setattr(main, "plan_cache", PlanCache(enabled=False))
+
+def _rule_based_plan(monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(main.gen_ai_service, "is_available", lambda: False)
+        plan, _ = asyncio.run(main._generate_adaptation_plan(main.ClimateAdaptationRequest(**ITEM)))
+    return plan
+
+@pytest.mark.parametrize("race_mode", [True, False])
+def test_failed_gen_ai_falls_back_to_the_rule_based_plan(failing_gen_ai, monkeypatch, race_mode):
+    monkeypatch.setattr(main.gen_ai_service, "race_mode", race_mode)
+    plan, timings = asyncio.run(main._generate_adaptation_plan(main.ClimateAdaptationRequest(**ITEM)))
+    assert plan["ai_powered"] is False and "gen_ai" not in timings
+    expected = _rule_based_plan(monkeypatch)
+    for section in main.agent_pipeline.stages:
+        assert plan[section] == expected[section]
+
+def test_failed_gen_ai_still_completes_the_stream(failing_gen_ai, monkeypatch):
+    class Saved:
+        id = 7
+    async def create_adaptation_plan(farm_details, adaptation_plan):
+        return Saved()
+    monkeypatch.setattr(main.plans_db, "create_adaptation_plan", create_adaptation_plan)
+
+    async def consume():
+        return [json.loads(line) async for line in main._stream_plan_events(main.ClimateAdaptationRequest(**ITEM), False)]
+    events = asyncio.run(consume())
+    assert [event["event"] for event in events if event["event"] != "section"] == ["complete"]
+    assert events[-1]["ai_powered"] is False and events[-1]["plan_id"] == 7
+    sections = {event["section"] for event in events if event["event"] == "section"}
+    assert set(main.agent_pipeline.stages) <= sections
@@ -0,0 +1,150 @@
+import csv
+import os
+from datetime import date, timedelta
+
+import numpy as np
+
+from data import mandi_prices as mandi_prices_module
+from data.gazetteer import Place
+from data.mandi_prices import (SEGMENT_LIST, MandiPriceStore, append_price_dumps, compact_price_store, read_price_dump,
+                               reload_mandi_store, segment_names)
+
+HEADER = ["State", "District", "Market", "Commodity", "Variety", "Grade", "Arrival_Date",
+          "Min_x0020_Price", "Max_x0020_Price", "Modal_x0020_Price"]
+START = date(2025, 1, 1)
+
+def _dump(path, rows):
+    """rows: (state, district, market, commodity, day, modal price per quintal)"""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for state, district, market, commodity, day, modal in rows:
+            writer.writerow([state, district, market, commodity, "Other", "FAQ", day.strftime("%d/%m/%Y"),
+                             modal - 100, modal + 100, modal])
+    return str(path)
+
+def _series(state, district, market, commodity, days, price, step=0.0):
+    return [(state, district, market, commodity, START + timedelta(days=n), price + step * n) for n in range(days)]
+
+def test_read_price_dump_normalizes_and_skips_bad_rows(tmp_path):
+    path = tmp_path / "dump.csv"
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerow(["Maharashtra", "Pune", "Pune", "Soyabean", "", "", "01/02/2025", "1", "2", "4500"])
+        writer.writerow(["Maharashtra", "Pune", "Pune", "Paddy(Dhan)(Common)", "", "", "2025-02-02", "1", "2", "2300"])
+        writer.writerow(["Maharashtra", "Pune", "Pune", "Onion", "", "", "not a date", "1", "2", "900"])
+        writer.writerow(["Maharashtra", "Pune", "Pune", "Onion", "", "", "03/02/2025", "1", "2", "0"])
+        writer.writerow([])
+    rows = list(read_price_dump(str(path)))
+    assert [(crop, date.fromordinal(day), modal) for crop, _, _, _, day, _, _, modal in rows] == [
+        ("soybean", date(2025, 2, 1), 4500.0), ("rice", date(2025, 2, 2), 2300.0)
+    ]
+
+def test_read_range_filters_by_dates_and_region(tmp_path):
+    out_dir = str(tmp_path / "mandi")
+    append_price_dumps([_dump(tmp_path / "a.csv",
+                              _series("Maharashtra", "Pune", "Pune", "Tomato", 30, 1000)
+                              + _series("Maharashtra", "Nashik", "Lasalgaon", "Tomato", 30, 1200)
+                              + _series("Punjab", "Ludhiana", "Khanna", "Wheat", 30, 2200))], out_dir)
+    store = MandiPriceStore(out_dir)
+
+    days, prices = store.read_range("tomato", START + timedelta(days=5), START + timedelta(days=9))
+    assert len(days) == 10 and set(days.tolist()) == {(START + timedelta(days=n)).toordinal() for n in range(5, 10)}
+    days, prices = store.read_range("tomato", START, START + timedelta(days=29), "maharashtra", "nashik")
+    assert len(days) == 30 and set(prices.tolist()) == {1200.0}
+    days, _ = store.read_range("tomato", START, START + timedelta(days=29), "Punjab")
+    assert len(days) == 0
+    days, _ = store.read_range("mango", START, START + timedelta(days=29))
+    assert len(days) == 0
+
+def test_compaction_keeps_the_latest_price_per_crop_market_and_day(tmp_path):
+    out_dir = str(tmp_path / "mandi")
+    append_price_dumps([_dump(tmp_path / "a.csv", _series("Maharashtra", "Pune", "Pune", "Onion", 20, 1000)
+                              + _series("Maharashtra", "Pune", "Pune", "Tomato", 20, 800))], out_dir)
+    # A corrected re-export of days 10-29 of onion, plus a second market
+    append_price_dumps([_dump(tmp_path / "b.csv",
+                              _series("Maharashtra", "Pune", "Pune", "Onion", 30, 1500)[10:]
+                              + _series("Maharashtra", "Pune", "Manchar", "Onion", 5, 1100))], out_dir)
+    before = MandiPriceStore(out_dir)
+    assert len(before.segments) == 2 and before.rows == 40 + 20 + 5
+
+    compact_price_store(out_dir)
+    store = MandiPriceStore(out_dir)
+    assert len(store.segments) == 1 and store.rows == 30 + 20 + 5
+
+    days, prices = store.read_range("onion", START, START + timedelta(days=29), "Maharashtra", "Pune")
+    by_day = {}
+    for day, price in zip(days.tolist(), prices.tolist()):
+        by_day.setdefault(day, []).append(price)
+    for n in range(30):
+        expected = [1000.0] if n < 10 else [1500.0]
+        if n < 5:
+            expected = sorted(expected + [1100.0])
+        assert sorted(by_day[(START + timedelta(days=n)).toordinal()]) == expected
+    # Keys stay sorted, so range reads remain a binary search
+    assert np.all(np.diff(np.asarray(store.columns[0]["key"])) >= 0)
+
+def test_last_day_covers_every_crop(tmp_path):
+    out_dir = str(tmp_path / "mandi")
+    # Tomato sorts after cotton but stops trading first
+    append_price_dumps([_dump(tmp_path / "a.csv", _series("Maharashtra", "Pune", "Pune", "Cotton", 40, 6000)
+                              + _series("Maharashtra", "Pune", "Pune", "Tomato", 10, 800))], out_dir)
+    assert MandiPriceStore(out_dir).last_day() == START + timedelta(days=39)
+
+def test_analytics_fall_back_from_district_to_state_to_all_india(tmp_path):
+    out_dir = str(tmp_path / "mandi")
+    append_price_dumps([_dump(tmp_path / "a.csv",
+                              _series("Maharashtra", "Pune", "Pune", "Onion", 60, 1000, step=10)
+                              + _series("Punjab", "Ludhiana", "Khanna", "Wheat", 60, 2200))], out_dir)
+    store = MandiPriceStore(out_dir)
+    day = START + timedelta(days=59)
+
+    pune = store.analytics("Onion", Place("Maharashtra", "Pune", 18.5, 73.9), day)
+    assert pune["price_data"]["region"] == "Pune, Maharashtra"
+    assert pune["price_trend"] == "increasing"
+    assert pune["current_price"] == round(sum(1000 + 10 * n for n in range(53, 60)) / 7 / 100, 2)
+
+    nagpur = store.analytics("onion", Place("Maharashtra", "Nagpur", 21.1, 79.1), day)
+    assert nagpur["price_data"]["region"] == "Maharashtra"
+    kerala = store.analytics("onion", Place("Kerala", None, 10.5, 76.3), day)
+    assert kerala["price_data"]["region"] == "All India"
+    assert store.analytics("wheat", None, day)["price_trend"] == "stable"
+    assert store.analytics("mango", None, day) is None
+
+def test_compaction_swaps_the_segment_list_in_one_step(tmp_path, monkeypatch):
+    out_dir = str(tmp_path / "mandi")
+    monkeypatch.setattr(mandi_prices_module, "DEFAULT_MANDI_DIR", out_dir)
+    monkeypatch.setattr(mandi_prices_module, "_store", None)
+    monkeypatch.setattr(mandi_prices_module, "_loaded", False)
+    append_price_dumps([_dump(tmp_path / "a.csv", _series("Maharashtra", "Pune", "Pune", "Onion", 20, 1000))], out_dir)
+    append_price_dumps([_dump(tmp_path / "b.csv", _series("Maharashtra", "Pune", "Pune", "Onion", 30, 1500)[10:])],
+                       out_dir)
+    before, swapped = reload_mandi_store()
+    assert swapped and before.version == ("segment-000001", "segment-000002")
+
+    # Every reader sees the old segment set until the list is swapped, and only the merged one after
+    listed = []
+    swap = mandi_prices_module._write_segment_list
+    def watching_swap(directory, segments):
+        listed.append(MandiPriceStore(directory).version)
+        swap(directory, segments)
+        listed.append(MandiPriceStore(directory).version)
+    monkeypatch.setattr(mandi_prices_module, "_write_segment_list", watching_swap)
+    compact_price_store(out_dir)
+    assert listed == [("segment-000001", "segment-000002"), ("segment-000003",)]
+    assert segment_names(out_dir) == ["segment-000003"]
+    assert sorted(os.listdir(out_dir)) == [SEGMENT_LIST, "dictionary.json", "segment-000003"]
+
+    after, swapped = reload_mandi_store()
+    assert swapped and after.rows == 30
+    assert reload_mandi_store() == (after, False)
+
+def test_stores_without_a_segment_list_read_every_segment(tmp_path):
+    out_dir = str(tmp_path / "mandi")
+    append_price_dumps([_dump(tmp_path / "a.csv", _series("Maharashtra", "Pune", "Pune", "Onion", 20, 1000))], out_dir)
+    os.remove(os.path.join(out_dir, SEGMENT_LIST))
+    assert MandiPriceStore(out_dir).rows == 20
+    # The next append lists the existing segment along with its own
+    append_price_dumps([_dump(tmp_path / "b.csv", _series("Maharashtra", "Pune", "Pune", "Tomato", 5, 800))], out_dir)
+    assert segment_names(out_dir) == ["segment-000001", "segment-000002"]
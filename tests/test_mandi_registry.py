@@ -0,0 +1,76 @@
+import csv
+
+import numpy as np
+import pytest
+
+from agents.market_analyzer import MarketAnalyzer
+from data.gazetteer import haversine_km
+from data.mandi_registry import GridIndex, MandiRegistry
+
+def _brute_force(latitudes, longitudes, ids, latitude, longitude, k):
+    distances = np.array([haversine_km(latitude, longitude, latitudes[i], longitudes[i]) for i in ids])
+    return np.sort(distances)[:k]
+
+@pytest.mark.parametrize("points, k", [(500, 3), (500, 1), (40, 10), (5, 8), (1, 3)])
+def test_grid_nearest_matches_brute_force(points, k):
+    rng = np.random.default_rng(points + k)
+    latitudes = rng.uniform(8, 35, points)
+    longitudes = rng.uniform(68, 97, points)
+    # Index a subset, as the registry does per commodity
+    ids = np.sort(rng.choice(points, size=max(1, points * 3 // 4), replace=False)).astype(np.int32)
+    index = GridIndex(latitudes, longitudes, ids)
+
+    # Query points inside the area and well outside it (long, empty searches)
+    queries = [(rng.uniform(8, 35), rng.uniform(68, 97)) for _ in range(50)] + [(0.0, 60.0), (45.0, 100.0)]
+    for latitude, longitude in queries:
+        found, distances = index.nearest(latitude, longitude, k)
+        assert set(found.tolist()) <= set(ids.tolist())
+        assert len(set(found.tolist())) == len(found) == min(k, len(ids))
+        assert np.all(np.diff(distances) >= 0)
+        np.testing.assert_allclose(distances, _brute_force(latitudes, longitudes, ids, latitude, longitude, k))
+
+def test_registry_indexes_markets_per_commodity(tmp_path):
+    path = tmp_path / "mandis.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["market", "state", "district", "latitude", "longitude", "commodities",
+                         "capacity_tonnes_per_day", "cold_storage"])
+        writer.writerow(["Pune", "Maharashtra", "Pune", 18.52, 73.86, "Onion|Soyabean", 400, 1])
+        writer.writerow(["Lasalgaon", "Maharashtra", "Nashik", 20.15, 74.23, "Onion", 900, 1])
+        writer.writerow(["Khanna", "Punjab", "Ludhiana", 30.70, 76.22, "Wheat|Paddy(Dhan)(Common)", 300, 0])
+    registry = MandiRegistry(str(path))
+
+    assert [market["market"] for market in registry.nearest("onion", 18.6, 73.9)] == ["Pune", "Lasalgaon"]
+    # Catalog and Agmarknet names resolve to the same commodity
+    assert [market["market"] for market in registry.nearest("soybean", 30.0, 76.0)] == ["Pune"]
+    assert [market["market"] for market in registry.nearest("Paddy(Dhan)(Common)", 18.6, 73.9)] == ["Khanna"]
+    assert registry.nearest("mango", 18.6, 73.9) == []
+    assert registry.nearest("onion", 18.6, 73.9, k=1)[0]["cold_storage"] is True
+
+def _market(distance_km, capacity=100.0, cold_storage=False):
+    return {"market": f"M{distance_km}", "district": "", "state": "", "distance_km": distance_km,
+            "capacity_tonnes_per_day": capacity, "cold_storage": cold_storage}
+
+def test_accessibility_scored_on_the_nearest_mandi():
+    analyzer = MarketAnalyzer()
+    near = [_market(5.0)]
+    assert analyzer._accessibility_from_markets(near)["accessibility_score"] == 9
+    # Farther mandis never lower the score
+    with_far = analyzer._accessibility_from_markets(near + [_market(120.0), _market(300.0)])
+    assert with_far["accessibility_score"] == 9
+    assert with_far["nearest_market_km"] == 5.0
+
+    scores = [analyzer._accessibility_from_markets([_market(km)])["accessibility_score"] for km in range(0, 400, 10)]
+    assert scores[0] == 10 and scores[-1] == 1
+    assert all(a >= b for a, b in zip(scores, scores[1:]))
+
+def test_mandis_within_reach_add_capacity_and_cold_storage():
+    analyzer = MarketAnalyzer()
+    result = analyzer._accessibility_from_markets(
+        [_market(10.0, 40, True), _market(45.0, 250, True), _market(80.0, 1000, True)]
+    )
+    assert result["market_infrastructure"] == "good"
+    assert result["cold_storage_availability"] == "high"
+    # Out of reach: only the nearest counts
+    result = analyzer._accessibility_from_markets([_market(70.0, 40), _market(90.0, 1000, True)])
+    assert (result["market_infrastructure"], result["cold_storage_availability"]) == ("basic", "low")
@@ -0,0 +1,113 @@
+import csv
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from data.gazetteer import Place
+from data.mandi_prices import MandiPriceStore, append_price_dumps
+from services import market_analytics as market_analytics_module
+from services.market_analytics import (METRICS, MarketAnalytics, analyze_price_matrix, build_market_analytics,
+                                       reload_market_analytics)
+
+START = date(2025, 1, 1)
+MARKETS = [("Maharashtra", "Pune", "Pune"), ("Maharashtra", "Pune", "Manchar"),
+           ("Maharashtra", "Nashik", "Lasalgaon"), ("Punjab", "Ludhiana", "Khanna"), ("Punjab", "Ludhiana", "Jagraon")]
+
+def _store(tmp_path, series):
+    """series: (crop, market, days, price per quintal at day 0, daily step)"""
+    path = tmp_path / "dump.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["State", "District", "Market", "Commodity", "Arrival_Date",
+                         "Min_Price", "Max_Price", "Modal_Price"])
+        for crop, (state, district, market), days, price, step in series:
+            for n in range(days):
+                modal = price + step * n
+                writer.writerow([state, district, market, crop, (START + timedelta(days=n)).isoformat(),
+                                 modal, modal, modal])
+    out_dir = str(tmp_path / "mandi")
+    append_price_dumps([str(path)], out_dir)
+    return MandiPriceStore(out_dir)
+
+def _metric(metrics, row, name):
+    return float(metrics[row, METRICS.index(name)])
+
+def test_price_matrix_rows_are_analyzed_independently():
+    rng = np.random.default_rng(4)
+    prices = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, (6, 500)), axis=1))
+    prices[rng.random(prices.shape) < 0.3] = np.nan
+    prices[:, -1] = 25.0
+    metrics, seasonal = analyze_price_matrix(prices, START.toordinal())
+    for row in range(len(prices)):
+        alone, alone_seasonal = analyze_price_matrix(prices[row:row + 1], START.toordinal())
+        np.testing.assert_allclose(alone[0], metrics[row], rtol=1e-5)
+        np.testing.assert_allclose(alone_seasonal[0], seasonal[row], rtol=1e-5)
+
+def test_price_matrix_figures():
+    days = 200
+    prices = np.vstack([
+        np.full(days, 30.0),            # Flat
+        30.0 + 0.1 * np.arange(days),   # Rising 0.1 a day
+    ])
+    prices[0, -5:] = np.nan  # Not traded lately: the last price carries over
+    metrics, _ = analyze_price_matrix(prices, START.toordinal())
+
+    assert _metric(metrics, 0, "current_price") == 30.0
+    assert _metric(metrics, 0, "volatility") == 0.0
+    assert _metric(metrics, 0, "observed_days") == days - 5
+    assert _metric(metrics, 1, "current_price") == pytest.approx(30.0 + 0.1 * (days - 1))
+    assert _metric(metrics, 1, "trend_per_month") == pytest.approx(0.1 * 30 / (30.0 + 0.1 * (days - 1)), rel=1e-5)
+    assert _metric(metrics, 1, "price_percentile") == 1.0
+    assert _metric(metrics, 1, "p50") == pytest.approx(np.median(prices[1]), rel=1e-5)
+
+def test_snapshot_is_dated_by_the_latest_trading_day_of_any_crop(tmp_path):
+    # One segment; tomato sorts last but stops trading first
+    store = _store(tmp_path, [("Cotton", MARKETS[0], 200, 6000, 0), ("Tomato", MARKETS[0], 100, 1500, 0)])
+    analytics = MarketAnalytics(build_market_analytics(store, str(tmp_path / "analytics")))
+    assert analytics.as_of == (START + timedelta(days=199)).isoformat()
+    # Tomato is still in the snapshot, priced at its last trade
+    assert analytics.lookup("tomato", None)["current_price"] == 15.0
+
+def test_empty_store_cannot_be_snapshotted(tmp_path):
+    (tmp_path / "mandi").mkdir()
+    (tmp_path / "mandi" / "dictionary.json").write_text('{"crops": [], "markets": []}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        build_market_analytics(MandiPriceStore(str(tmp_path / "mandi")), str(tmp_path / "analytics"))
+
+def test_lookup_falls_back_from_district_to_state_to_all_india(tmp_path):
+    store = _store(tmp_path, [
+        ("Onion", MARKETS[0], 120, 1000, 0), ("Onion", MARKETS[1], 120, 1200, 0),
+        ("Onion", MARKETS[2], 120, 2000, 0), ("Onion", MARKETS[3], 120, 3000, 0),
+        ("Onion", MARKETS[4], 30, 9000, 0),  # Too short a history to count
+    ])
+    analytics = MarketAnalytics(build_market_analytics(store, str(tmp_path / "analytics")))
+
+    pune = analytics.lookup("Onion", Place("Maharashtra", "Pune", 18.5, 73.9))
+    assert (pune["region"], pune["current_price"]) == ("Pune, Maharashtra", 11.0)  # Median of 10 and 12
+    nagpur = analytics.lookup("onion", Place("Maharashtra", "Nagpur", 21.1, 79.1))
+    assert (nagpur["region"], nagpur["current_price"]) == ("Maharashtra", 12.0)
+    kerala = analytics.lookup("onion", Place("Kerala", None, 10.5, 76.3))
+    assert (kerala["region"], kerala["current_price"]) == ("All India", 16.0)
+    ludhiana = analytics.lookup("onion", Place("Punjab", "Ludhiana", 30.9, 75.9))
+    assert (ludhiana["region"], ludhiana["current_price"]) == ("Ludhiana, Punjab", 30.0)
+    assert analytics.lookup("wheat", None) is None
+
+def test_reload_swaps_only_when_a_new_snapshot_is_published(tmp_path, monkeypatch):
+    out_dir = str(tmp_path / "analytics")
+    monkeypatch.setattr(market_analytics_module, "DEFAULT_ANALYTICS_DIR", out_dir)
+    monkeypatch.setattr(market_analytics_module, "_analytics", None)
+    monkeypatch.setattr(market_analytics_module, "_loaded", False)
+    store = _store(tmp_path, [("Onion", MARKETS[0], 120, 1000, 0)])
+
+    assert reload_market_analytics() == (None, False)
+    build_market_analytics(store, out_dir)
+    first, swapped = reload_market_analytics()
+    assert swapped and first is not None
+    assert reload_market_analytics() == (first, False)
+
+    build_market_analytics(store, out_dir, as_of=START + timedelta(days=100))
+    second, swapped = reload_market_analytics()
+    assert swapped and second.as_of == (START + timedelta(days=100)).isoformat()
+    # The version a reader already opened is still on disk
+    assert first.lookup("onion", None)["current_price"] == 10.0
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from services.pipeline import Stage, StagePipeline
+
+def _recording_stage(name, log, delay=0.0):
+    async def run(context, results):
+        log.append(("start", name))
+        await asyncio.sleep(delay)
+        log.append(("end", name))
+        return f"{name}:{context}"
+    return run
+
+def test_dependents_start_after_their_dependencies():
+    log = []
+    pipeline = StagePipeline([
+        Stage("market", _recording_stage("market", log), depends_on=["crops"]),
+        Stage("climate", _recording_stage("climate", log, 0.01)),
+        Stage("crops", _recording_stage("crops", log), depends_on=["climate"]),
+        Stage("schemes", _recording_stage("schemes", log, 0.02)),
+    ])
+    results, timings = asyncio.run(pipeline.run("farm"))
+
+    assert results == {name: f"{name}:farm" for name in ("market", "climate", "crops", "schemes")}
+    assert set(timings) == set(results)
+    assert log.index(("end", "climate")) < log.index(("start", "crops"))
+    assert log.index(("end", "crops")) < log.index(("start", "market"))
+
+def test_independent_stages_overlap():
+    log = []
+    pipeline = StagePipeline([
+        Stage("climate", _recording_stage("climate", log, 0.02)),
+        Stage("schemes", _recording_stage("schemes", log, 0.02)),
+    ])
+    asyncio.run(pipeline.run(None))
+    # Both start before either ends
+    assert {event for event, _ in log[:2]} == {"start"}
+
+def test_provided_results_skip_their_stages():
+    log = []
+    pipeline = StagePipeline([
+        Stage("climate", _recording_stage("climate", log)),
+        Stage("crops", _recording_stage("crops", log), depends_on=["climate"]),
+    ])
+    results, timings = asyncio.run(pipeline.run("farm", provided={"climate": "from llm"}))
+
+    assert results == {"climate": "from llm", "crops": "crops:farm"}
+    assert ("start", "climate") not in log
+    assert set(timings) == {"crops"}
+
+def test_completion_callback_runs_before_dependents():
+    log = []
+    pipeline = StagePipeline([
+        Stage("climate", _recording_stage("climate", log)),
+        Stage("crops", _recording_stage("crops", log), depends_on=["climate"]),
+    ])
+
+    async def on_stage_complete(name, result):
+        log.append(("complete", name))
+
+    asyncio.run(pipeline.run("farm", on_stage_complete=on_stage_complete))
+    assert log.index(("complete", "climate")) < log.index(("start", "crops"))
+
+def test_failed_stage_cancels_waiting_dependents():
+    log = []
+
+    async def fail(context, results):
+        raise RuntimeError("climate failed")
+
+    pipeline = StagePipeline([
+        Stage("climate", fail),
+        Stage("crops", _recording_stage("crops", log), depends_on=["climate"]),
+    ])
+    with pytest.raises(RuntimeError, match="climate failed"):
+        asyncio.run(pipeline.run("farm"))
+    assert log == []
+
+def test_cycles_are_rejected():
+    noop = _recording_stage("noop", [])
+    with pytest.raises(ValueError, match="cycle"):
+        StagePipeline([
+            Stage("a", noop, depends_on=["c"]),
+            Stage("b", noop, depends_on=["a"]),
+            Stage("c", noop, depends_on=["b"]),
+        ])
+    with pytest.raises(ValueError, match="cycle"):
+        StagePipeline([Stage("a", noop, depends_on=["a"])])
+
+def test_unknown_dependencies_are_rejected():
+    with pytest.raises(ValueError, match="unknown stage 'soil'"):
+        StagePipeline([Stage("crops", _recording_stage("crops", []), depends_on=["soil"])])
@@ -0,0 +1,99 @@
+import copy
+
+import pytest
+
+from services import plan_cache as plan_cache_module
+from services.plan_cache import PlanCache
+
+REQUEST = {
+    "farm_details": {
+        "location": "Pune, Maharashtra",
+        "farm_size": 5.0,
+        "soil_type": "Black",
+        "water_source": "borewell",
+        "current_crops": ["cotton", "soybean"],
+        "budget": 100000,
+        "experience_level": "intermediate"
+    },
+    "climate_concerns": ["drought", "heat_waves"],
+    "adaptation_goals": ["water conservation"]
+}
+
+def _variant(**farm_changes):
+    request = copy.deepcopy(REQUEST)
+    for field, value in farm_changes.items():
+        if field in ("climate_concerns", "adaptation_goals"):
+            request[field] = value
+        else:
+            request["farm_details"][field] = value
+    return request
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(plan_cache_module.time, "time", clock.time)
+    return clock
+
+def test_key_ignores_case_whitespace_and_ordering():
+    cache = PlanCache()
+    key = cache.make_key(REQUEST)
+    assert cache.make_key(_variant(location="  pune ,  MAHARASHTRA ")) == key
+    assert cache.make_key(_variant(soil_type="black ")) == key
+    assert cache.make_key(_variant(current_crops=["Soybean", "cotton", "cotton"])) == key
+    assert cache.make_key(_variant(climate_concerns=["heat_waves", "Drought"])) == key
+
+def test_key_bands_the_budget():
+    cache = PlanCache(budget_band=5000)
+    key = cache.make_key(REQUEST)
+    assert cache.make_key(_variant(budget=104999)) == key
+    assert cache.make_key(_variant(budget=105000)) != key
+
+def test_key_separates_material_differences_and_namespaces():
+    cache = PlanCache()
+    key = cache.make_key(REQUEST)
+    assert cache.make_key(_variant(farm_size=5.5)) != key
+    assert cache.make_key(_variant(water_source="canal")) != key
+    assert cache.make_key(_variant(adaptation_goals=["soil health"])) != key
+    assert cache.make_key(REQUEST, namespace="kb-v2") != key
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = PlanCache(ttl_seconds=60)
+    cache.set("key", {"plan": 1})
+    clock.now += 59
+    assert cache.get("key") == {"plan": 1}
+    clock.now += 2
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_hits_are_independent_copies():
+    cache = PlanCache()
+    cache.set("key", {"sections": ["climate"]})
+    cache.get("key")["sections"].append("mutated")
+    assert cache.get("key") == {"sections": ["climate"]}
+
+def test_least_recently_used_entries_are_evicted():
+    cache = PlanCache(max_entries=2)
+    cache.set("a", {})
+    cache.set("b", {})
+    cache.get("a")
+    cache.set("c", {})
+    assert cache.get("b") is None
+    assert cache.get("a") == {} and cache.get("c") == {}
+    assert cache.evictions == 1
+
+def test_disk_tier_survives_a_restart_until_expiry(tmp_path, clock):
+    path = str(tmp_path / "plans.sqlite")
+    PlanCache(ttl_seconds=60, sqlite_path=path).set("key", {"plan": 1})
+
+    restarted = PlanCache(ttl_seconds=60, sqlite_path=path)
+    assert restarted.get("key") == {"plan": 1}
+    clock.now += 61
+    assert PlanCache(ttl_seconds=60, sqlite_path=path).get("key") is None
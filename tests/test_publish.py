@@ -0,0 +1,62 @@
+import os
+
+from data.publish import POINTER, current_directory, publish_directory, staging_directory
+
+def _publish(out_dir, content):
+    staging = staging_directory(str(out_dir))
+    with open(os.path.join(staging, "data.txt"), "w", encoding="utf-8") as f:
+        f.write(content)
+    return publish_directory(staging, str(out_dir))
+
+def _read(directory):
+    with open(os.path.join(directory, "data.txt"), encoding="utf-8") as f:
+        return f.read()
+
+def _versions(out_dir):
+    return sorted(entry for entry in os.listdir(out_dir) if entry != POINTER and not entry.startswith("."))
+
+def test_nothing_published(tmp_path):
+    assert current_directory(str(tmp_path)) is None
+    assert current_directory(str(tmp_path / "missing")) is None
+
+def test_publish_swaps_current(tmp_path):
+    first = _publish(tmp_path, "one")
+    assert current_directory(str(tmp_path)) == first
+    assert _read(first) == "one"
+
+    second = _publish(tmp_path, "two")
+    assert current_directory(str(tmp_path)) == second
+    # A reader that resolved the old version just before the swap can still read it
+    assert _read(first) == "one"
+    # No staging or pointer temp files left behind
+    assert sorted(os.listdir(tmp_path)) == sorted([POINTER] + _versions(tmp_path))
+
+def test_old_versions_are_pruned(tmp_path):
+    published = [_publish(tmp_path, str(n)) for n in range(5)]
+    # The current version and the one before it
+    assert _versions(tmp_path) == [os.path.basename(path) for path in published[-2:]]
+    assert _read(current_directory(str(tmp_path))) == "4"
+
+def test_pruning_follows_the_pointer_not_version_names(tmp_path):
+    # A version published under another naming scheme (sorting after the timestamps) is still
+    # the previous one after the next swap, and goes after the one following it
+    legacy = tmp_path / "5c631cbe336559c9"
+    legacy.mkdir()
+    (legacy / "data.txt").write_text("legacy", encoding="utf-8")
+    (tmp_path / POINTER).write_text(legacy.name, encoding="utf-8")
+
+    first = _publish(tmp_path, "one")
+    assert _versions(tmp_path) == sorted([os.path.basename(first), legacy.name])
+    second = _publish(tmp_path, "two")
+    assert _versions(tmp_path) == sorted([os.path.basename(first), os.path.basename(second)])
+
+def test_unpublished_staging_is_invisible(tmp_path):
+    published = _publish(tmp_path, "done")
+    staging = staging_directory(str(tmp_path))
+    with open(os.path.join(staging, "data.txt"), "w", encoding="utf-8") as f:
+        f.write("half written")
+    assert current_directory(str(tmp_path)) == published
+
+def test_pointer_to_missing_version_reads_as_unpublished(tmp_path):
+    (tmp_path / POINTER).write_text("20000101T000000000000", encoding="utf-8")
+    assert current_directory(str(tmp_path)) is None
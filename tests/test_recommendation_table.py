@@ -0,0 +1,93 @@
+import asyncio
+import itertools
+import json
+
+import pytest
+
+from agents import crop_advisor as crop_advisor_module
+from agents.crop_advisor import CropAdvisor
+from data import catalog as catalog_module
+from data import knowledge_base
+from data.catalog import KnowledgeBase, get_knowledge_base
+from data.records import json_default
+from services import recommendation_table as recommendation_table_module
+from services.recommendation_table import RecommendationTable, build_recommendation_table, reload_recommendation_table
+
+LOCATIONS = ["Pune, Maharashtra", "tropical coast, Kerala", "semi_arid Rajasthan", "temperate Punjab", ""]
+SOILS = ["black", "loamy", "sandy loam", "black cotton soil", "clay loamy", "unknown"]
+WATER_SOURCES = ["borewell", "canal", "river", "rainfed", "open well"]
+RISK_SETS = [[], ["drought"], ["heat_waves"], ["flooding", "not_a_risk"]]
+BUDGETS = [(0, 1), (20000, 3), (45000, 2), (300000, 3), (10**7, 0)]
+
+@pytest.fixture(scope="module")
+def table(tmp_path_factory):
+    path = build_recommendation_table(CropAdvisor(), get_knowledge_base(),
+                                      str(tmp_path_factory.mktemp("tables") / "recommendations"), max_risks=1)
+    return RecommendationTable(path)
+
+@pytest.fixture
+def advisor(monkeypatch):
+    async def no_sleep(delay):
+        return None
+    monkeypatch.setattr(crop_advisor_module.asyncio, "sleep", no_sleep)
+    return CropAdvisor()
+
+def _recommend(advisor, monkeypatch, table, farm_details, risks):
+    monkeypatch.setattr(crop_advisor_module, "get_recommendation_table", lambda: table)
+    # Compared as served: table payloads are frozen (tuples), live ones are lists
+    return json.loads(json.dumps(asyncio.run(advisor.recommend_crops(farm_details, risks)), default=json_default))
+
+def test_table_lookups_match_live_rankings(table, advisor, monkeypatch):
+    for location, soil, water, risks, (budget, size) in itertools.product(
+        LOCATIONS, SOILS, WATER_SOURCES, RISK_SETS, BUDGETS
+    ):
+        farm_details = {"location": location, "soil_type": soil, "water_source": water, "budget": budget,
+                        "farm_size": size}
+        served = _recommend(advisor, monkeypatch, table, farm_details, risks)
+        live = _recommend(advisor, monkeypatch, None, farm_details, risks)
+        assert served == live, farm_details
+
+    # Every profile above is inside the enumerated space
+    assert table.misses == 0 and table.hits == len(LOCATIONS) * len(SOILS) * len(WATER_SOURCES) * len(RISK_SETS) * len(BUDGETS)
+
+def test_profiles_outside_the_table_fall_back_to_live(table, advisor, monkeypatch):
+    farm_details = {"location": "arid", "soil_type": "black", "water_source": "canal", "budget": 50000,
+                    "farm_size": 2}
+    misses = table.misses
+    # More risks than were materialized, and a repeated risk (scored twice)
+    for risks in (["drought", "heat_waves"], ["drought", "drought"]):
+        assert _recommend(advisor, monkeypatch, table, farm_details, risks) == \
+            _recommend(advisor, monkeypatch, None, farm_details, risks)
+    assert table.misses == misses + 2
+
+def test_table_from_other_data_is_not_used(table):
+    crops = knowledge_base.get_crops_data()
+    crops[0]["market_price_per_kg"] += 1
+    changed = KnowledgeBase(crops, knowledge_base.get_schemes_data(), knowledge_base.get_market_data())
+    assert changed.fingerprint != table.fingerprint
+    assert table.lookup(changed, "arid", "black", ["low"], [], 10000) is None
+    assert table.lookup(get_knowledge_base(), "arid", "black", ["low"], [], 10000) is not None
+
+def test_reload_reopens_published_tables_and_rebuilds_for_a_changed_knowledge_base(tmp_path, monkeypatch):
+    out_dir = str(tmp_path / "recommendations")
+    monkeypatch.setattr(recommendation_table_module, "DEFAULT_TABLE_DIR", out_dir)
+    monkeypatch.setattr(recommendation_table_module, "_table", None)
+    monkeypatch.setattr(recommendation_table_module, "_loaded", False)
+    kb = get_knowledge_base()
+    monkeypatch.setattr(catalog_module, "get_knowledge_base", lambda: kb)
+
+    # Nothing built: crop advice stays live
+    assert reload_recommendation_table() == (None, False)
+    build_recommendation_table(CropAdvisor(), kb, out_dir, max_risks=0)
+    first, swapped = reload_recommendation_table()
+    assert swapped and first.fingerprint == kb.fingerprint
+    assert reload_recommendation_table() == (first, False)
+
+    crops = knowledge_base.get_crops_data()
+    crops[0]["market_price_per_kg"] += 1
+    kb = KnowledgeBase(crops, knowledge_base.get_schemes_data(), knowledge_base.get_market_data())
+    second, swapped = reload_recommendation_table()
+    assert swapped and second.fingerprint == kb.fingerprint and second.manifest["max_risks"] == 0
+    assert second.lookup(kb, "arid", "black", ["low"], [], 10000) is not None
+    # The table a request may still hold stays readable
+    assert first.lookup(get_knowledge_base(), "arid", "black", ["low"], [], 10000) is not None
@@ -0,0 +1,73 @@
+import copy
+import json
+import pickle
+
+import pytest
+
+from data import knowledge_base
+from data.records import (CropRecord, FrozenDict, RiskLevel, SchemeRecord, ScoredCrop, ScoredScheme, Season,
+                          freeze, json_default)
+
+def _as_json(value):
+    return json.loads(json.dumps(value, default=json_default))
+
+def test_records_export_the_source_dicts():
+    for crop in knowledge_base.get_crops_data():
+        record = CropRecord(crop)
+        assert _as_json(record) == crop
+        assert set(record) == set(crop)
+        assert record.get("name") == crop["name"] and record.get("missing", "default") == "default"
+    for scheme in knowledge_base.get_schemes_data():
+        assert _as_json(SchemeRecord(scheme)) == scheme
+
+def test_absent_and_unknown_fields_round_trip():
+    crop = {"name": "Millet", "season": "both", "local_name": "bajra", "notes": {"source": ["survey"]}}
+    record = CropRecord(crop)
+    assert _as_json(record) == crop
+    assert "soil_types" not in record
+    with pytest.raises(KeyError):
+        record["soil_types"]
+    assert record.season is Season.BOTH
+    assert record.tolerance("drought") is RiskLevel.NONE
+
+def test_enum_fields_are_coded():
+    record = CropRecord({"name": "Sorghum", "water_requirement": "low",
+                         "risk_tolerance": {"drought": "very_high", "flooding": "low"}})
+    assert record.tolerance("drought") is RiskLevel.VERY_HIGH
+    assert record["risk_tolerance"] == {"drought": "very_high", "flooding": "low"}
+    with pytest.raises(ValueError):
+        CropRecord({"name": "Bad", "season": "monsoon"})
+
+def test_records_are_read_only():
+    record = CropRecord(knowledge_base.get_crops_data()[0])
+    with pytest.raises(TypeError):
+        record.name = "Other"
+    with pytest.raises(TypeError):
+        record["risk_tolerance"]["drought"] = "low"
+    scheme = SchemeRecord(knowledge_base.get_schemes_data()[0])
+    with pytest.raises(TypeError):
+        scheme["eligibility"]["farm_size"]["min"] = 100
+
+    # Copies are plain and mutable, and leave the record alone
+    copied = record.copy()
+    copied["name"] = "Other"
+    assert record["name"] != "Other"
+
+def test_frozen_dicts_survive_copy_and_pickle():
+    frozen = freeze({"a": [1, {"b": 2}]})
+    assert frozen == {"a": (1, {"b": 2})}
+    for clone in (pickle.loads(pickle.dumps(frozen)), copy.deepcopy(frozen)):
+        assert isinstance(clone, FrozenDict) and clone == frozen
+
+def test_scored_views_add_fields_without_copying():
+    record = CropRecord(knowledge_base.get_crops_data()[0])
+    scored = ScoredCrop(record, suitability_score=80, recommendation_reason="Budget-friendly")
+    assert scored.record is record
+    assert scored.name == record.name
+    assert _as_json(scored) == dict(_as_json(record), suitability_score=80, recommendation_reason="Budget-friendly")
+
+    scheme = SchemeRecord(knowledge_base.get_schemes_data()[0])
+    matched = ScoredScheme(scheme, relevance_score=3.21, matching_goals=["water conservation"])
+    # Fields left unset are absent, as if never assigned on a dict
+    assert "priority_score" not in matched
+    assert _as_json(matched) == dict(_as_json(scheme), relevance_score=3.21, matching_goals=["water conservation"])
@@ -0,0 +1,104 @@
+import asyncio
+import math
+
+import numpy as np
+import pytest
+
+from agents import scheme_finder as scheme_finder_module
+from agents.scheme_finder import SchemeFinder
+from data import knowledge_base
+from data.records import SchemeRecord
+from data.scheme_index import B, FIELD_WEIGHTS, K1, MIN_PREFIX_LENGTH, SchemeTextIndex, tokenize
+
+SCHEMES = [SchemeRecord(scheme) for scheme in knowledge_base.get_schemes_data()]
+
+def _reference_scores(schemes, goal):
+    """BM25 computed scheme by scheme, straight from the definition"""
+    fields = {field: [[token for text in scheme.get(field) or () for token in tokenize(text)] for scheme in schemes]
+              for field in FIELD_WEIGHTS}
+    averages = {field: (sum(map(len, docs)) / len(docs)) or 1.0 for field, docs in fields.items()}
+    vocabulary = {token for docs in fields.values() for doc in docs for token in doc}
+
+    def term_score(position, term):
+        n = sum(1 for p in range(len(schemes)) if any(term in fields[field][p] for field in FIELD_WEIGHTS))
+        idf = math.log(1 + (len(schemes) - n + 0.5) / (n + 0.5))
+        total = 0.0
+        for field, weight in FIELD_WEIGHTS.items():
+            doc = fields[field][position]
+            frequency = doc.count(term)
+            if frequency:
+                norm = K1 * (1 - B + B * len(doc) / averages[field])
+                total += weight * frequency * (K1 + 1) / (frequency + norm)
+        return total * idf
+
+    scores = []
+    for position in range(len(schemes)):
+        score = 0.0
+        for word in set(tokenize(goal)):
+            terms = [term for term in vocabulary
+                     if term == word or (len(word) >= MIN_PREFIX_LENGTH and term.startswith(word))]
+            score += max((term_score(position, term) for term in terms), default=0.0)
+        scores.append(score)
+    return np.array(scores)
+
+def test_tokenize_drops_case_punctuation_and_stop_words():
+    assert tokenize("Improve water_management, for THE farm!") == ["improve", "water", "management", "farm"]
+    assert tokenize("of the and") == []
+
+@pytest.mark.parametrize("goal", [
+    "water conservation", "Crop insurance", "soil health", "mechanization of farms", "credit",
+    "water water water", "irrigat", "climate-resilient agriculture", "the and of", "unrelated words"
+])
+def test_index_scores_match_bm25_reference(goal):
+    index = SchemeTextIndex(SCHEMES)
+    np.testing.assert_allclose(index.score(goal), _reference_scores(SCHEMES, goal), rtol=1e-12)
+
+def test_prefix_expansion_needs_a_minimum_length():
+    index = SchemeTextIndex(SCHEMES)
+    names = lambda goal: [SCHEMES[p]["name"] for p in np.flatnonzero(index.score(goal))]
+    # "mechan" reaches "mechanization"; "wat" is too short to expand to "water"
+    assert names("mechan") == [scheme["name"] for scheme in SCHEMES if "mechanization" in scheme["categories"]]
+    assert names("wat") == []
+
+def test_match_restricts_to_candidates_and_lists_each_goal_once():
+    index = SchemeTextIndex(SCHEMES)
+    everything = np.arange(len(SCHEMES))
+    goals = ["water conservation", "crop insurance", "water conservation", "space travel"]
+
+    matches = index.match(goals, everything)
+    assert [position for position, _, _ in matches] == sorted(position for position, _, _ in matches)
+    for position, relevance, matching in matches:
+        assert matching == [goal for goal in dict.fromkeys(goals) if index.score(goal)[position] > 0]
+        assert relevance == round(sum(index.score(goal)[position] for goal in dict.fromkeys(goals)), 2)
+    assert "space travel" not in {goal for _, _, matching in matches for goal in matching}
+
+    subset = np.array([position for position, _, _ in matches][1:])
+    assert [position for position, _, _ in index.match(goals, subset)] == subset.tolist()
+    assert index.match([], everything) == [] and index.match(goals, np.array([], dtype=np.intp)) == []
+
+def test_relevant_schemes_rank_first():
+    index = SchemeTextIndex(SCHEMES)
+    best = lambda goal: SCHEMES[int(np.argmax(index.score(goal)))]["name"]
+    assert best("crop insurance") == "Pradhan Mantri Fasal Bima Yojana (PMFBY)"
+    assert best("irrigation water efficiency") == "Pradhan Mantri Krishi Sinchai Yojana (PMKSY)"
+    assert best("farm machinery") == "Sub-Mission on Agricultural Mechanization (SMAM)"
+
+def test_empty_catalog():
+    index = SchemeTextIndex([])
+    assert index.score("water").tolist() == []
+    assert index.match(["water"], np.array([], dtype=np.intp)) == []
+
+def test_scheme_scores_are_rounded(monkeypatch):
+    async def no_sleep(delay):
+        return None
+    monkeypatch.setattr(scheme_finder_module.asyncio, "sleep", no_sleep)
+    result = asyncio.run(SchemeFinder().find_relevant_schemes(
+        {"location": "Pune, Maharashtra", "farm_size": 5},
+        ["water conservation", "crop insurance", "soil health", "farm machinery"]
+    ))
+    assert result["recommended_schemes"]
+    for scheme in result["recommended_schemes"]:
+        assert scheme["relevance_score"] == round(scheme["relevance_score"], 2)
+        assert scheme["priority_score"] == round(scheme["priority_score"], 2)
+    priorities = [scheme["priority_score"] for scheme in result["recommended_schemes"]]
+    assert priorities == sorted(priorities, reverse=True)
@@ -0,0 +1,62 @@
+import os
+import shutil
+
+from data.snapshot import DEFAULT_SOIL_CSV, CropVarietySnapshot, build_snapshot, is_stale, load_snapshot
+
+CROPS_CSV = os.path.join(os.path.dirname(DEFAULT_SOIL_CSV), "crops.csv")
+
+def _sources(tmp_path):
+    crops, soils = tmp_path / "crops.csv", tmp_path / "soil_types.csv"
+    shutil.copy(CROPS_CSV, crops)
+    shutil.copy(DEFAULT_SOIL_CSV, soils)
+    return str(crops), str(soils)
+
+def _append(path, line):
+    with open(path, encoding="utf-8") as f:
+        ends_with_newline = f.read().endswith("\n")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(("" if ends_with_newline else "\n") + line + "\n")
+
+def _read_all(snapshot):
+    return [snapshot.record(row) for row in range(snapshot.rows)]
+
+def test_build_and_find(tmp_path):
+    crops, soils = _sources(tmp_path)
+    snapshot = CropVarietySnapshot(build_snapshot([crops], soils, str(tmp_path / "snapshots")))
+    assert load_snapshot(str(tmp_path / "snapshots")).path == snapshot.path
+    assert snapshot.record(0)["name"] == "Rice"
+    assert snapshot.find(soil="alluvial")["total"] >= 2
+    assert snapshot.soils[0]["soil_type"] == "Black Soil"
+    assert not is_stale(snapshot, [crops], soils)
+
+def test_rebuild_of_unchanged_sources_keeps_the_live_version(tmp_path):
+    crops, soils = _sources(tmp_path)
+    out_dir = str(tmp_path / "snapshots")
+    reader = CropVarietySnapshot(build_snapshot([crops], soils, out_dir))
+    before = _read_all(reader)
+
+    # Touched, same content: stale by stat, but the published version is reused as-is
+    os.utime(crops, ns=(0, 0))
+    assert is_stale(reader, [crops], soils)
+    assert build_snapshot([crops], soils, out_dir) == reader.path
+    assert _read_all(reader) == before
+    assert _read_all(CropVarietySnapshot(reader.path)) == before
+
+def test_rebuild_keeps_the_version_an_open_reader_holds(tmp_path):
+    crops, soils = _sources(tmp_path)
+    out_dir = str(tmp_path / "snapshots")
+    reader = CropVarietySnapshot(build_snapshot([crops], soils, out_dir))
+    before = _read_all(reader)
+
+    _append(crops, "Millet,350,Sandy,Kharif,80,15,2400")
+    rebuilt = CropVarietySnapshot(build_snapshot([crops], soils, out_dir))
+    assert rebuilt.version != reader.version and rebuilt.rows == reader.rows + 1
+    assert load_snapshot(out_dir).path == rebuilt.path
+    # The previous version is still whole for the reader that opened it
+    assert _read_all(CropVarietySnapshot(reader.path)) == before
+
+    _append(crops, "Barley,400,Loamy,Rabi,110,30,2000")
+    newest = build_snapshot([crops], soils, out_dir)
+    # Only the current and the previous versions are kept
+    assert not os.path.exists(reader.path)
+    assert os.path.exists(rebuilt.path) and os.path.exists(newest)
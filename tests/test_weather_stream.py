@@ -0,0 +1,156 @@
+import json
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from services.weather_stream import RunningStats, WeatherStore
+
+PUNE = (18.52, 73.86)
+NAGPUR = (21.15, 79.09)
+
+def _observations(count, seed=11):
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    observations = []
+    for i in range(count):
+        station, (latitude, longitude) = rng.choice([("pune-1", PUNE), ("pune-2", PUNE), ("nagpur-1", NAGPUR)])
+        observations.append({
+            "station_id": station,
+            "date": (start + timedelta(days=i // 3)).isoformat(),
+            "latitude": latitude,
+            "longitude": longitude,
+            "rainfall_mm": round(rng.expovariate(1 / 8), 1) if rng.random() < 0.9 else None,
+            "tmax_c": round(rng.gauss(33, 4), 1)
+        })
+    return observations
+
+def _state(store):
+    return {key: weather.to_dict() for key, weather in store.districts.items()}
+
+def test_running_stats_match_numpy():
+    rng = np.random.default_rng(1)
+    values = rng.normal(30, 5, 1000) + 1e6  # A large offset is where a naive sum of squares loses precision
+    stats = RunningStats()
+    for value in values:
+        stats.add(float(value))
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert stats.std == pytest.approx(values.std(ddof=1), rel=1e-9)
+
+def test_running_stats_with_fewer_than_two_values():
+    stats = RunningStats()
+    assert stats.std == 0.0
+    stats.add(4.0)
+    assert (stats.mean, stats.std) == (4.0, 0.0)
+
+@pytest.mark.parametrize("changes", [
+    {"rainfall_mm": float("nan")},
+    {"tmax_c": "nan"},
+    {"rainfall_mm": -1.0},
+    {"rainfall_mm": 3000.0},
+    {"tmax_c": 75.0},
+    {"tmax_c": "hot"},
+    {"latitude": None},
+    {"longitude": 200.0},
+    {"rainfall_mm": None, "tmax_c": None},
+])
+def test_implausible_observations_are_rejected(changes):
+    store = WeatherStore(path=None)
+    observation = dict(_observations(1)[0], **changes)
+    assert store.ingest([observation]) == 0
+    assert store.stats()["rejected"] == 1
+    assert store.observations == 0 and not store.districts
+
+def test_rejected_observations_leave_statistics_unchanged():
+    clean = _observations(300)
+    noisy = list(clean)
+    for position in range(0, 300, 30):
+        noisy.insert(position, dict(clean[position], tmax_c=float("nan")))
+
+    expected, store = WeatherStore(path=None), WeatherStore(path=None)
+    expected.ingest(clean)
+    assert store.ingest(noisy) == 300
+    assert store.rejected == 10
+    assert _state(store) == _state(expected)
+
+def test_checkpoints_every_n_observations(tmp_path):
+    store = WeatherStore(str(tmp_path), checkpoint_every=100)
+    observations = _observations(250)
+    store.ingest(observations[:99])
+    assert not (tmp_path / "checkpoint.json").exists()
+    store.ingest(observations[99:150])
+    with open(tmp_path / "checkpoint.json", encoding="utf-8") as f:
+        assert json.load(f)["observations"] == 150
+    # Counted from the last checkpoint, not from the start
+    store.ingest(observations[150:249])
+    with open(tmp_path / "checkpoint.json", encoding="utf-8") as f:
+        assert json.load(f)["observations"] == 150
+
+def test_restart_restores_checkpoint_and_replays_the_log(tmp_path):
+    store = WeatherStore(str(tmp_path), checkpoint_every=100)
+    for batch in range(0, 330, 30):
+        store.ingest(_observations(330)[batch:batch + 30])
+    assert store.observations == 330
+
+    restarted = WeatherStore(str(tmp_path), checkpoint_every=100)
+    assert restarted.observations == 330
+    assert restarted.stations == store.stations
+    assert _state(restarted) == _state(store)
+
+    # Nothing is replayed twice on the next restart
+    restarted.checkpoint()
+    assert _state(WeatherStore(str(tmp_path))) == _state(store)
+
+def test_district_summary():
+    store = WeatherStore(path=None)
+    observations = _observations(600)
+    store.ingest(observations)
+    pune = [o for o in observations if o["station_id"].startswith("pune")]
+    summary = store.districts["Maharashtra/Pune"].summary()
+    assert summary["observations"] == len(pune)
+    assert summary["observed_through"] == max(o["date"] for o in pune)
+    assert summary["year"] == 2024
+    assert "tmax_anomaly_c" in summary and "rainfall_anomaly_pct" in summary
+
+def test_restart_skips_a_torn_last_log_row(tmp_path):
+    store = WeatherStore(str(tmp_path), checkpoint_every=1000)
+    observations = _observations(60)
+    store.ingest(observations)
+    log = tmp_path / "observations.csv"
+    # A crash mid-write leaves the last row cut inside its date
+    data = log.read_bytes()
+    last_row = data.rstrip(b"\r\n").rfind(b"\n") + 1
+    log.write_bytes(data[:last_row + len(observations[-1]["station_id"]) + 6])
+
+    restarted = WeatherStore(str(tmp_path), checkpoint_every=1000)
+    assert (restarted.observations, restarted.rejected) == (59, 1)
+    expected = WeatherStore(path=None)
+    expected.ingest(observations[:59])
+    assert _state(restarted) == _state(expected)
+
+    # Later observations are logged on a line of their own and survive the next restart
+    restarted.ingest(observations[59:])
+    assert _state(WeatherStore(str(tmp_path))) == _state(store)
+
+def test_restart_skips_malformed_log_rows(tmp_path):
+    store = WeatherStore(str(tmp_path), checkpoint_every=1000)
+    observations = _observations(30)
+    store.ingest(observations[:20])
+    with open(tmp_path / "observations.csv", "a", encoding="utf-8") as f:
+        f.write("pune-1,2024-0\n")
+        f.write("pune-1,2024-0,18.52,73.86,4.0,31.0\n")
+    store.ingest(observations[20:])
+
+    restarted = WeatherStore(str(tmp_path))
+    assert (restarted.observations, restarted.rejected) == (30, 2)
+    assert _state(restarted) == _state(store)
+
+def test_checkpoint_state_is_a_copy_of_the_station_map(tmp_path, monkeypatch):
+    store = WeatherStore(str(tmp_path), checkpoint_every=1000)
+    store.ingest(_observations(30))
+    dumped = []
+    monkeypatch.setattr("services.weather_stream.json.dump", lambda state, f, **kwargs: dumped.append(state))
+    store.checkpoint()
+    assert dumped[0]["stations"] == store.stations and dumped[0]["stations"] is not store.stations